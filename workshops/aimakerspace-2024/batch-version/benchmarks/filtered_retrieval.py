@@ -0,0 +1,99 @@
+"""Filtered query latency of NumpyDocumentStore with and without its metadata index.
+
+Writes random vectors with `symbol`, `symbols` and `form_type` metadata
+into two stores, one indexing those fields and one with
+`indexed_meta_fields=[]`, which checks every document against the
+filter. Times top-k retrieval for filters of decreasing selectivity
+and checks that both stores retrieve and filter the same documents,
+including filters on the list-valued `symbols`.
+
+Run from the `batch-version` directory:
+
+    python -m benchmarks.filtered_retrieval --documents 200000
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from haystack import Document
+
+from numpy_document_store import NumpyDocumentStore
+
+FORM_TYPES = ["8-K", "10-K", "10-Q", "4", "S-1"]
+
+
+def time_queries(store, queries, filters, top_k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        documents = store.embedding_retrieval(query_embedding=query, filters=filters, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+        results.append([document.id for document in documents])
+    return statistics.median(latencies) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    symbols = [f"SYM{i}" for i in range(args.symbols)]
+    indexed = NumpyDocumentStore(initial_capacity=args.documents)
+    scanned = NumpyDocumentStore(initial_capacity=args.documents, indexed_meta_fields=[])
+    for start in range(0, args.documents, 50000):
+        count = min(50000, args.documents - start)
+        vectors = rng.standard_normal((count, args.dimensions), dtype=np.float32)
+        picks = rng.integers(0, args.symbols, (count, 3))
+        forms = rng.integers(0, len(FORM_TYPES), count)
+        documents = [
+            Document(id=str(start + i), content=f"chunk {start + i}", embedding=vector.tolist(),
+                     meta={"symbol": symbols[pick[0]], "symbols": [symbols[p] for p in pick],
+                           "form_type": FORM_TYPES[form]})
+            for i, (vector, pick, form) in enumerate(zip(vectors, picks, forms))
+        ]
+        indexed.write_documents(documents)
+        scanned.write_documents(documents)
+    queries = rng.standard_normal((args.queries, args.dimensions), dtype=np.float32).tolist()
+
+    cases = {
+        "none": None,
+        "form_type": {"field": "meta.form_type", "operator": "==", "value": "10-K"},
+        "symbol": {"field": "meta.symbol", "operator": "==", "value": "SYM7"},
+        "symbol+form": {"operator": "AND", "conditions": [
+            {"field": "meta.symbol", "operator": "==", "value": "SYM7"},
+            {"field": "meta.form_type", "operator": "==", "value": "8-K"},
+        ]},
+        # A list value matches by any element
+        "symbols": {"field": "meta.symbols", "operator": "==", "value": "SYM7"},
+        "symbols in": {"field": "meta.symbols", "operator": "in", "value": ["SYM7", "SYM8"]},
+        "symbols!=": {"operator": "AND", "conditions": [
+            {"field": "meta.symbols", "operator": "!=", "value": "SYM7"},
+            {"field": "meta.form_type", "operator": "==", "value": "10-K"},
+        ]},
+        "not symbols": {"operator": "NOT", "conditions": [
+            {"field": "meta.symbols", "operator": "not in", "value": ["SYM7", "SYM8"]},
+        ]},
+    }
+    print(f"{args.documents} documents x {args.dimensions}, p50 of {args.queries} queries")
+    for name, filters in cases.items():
+        matches = {document.id for document in indexed.filter_documents(filters)} if filters else None
+        index_ms, index_ids = time_queries(indexed, queries, filters, args.top_k)
+        scan_ms, scan_ids = time_queries(scanned, queries, filters, args.top_k)
+        count = len(matches) if filters else args.documents
+        print(f"{name:>12}  {count:>7} matches  scan {scan_ms:8.2f}ms  index {index_ms:8.2f}ms  "
+              f"{scan_ms / index_ms:6.1f}x  same results: {index_ids == scan_ids}")
+        assert index_ids == scan_ids, f"{name}: indexed and scanned retrieval differ"
+        if filters:
+            assert matches == {document.id for document in scanned.filter_documents(filters)}, \
+                f"{name}: filter_documents differs between the stores"
+            assert all(set(ids) <= matches for ids in index_ids), f"{name}: retrieved a document the filter rejects"
+
+
+if __name__ == "__main__":
+    main()
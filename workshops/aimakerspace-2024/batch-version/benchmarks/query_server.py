@@ -0,0 +1,189 @@
+"""Latency and throughput of the retriever pipeline, run per question or served by `QueryServer`.
+
+Starts local stand-ins for the embeddings and chat completions APIs,
+fills a `NumpyDocumentStore` with `--documents` random vectors and
+builds the components of `build_retriever_pipeline` against them. A
+closed-loop load generator then keeps `--concurrency` questions in
+flight, either calling `Pipeline.run` from that many threads or
+awaiting `QueryServer.answer` from that many tasks, and reports
+latency percentiles, time to first token and questions per second.
+With `--stage retrieve` both stop after retrieval, which isolates
+what batching buys: fewer embedding requests and one matrix product
+instead of one search per question.
+
+Finally it closes a `QueryServer` with one batch running, one waiting
+for a slot and more questions queued, and checks that the running batch
+is answered and every other caller is cancelled instead of left waiting.
+
+Run from the `batch-version` directory:
+
+    python -m benchmarks.query_server --concurrency 1 8 32 --queries 128
+    python -m benchmarks.query_server --stage retrieve
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from haystack import Document, Pipeline
+from haystack.components.builders import PromptBuilder
+from haystack.components.embedders import OpenAITextEmbedder
+from haystack.components.generators import OpenAIGenerator
+from haystack.utils import Secret
+
+from benchmarks.standins import ChatServer, EmbeddingServer
+from numpy_document_store import NumpyDocumentStore, NumpyEmbeddingRetriever
+from query_server import QueryServer
+
+TEMPLATE = """
+Context:
+{% for document in documents %}
+    {{ document.content }}
+{% endfor %}
+
+Question: {{question}}
+Answer:
+"""
+
+
+def build_pipeline(document_store, embedding_url, chat_url=None):
+    """
+    The components of `build_retriever_pipeline`, pointed at the stand-ins.
+    Without `chat_url` the pipeline stops at the retriever.
+    """
+    pipeline = Pipeline()
+    pipeline.add_component("text_embedder", OpenAITextEmbedder(api_key=Secret.from_token("stand-in"),
+                                                               api_base_url=f"{embedding_url}/v1"))
+    pipeline.add_component("retriever", NumpyEmbeddingRetriever(document_store, top_k=5))
+    pipeline.connect("text_embedder.embedding", "retriever.query_embedding")
+    if chat_url is None:
+        return pipeline
+    pipeline.add_component("prompt_builder", PromptBuilder(template=TEMPLATE))
+    pipeline.add_component("llm", OpenAIGenerator(api_key=Secret.from_token("stand-in"),
+                                                  api_base_url=f"{chat_url}/v1"))
+    pipeline.connect("retriever", "prompt_builder.documents")
+    pipeline.connect("prompt_builder", "llm")
+    return pipeline
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+
+def synchronous(pipeline, questions, concurrency):
+    answering = "prompt_builder" in pipeline.graph.nodes
+
+    def ask(question):
+        start = time.perf_counter()
+        data = {"text_embedder": {"text": question}}
+        if answering:
+            data["prompt_builder"] = {"question": question}
+        pipeline.run(data)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(ask, questions)), None
+
+
+async def served(pipeline, questions, concurrency, args):
+    latencies, first_tokens = [], []
+    queue = list(reversed(questions))
+
+    async def client():
+        while queue:
+            question = queue.pop()
+            start = time.perf_counter()
+            first = None
+            if args.stage == "retrieve":
+                await server.retrieve(question)
+            else:
+                async for _ in server.stream(question):
+                    if first is None:
+                        first = time.perf_counter() - start
+            latencies.append(time.perf_counter() - start)
+            first_tokens.append(first)
+
+    async with QueryServer(pipeline, max_batch_size=args.max_batch_size,
+                           max_wait=timedelta(milliseconds=args.max_wait_ms)) as server:
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+        batch_sizes = server.batch_sizes
+    return latencies, (first_tokens, batch_sizes)
+
+
+async def closing(pipeline, questions):
+    """
+    Results of `questions` when the server is closed while they are in
+    flight, None for cancelled ones, and the sizes of the batches started.
+    """
+    server = QueryServer(pipeline, max_batch_size=2, max_wait=timedelta(milliseconds=1), max_batches_in_flight=1)
+    tasks = [asyncio.create_task(server.retrieve(question)) for question in questions]
+    # The first batch is being embedded; the second waits for its slot, the rest are queued
+    await asyncio.sleep(0.01)
+    await server.close()
+    done, pending = await asyncio.wait(tasks, timeout=5)
+    assert not pending, f"{len(pending)} callers still wait after close"
+    return [None if task.cancelled() else task.result() for task in tasks], server.batch_sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stage", choices=["answer", "retrieve"], default="answer")
+    parser.add_argument("--documents", type=int, default=50000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--queries", type=int, default=128)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50)
+    parser.add_argument("--chat-latency-ms", type=float, default=200)
+    parser.add_argument("--token-latency-ms", type=float, default=10)
+    parser.add_argument("--tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store = NumpyDocumentStore(initial_capacity=args.documents)
+    for start in range(0, args.documents, 10000):
+        vectors = rng.standard_normal((min(10000, args.documents - start), args.dimensions), dtype=np.float32)
+        store.write_documents([Document(id=str(start + i), content=f"passage {start + i}", embedding=vector.tolist())
+                               for i, vector in enumerate(vectors)])
+    print(f"{args.documents} documents, {args.queries} questions per run")
+
+    with EmbeddingServer(latency=args.embedding_latency_ms / 1000, dimensions=args.dimensions) as embeddings, \
+            ChatServer(latency=args.chat_latency_ms / 1000, per_token_latency=args.token_latency_ms / 1000,
+                       tokens=args.tokens) as chat:
+        pipeline = build_pipeline(store, embeddings.url, chat.url)
+        # Components cannot be shared between pipelines, so the sync runner gets its own
+        sync_pipeline = pipeline if args.stage == "answer" else build_pipeline(store, embeddings.url)
+        for concurrency in args.concurrency:
+            questions = [f"How did stock {i} react to the earnings of company {i % 97}?" for i in range(args.queries)]
+            for name in ("Pipeline.run", "QueryServer"):
+                embeddings.requests = 0
+                start = time.perf_counter()
+                if name == "Pipeline.run":
+                    latencies, extra = synchronous(sync_pipeline, questions, concurrency)
+                else:
+                    latencies, extra = asyncio.run(served(pipeline, questions, concurrency, args))
+                elapsed = time.perf_counter() - start
+                line = (f"-c {concurrency:<3} {name:<12}  p50 {percentile(latencies, 50):7.0f} ms  "
+                        f"p99 {percentile(latencies, 99):7.0f} ms  {len(latencies) / elapsed:6.1f} q/s  "
+                        f"{embeddings.requests:4d} embedding requests")
+                if extra:
+                    first_tokens, batch_sizes = extra
+                    if args.stage == "answer":
+                        line += f"  first token p50 {percentile(first_tokens, 50):.0f} ms"
+                    line += f"  mean batch {np.mean(batch_sizes):.1f}"
+                print(line)
+
+        results, batch_sizes = asyncio.run(closing(pipeline, questions[:8]))
+        started = sum(batch_sizes)
+        print(f"closed with {len(results)} questions in flight: {started} in the running batch, "
+              f"{sum(result is None for result in results)} cancelled")
+        assert started and all(result is not None for result in results[:started]), \
+            "the running batch was not answered"
+        assert all(result is None for result in results[started:]), "questions not yet batched were answered"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Local HTTP stand-ins for the model APIs the pipelines talk to."""
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import base64
+import hashlib
+import json
+import time
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer:
+    """Run a handler class on a free local port in a background thread.
+
+    Use as a context manager; `url` is the base URL to hand to clients.
+    """
+
+    handler_class = _StandInHandler
+
+    def __init__(self):
+        self.requests = 0
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _EmbeddingHandler(_StandInHandler):
+    def do_POST(self):
+        standin = self.server.standin
+        standin.count_request()
+        payload = self.read_json()
+        texts = payload["input"]
+        if isinstance(texts, str):
+            texts = [texts]
+        time.sleep(standin.latency + standin.per_input_latency * len(texts))
+
+        # Like the real API, answer in base64 float32 when the client asks for it.
+        encode = standin.embed
+        if payload.get("encoding_format") == "base64":
+            encode = standin.embed_base64
+        data = [
+            {"object": "embedding", "index": i, "embedding": encode(text)}
+            for i, text in enumerate(texts)
+        ]
+        tokens = sum(len(text.split()) for text in texts)
+        self.send_json({
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "stand-in"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+class EmbeddingServer(StandInServer):
+    """OpenAI-compatible `/v1/embeddings` endpoint with simulated latency.
+
+    Vectors are derived from a hash of the input text so equal texts
+    always get equal embeddings. Point `OpenAIDocumentEmbedder` at it
+    with `api_base_url=server.url + "/v1"`.
+    """
+
+    handler_class = _EmbeddingHandler
+
+    def __init__(self, latency=0.05, per_input_latency=0.0005, dimensions=1536):
+        super().__init__()
+        self.latency = latency
+        self.per_input_latency = per_input_latency
+        self.dimensions = dimensions
+
+    def embed(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [(digest[i % len(digest)] - 128) / 128 for i in range(self.dimensions)]
+
+    def embed_base64(self, text):
+        return base64.b64encode(array("f", self.embed(text)).tobytes()).decode("ascii")
+
+
+class _ChatHandler(_StandInHandler):
+    def do_POST(self):
+        standin = self.server.standin
+        standin.count_request()
+        payload = self.read_json()
+        prompt = payload["messages"][-1]["content"]
+        tokens = standin.reply(prompt)
+        time.sleep(standin.latency)
+
+        if not payload.get("stream"):
+            time.sleep(standin.per_token_latency * len(tokens))
+            self.send_json({
+                "id": "chatcmpl-stand-in",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stand-in"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "".join(tokens)}}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(tokens),
+                          "total_tokens": len(prompt.split()) + len(tokens)},
+            })
+            return
+
+        # Server-sent events, one chunk per token, like the real streaming API
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for index, token in enumerate(tokens + [None]):
+            if token is not None:
+                time.sleep(standin.per_token_latency)
+            delta = {"content": token} if token is not None else {}
+            chunk = {
+                "id": "chatcmpl-stand-in",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", "stand-in"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None if token is not None else "stop"}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class ChatServer(StandInServer):
+    """OpenAI-compatible `/v1/chat/completions` endpoint, streaming or not.
+
+    Replies with `tokens` words derived from a hash of the prompt after
+    `latency`, then one word every `per_token_latency`. Point
+    `OpenAIGenerator` at it with `api_base_url=server.url + "/v1"`.
+    """
+
+    handler_class = _ChatHandler
+
+    def __init__(self, latency=0.2, per_token_latency=0.01, tokens=50):
+        super().__init__()
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.tokens = tokens
+
+    def reply(self, prompt):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return [digest[4 * i % 60:4 * i % 60 + 4] + " " for i in range(self.tokens)]
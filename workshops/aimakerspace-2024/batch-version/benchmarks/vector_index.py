@@ -0,0 +1,80 @@
+"""Query latency of NumpyDocumentStore against InMemoryDocumentStore.
+
+Writes random unit vectors into both stores and times top-k retrieval.
+The in-memory baseline rebuilds its matrix from Python lists on every
+query, so it is only run up to `--baseline-max` documents.
+
+Run from the `batch-version` directory:
+
+    python -m benchmarks.vector_index --sizes 100000 1000000
+
+1M vectors at 1536 dimensions need about 6 GB for the matrix alone; use
+`--dimensions` to scale down on smaller machines.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from haystack import Document
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+
+from numpy_document_store import NumpyDocumentStore
+
+
+def make_documents(count, dimensions, rng, chunk=50000):
+    for start in range(0, count, chunk):
+        vectors = rng.standard_normal((min(chunk, count - start), dimensions), dtype=np.float32)
+        yield [
+            Document(id=str(start + i), content=f"passage {start + i}", embedding=vector.tolist())
+            for i, vector in enumerate(vectors)
+        ]
+
+
+def time_queries(store, queries, top_k):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.embedding_retrieval(query_embedding=query, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, size, write_seconds, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(0.99 * (len(latencies) - 1))] * 1000
+    print(f"{name:>9} {size:>9} docs  write {write_seconds:7.1f}s  "
+          f"p50 {p50:8.2f}ms  p99 {p99:8.2f}ms  {1000 / p50:8.1f} qps")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--baseline-max", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    queries = rng.standard_normal((args.queries, args.dimensions)).tolist()
+
+    for size in args.sizes:
+        stores = [("numpy", NumpyDocumentStore(initial_capacity=size))]
+        if size <= args.baseline_max:
+            stores.append(("in-memory", InMemoryDocumentStore(embedding_similarity_function="cosine")))
+
+        for name, store in stores:
+            start = time.perf_counter()
+            for documents in make_documents(size, args.dimensions, np.random.default_rng(size)):
+                store.write_documents(documents)
+            write_seconds = time.perf_counter() - start
+            # The in-memory store is far slower per query; a few samples are enough.
+            sample = queries if name == "numpy" else queries[:5]
+            report(name, size, write_seconds, time_queries(store, sample, args.top_k))
+        stores.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+"""In-memory document store that keeps embeddings in one float32 matrix."""
+from dataclasses import replace
+from typing import Any, Dict, List, Optional, Set
+import logging
+
+import numpy as np
+from haystack import Document, component, default_from_dict, default_to_dict
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+from haystack.utils.filters import document_matches_filter
+
+logger = logging.getLogger(__name__)
+
+# Metadata the news and filings readers attach, see `JSONLReader` in rag_pipelines.py
+DEFAULT_INDEXED_META_FIELDS = ("symbols", "symbol", "form_type", "cik")
+
+# Score only the matching rows when a filter keeps less than this share of the matrix
+_GATHER_FRACTION = 0.25
+
+
+class NumpyDocumentStore:
+    """
+    Document store for embedding retrieval over a contiguous NumPy matrix.
+
+    Embeddings are copied into a growable float32 matrix when documents are
+    written, pre-normalized when the similarity function is cosine. Deleting
+    a document frees its row for the next write instead of rebuilding the
+    matrix, and a query is scored with a single matrix-vector product, or a
+    batch of queries with a single matrix-matrix product.
+
+    The rows of every value of the `indexed_meta_fields` are kept in an
+    inverted index, so filters on those fields are answered without
+    looking at the documents, and a selective filter ("only NVDA 8-K
+    chunks") scores just the matching rows. Filters on other fields are
+    checked document by document, as before.
+
+    A list meta value matches `==` and `in` when any of its elements
+    does, on indexed fields and others alike: `{"field": "meta.symbols",
+    "operator": "==", "value": "NVDA"}` finds every document whose
+    `symbols` include NVDA, and `!=` and `not in` find the rest.
+    """
+
+    def __init__(
+        self,
+        embedding_similarity_function: str = "cosine",
+        initial_capacity: int = 1024,
+        indexed_meta_fields: Optional[List[str]] = None,
+    ):
+        """
+        :param embedding_similarity_function: "cosine" or "dot_product".
+        :param initial_capacity: Number of rows to allocate before the first write.
+        :param indexed_meta_fields: Meta fields to index for filtering.
+            Defaults to `symbols`, `symbol`, `form_type` and `cik`.
+        """
+        if embedding_similarity_function not in ("cosine", "dot_product"):
+            raise ValueError(f"Unsupported similarity function: {embedding_similarity_function}")
+        self.embedding_similarity_function = embedding_similarity_function
+        self.initial_capacity = initial_capacity
+        self.indexed_meta_fields = list(
+            DEFAULT_INDEXED_META_FIELDS if indexed_meta_fields is None else indexed_meta_fields
+        )
+
+        self._documents: Dict[str, Document] = {}
+        self._rows: Dict[str, int] = {}
+        self._row_ids: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        # Rows holding each value, per indexed meta field
+        self._meta_rows: Dict[str, Dict[Any, Set[int]]] = {field: {} for field in self.indexed_meta_fields}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            embedding_similarity_function=self.embedding_similarity_function,
+            initial_capacity=self.initial_capacity,
+            indexed_meta_fields=self.indexed_meta_fields,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NumpyDocumentStore":
+        return default_from_dict(cls, data)
+
+    def count_documents(self) -> int:
+        return len(self._documents)
+
+    def filter_documents(self, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        documents = [self._with_embedding(document) for document in self._documents.values()]
+        if filters:
+            documents = [document for document in documents if _matches(filters, document)]
+        return documents
+
+    def write_documents(self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.NONE) -> int:
+        if policy == DuplicatePolicy.NONE:
+            policy = DuplicatePolicy.FAIL
+
+        to_write: Dict[str, Document] = {}
+        for document in documents:
+            if not isinstance(document, Document):
+                raise ValueError("Please provide a list of Documents.")
+            if document.id in self._documents or document.id in to_write:
+                if policy == DuplicatePolicy.FAIL:
+                    raise DuplicateDocumentError(f"ID '{document.id}' already exists.")
+                if policy == DuplicatePolicy.SKIP:
+                    logger.warning("ID '%s' already exists", document.id)
+                    continue
+            to_write[document.id] = document
+
+        self.delete_documents([doc_id for doc_id in to_write if doc_id in self._documents])
+
+        embedded = [document for document in to_write.values() if document.embedding is not None]
+        if embedded:
+            vectors = np.asarray([document.embedding for document in embedded], dtype=np.float32)
+            rows = self._allocate_rows(len(embedded), vectors.shape[1])
+            if self.embedding_similarity_function == "cosine":
+                norms = np.linalg.norm(vectors, axis=1)
+                norms[norms == 0] = 1
+                vectors /= norms[:, np.newaxis]
+                self._norms[rows] = norms
+            self._matrix[rows] = vectors
+            self._alive[rows] = True
+            for row, document in zip(rows.tolist(), embedded):
+                self._rows[document.id] = row
+                self._row_ids[row] = document.id
+                for value_rows in self._value_rows(document, create=True):
+                    value_rows.add(row)
+
+        for doc_id, document in to_write.items():
+            # The matrix row is the only copy of the embedding.
+            self._documents[doc_id] = replace(document, embedding=None, score=None)
+        return len(to_write)
+
+    def delete_documents(self, document_ids: List[str]) -> None:
+        for doc_id in document_ids:
+            document = self._documents.pop(doc_id, None)
+            row = self._rows.pop(doc_id, None)
+            if row is not None:
+                for value_rows in self._value_rows(document):
+                    value_rows.discard(row)
+                self._alive[row] = False
+                self._row_ids[row] = None
+                self._free_rows.append(row)
+
+    def embedding_retrieval(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        scale_score: bool = False,
+        return_embedding: bool = False,
+    ) -> List[Document]:
+        """
+        Retrieve the `top_k` documents most similar to `query_embedding`.
+
+        :param query_embedding: Embedding of the query.
+        :param filters: A dictionary with filters to narrow down the search space.
+        :param top_k: The number of top documents to retrieve.
+        :param scale_score: Whether to scale the scores to the range 0 to 1.
+        :param return_embedding: Whether to return the embedding of the retrieved Documents.
+        :return: A list of the top_k documents most relevant to the query, best first.
+        """
+        return self.embedding_retrieval_batch([query_embedding], filters, top_k, scale_score, return_embedding)[0]
+
+    def embedding_retrieval_batch(
+        self,
+        query_embeddings: List[List[float]],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        scale_score: bool = False,
+        return_embedding: bool = False,
+    ) -> List[List[Document]]:
+        """
+        Retrieve the `top_k` documents most similar to each of `query_embeddings`.
+
+        All queries are scored with a single matrix-matrix product, which
+        reads the document matrix once for the whole batch.
+
+        :param query_embeddings: Embeddings of the queries.
+        :param filters: A dictionary with filters to narrow down the search space for every query.
+        :param top_k: The number of top documents to retrieve per query.
+        :param scale_score: Whether to scale the scores to the range 0 to 1.
+        :param return_embedding: Whether to return the embedding of the retrieved Documents.
+        :return: One list of documents per query, in query order, best first.
+        """
+        if not self._rows:
+            logger.warning("No Documents found with embeddings. Returning empty list.")
+            return [[] for _ in query_embeddings]
+        if not query_embeddings:
+            return []
+
+        size = len(self._row_ids)
+        mask = self._filter_mask(filters, size) if filters else self._alive[:size]
+
+        queries = np.stack([self._query_vector(query_embedding) for query_embedding in query_embeddings])
+        matches = int(mask.sum())
+        if matches < size * _GATHER_FRACTION:
+            # Copying the few matching rows is cheaper than scoring the whole matrix
+            candidates = np.flatnonzero(mask)
+            batch_scores = queries @ self._matrix[candidates].T
+            mask = np.ones(matches, dtype=bool)
+        else:
+            candidates = None
+            batch_scores = queries @ self._matrix[:size].T
+
+        results = []
+        for scores in batch_scores:
+            rows, scores = self._top_k(scores, mask, top_k)
+            if candidates is not None:
+                rows = candidates[rows]
+            documents = []
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                if scale_score:
+                    score = self._scale(score)
+                embedding = self._embedding(row) if return_embedding else None
+                documents.append(replace(self._documents[self._row_ids[row]], score=score, embedding=embedding))
+            results.append(documents)
+        return results
+
+    def _filter_mask(self, filters: Dict[str, Any], size: int) -> np.ndarray:
+        """Rows of live documents matching `filters`, from the meta index where possible."""
+        alive = self._alive[:size]
+        mask = self._indexed_mask(filters, size)
+        if mask is not None:
+            return mask & alive
+
+        # Narrow an AND by its indexed conditions and check only the rest per document
+        rest = filters
+        mask = alive.copy()
+        if filters.get("operator") == "AND" and "field" not in filters:
+            rest_conditions = []
+            for condition in filters.get("conditions", []):
+                condition_mask = self._indexed_mask(condition, size)
+                if condition_mask is None:
+                    rest_conditions.append(condition)
+                else:
+                    mask &= condition_mask
+            rest = {"operator": "AND", "conditions": rest_conditions}
+        for row in np.flatnonzero(mask):
+            mask[row] = _matches(rest, self._documents[self._row_ids[row]])
+        return mask
+
+    def _indexed_mask(self, condition: Dict[str, Any], size: int) -> Optional[np.ndarray]:
+        """Rows matching `condition`, or `None` if it needs a field that is not indexed."""
+        operator = condition.get("operator")
+        if "field" not in condition:
+            if operator not in ("AND", "OR", "NOT") or not condition.get("conditions"):
+                return None
+            masks = [self._indexed_mask(sub_condition, size) for sub_condition in condition["conditions"]]
+            if any(mask is None for mask in masks):
+                return None
+            if operator == "OR":
+                return np.logical_or.reduce(masks)
+            matched = np.logical_and.reduce(masks)
+            return ~matched if operator == "NOT" else matched
+
+        field = condition["field"]
+        index = self._meta_rows.get(field[len("meta."):]) if field.startswith("meta.") else None
+        value = condition.get("value")
+        if index is None or operator not in ("==", "!=", "in", "not in"):
+            return None
+        values = value if operator in ("in", "not in") else [value]
+        # None matches missing fields and a list value compares whole, neither of which is indexed
+        if not isinstance(values, list) or any(v is None or not _hashable(v) for v in values):
+            return None
+        mask = np.zeros(size, dtype=bool)
+        for v in values:
+            rows = index.get(v)
+            if rows:
+                mask[np.fromiter(rows, dtype=np.int64, count=len(rows))] = True
+        return ~mask if operator in ("!=", "not in") else mask
+
+    def _value_rows(self, document: Optional[Document], create: bool = False) -> List[Set[int]]:
+        """The row sets of the indexed meta values of `document`."""
+        if document is None:
+            return []
+        found = []
+        for field, index in self._meta_rows.items():
+            value = document.meta.get(field)
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            for v in values:
+                if v is None or not _hashable(v):
+                    continue
+                rows = index.setdefault(v, set()) if create else index.get(v)
+                if rows is not None:
+                    found.append(rows)
+        return found
+
+    def _query_vector(self, query_embedding: List[float]) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if self.embedding_similarity_function == "cosine":
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+        return query
+
+    def _top_k(self, scores: np.ndarray, mask: np.ndarray, top_k: int):
+        size = mask.shape[0]
+        scores[~mask] = -np.inf
+        candidates = int(mask.sum())
+        k = min(top_k, candidates)
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if k < size:
+            rows = np.argpartition(-scores, k - 1)[:k]
+        else:
+            rows = np.arange(size)[mask]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return rows, scores[rows]
+
+    def _scale(self, score: float) -> float:
+        if self.embedding_similarity_function == "cosine":
+            return (score + 1) / 2
+        return float(1 / (1 + np.exp(-score / 100)))
+
+    def _allocate_rows(self, count: int, dimensions: int) -> np.ndarray:
+        if self._matrix is None:
+            capacity = max(self.initial_capacity, count)
+            self._matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+            self._norms = np.ones(capacity, dtype=np.float32)
+            self._alive = np.zeros(capacity, dtype=bool)
+        elif self._matrix.shape[1] != dimensions:
+            raise ValueError(
+                f"Embedding has {dimensions} dimensions but the store holds {self._matrix.shape[1]}."
+            )
+
+        reused = [self._free_rows.pop() for _ in range(min(count, len(self._free_rows)))]
+        start = len(self._row_ids)
+        new = count - len(reused)
+        if start + new > self._matrix.shape[0]:
+            capacity = max(2 * self._matrix.shape[0], start + new)
+            matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+            matrix[:start] = self._matrix[:start]
+            norms = np.ones(capacity, dtype=np.float32)
+            norms[:start] = self._norms[:start]
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:start] = self._alive[:start]
+            self._matrix, self._norms, self._alive = matrix, norms, alive
+        self._row_ids.extend([None] * new)
+        return np.array(reused + list(range(start, start + new)), dtype=np.int64)
+
+    def _embedding(self, row: int) -> List[float]:
+        return (self._matrix[row] * self._norms[row]).tolist()
+
+    def _with_embedding(self, document: Document) -> Document:
+        row = self._rows.get(document.id)
+        if row is None:
+            return document
+        return replace(document, embedding=self._embedding(row))
+
+
+def _matches(filters: Dict[str, Any], document: Document) -> bool:
+    """`document_matches_filter`, except that a list meta value matches `==` and `in` by any element."""
+    if "field" not in filters:
+        operator = filters.get("operator")
+        if operator not in ("AND", "OR", "NOT") or "conditions" not in filters:
+            # Raises the same FilterError as for any other malformed filter
+            return document_matches_filter(filters, document)
+        matched = (_matches(condition, document) for condition in filters["conditions"])
+        if operator == "OR":
+            return any(matched)
+        return all(matched) != (operator == "NOT")
+
+    field, operator, value = filters["field"], filters.get("operator"), filters.get("value")
+    key = field[len("meta."):] if field.startswith("meta.") else None
+    if key and "." not in key and operator in ("==", "!=", "in", "not in"):
+        document_value = document.meta.get(key)
+        # As in `_value_rows`; a list filter value for `==` still compares whole
+        by_element = operator in ("in", "not in") or not isinstance(value, list)
+        if isinstance(document_value, (list, tuple, set)) and by_element:
+            values = value if operator in ("in", "not in") else [value]
+            if not isinstance(values, list):
+                return document_matches_filter(filters, document)
+            found = any(element in values for element in document_value)
+            return found != (operator in ("!=", "not in"))
+    return document_matches_filter(filters, document)
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+@component
+class NumpyEmbeddingRetriever:
+    """
+    Retrieves documents from a `NumpyDocumentStore` using vector similarity.
+
+    Takes the same inputs as `InMemoryEmbeddingRetriever`, so it fits the same
+    pipeline slot.
+    """
+
+    def __init__(
+        self,
+        document_store: NumpyDocumentStore,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        scale_score: bool = False,
+        return_embedding: bool = False,
+    ):
+        """
+        :param document_store: An instance of NumpyDocumentStore.
+        :param filters: A dictionary with filters to narrow down the search space.
+        :param top_k: The maximum number of documents to retrieve.
+        :param scale_score: Whether to scale the scores to the range 0 to 1.
+        :param return_embedding: Whether to return the embedding of the retrieved Documents.
+        """
+        if not isinstance(document_store, NumpyDocumentStore):
+            raise ValueError("document_store must be an instance of NumpyDocumentStore")
+        if top_k <= 0:
+            raise ValueError(f"top_k must be greater than 0. Currently, top_k is {top_k}")
+        self.document_store = document_store
+        self.filters = filters
+        self.top_k = top_k
+        self.scale_score = scale_score
+        self.return_embedding = return_embedding
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            document_store=self.document_store.to_dict(),
+            filters=self.filters,
+            top_k=self.top_k,
+            scale_score=self.scale_score,
+            return_embedding=self.return_embedding,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NumpyEmbeddingRetriever":
+        init_params = data["init_parameters"]
+        init_params["document_store"] = NumpyDocumentStore.from_dict(init_params["document_store"])
+        return default_from_dict(cls, data)
+
+    @component.output_types(documents=List[Document])
+    def run(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+        scale_score: Optional[bool] = None,
+        return_embedding: Optional[bool] = None,
+    ):
+        """
+        Run the retriever on the given query embedding.
+
+        :param query_embedding: Embedding of the query.
+        :param filters: A dictionary with filters to narrow down the search space.
+        :param top_k: The maximum number of documents to return.
+        :param scale_score: Whether to scale the scores to the range 0 to 1.
+        :param return_embedding: Whether to return the embedding of the retrieved Documents.
+        :return: The retrieved documents.
+        """
+        documents = self.document_store.embedding_retrieval(
+            query_embedding=query_embedding,
+            filters=filters or self.filters,
+            top_k=top_k or self.top_k,
+            scale_score=self.scale_score if scale_score is None else scale_score,
+            return_embedding=self.return_embedding if return_embedding is None else return_embedding,
+        )
+        return {"documents": documents}
@@ -0,0 +1,231 @@
+"""TTL cache of query embeddings and retrieval results for the query pipelines."""
+from array import array
+from dataclasses import replace
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from haystack import Document, component
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, expires REAL);
+CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, hits TEXT, expires REAL);
+CREATE TABLE IF NOT EXISTS result_documents (document_id TEXT, result_key TEXT);
+CREATE INDEX IF NOT EXISTS result_documents_by_id ON result_documents (document_id);
+"""
+
+
+class QueryCache:
+    """Query embeddings and the ids of the documents they retrieved, for `ttl`.
+
+    Embeddings are keyed on the whitespace-normalized query text and
+    the embedding model. Results are keyed on the query embedding with
+    the filters and `top_k` of the search, and hold the ids and scores
+    of the top documents. `invalidate` drops every result holding one
+    of the given document ids, so the indexer calls it for the ids it
+    writes or deletes.
+
+    With a `path` the cache is a SQLite file that several processes
+    can share, such as the query notebook and the streaming indexer.
+    Without one it lives in memory.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, ttl: timedelta = timedelta(minutes=10)):
+        """
+        :param path: SQLite file to keep the cache in. `None` keeps it in memory.
+        :param ttl: How long an entry is served after it was stored.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path) if path is not None else ":memory:",
+                                   timeout=30, check_same_thread=False, isolation_level=None)
+        if path is not None:
+            # Readers are not blocked while the indexer invalidates
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    @staticmethod
+    def embedding_key(text: str, model: str) -> str:
+        """Hash whitespace-normalized text together with the model name."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def result_key(embedding: List[float], filters: Optional[Dict[str, Any]], top_k: Optional[int]) -> str:
+        """Hash the float32 bytes of the embedding with the search parameters."""
+        digest = hashlib.sha256(array("f", embedding).tobytes())
+        digest.update(json.dumps([filters, top_k], sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_embedding(self, key: str) -> Optional[List[float]]:
+        row = self._get("SELECT vector FROM embeddings WHERE key = ? AND expires > ?", key)
+        return array("f", row[0]).tolist() if row else None
+
+    def put_embedding(self, key: str, embedding: List[float]) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                             (key, array("f", embedding).tobytes(), self._expires()))
+
+    def get_result(self, key: str) -> Optional[List[Tuple[str, Optional[float]]]]:
+        """Ids and scores of the documents a search returned, best first."""
+        row = self._get("SELECT hits FROM results WHERE key = ? AND expires > ?", key)
+        return [tuple(hit) for hit in json.loads(row[0])] if row else None
+
+    def put_result(self, key: str, hits: List[Tuple[str, Optional[float]]]) -> None:
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            self._purge()
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, json.dumps(hits), self._expires()))
+            self._db.execute("DELETE FROM result_documents WHERE result_key = ?", (key,))
+            self._db.executemany("INSERT INTO result_documents VALUES (?, ?)", [(doc_id, key) for doc_id, _ in hits])
+
+    def invalidate(self, document_ids: Iterable[str]) -> int:
+        """Drop every result holding one of `document_ids`; return how many were dropped."""
+        ids = [(doc_id,) for doc_id in document_ids]
+        if not ids:
+            return 0
+        with self._lock, self._db:
+            self._db.execute("BEGIN")
+            before = self._db.total_changes
+            self._db.executemany(
+                "DELETE FROM results WHERE key IN (SELECT result_key FROM result_documents WHERE document_id = ?)", ids
+            )
+            dropped = self._db.total_changes - before
+            self._db.execute("DELETE FROM result_documents WHERE result_key NOT IN (SELECT key FROM results)")
+        if dropped:
+            logger.info("Invalidated %d cached query results", dropped)
+        return dropped
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "lookups": lookups,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _get(self, query: str, key: str) -> Optional[Tuple[Any, ...]]:
+        with self._lock:
+            row = self._db.execute(query, (key, time.time())).fetchone()
+        if row:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return row
+
+    def _expires(self) -> float:
+        return time.time() + self.ttl.total_seconds()
+
+    def _purge(self) -> None:
+        now = time.time()
+        self._db.execute("DELETE FROM embeddings WHERE expires <= ?", (now,))
+        self._db.execute("DELETE FROM results WHERE expires <= ?", (now,))
+        self._db.execute("DELETE FROM result_documents WHERE result_key NOT IN (SELECT key FROM results)")
+
+
+@component
+class CachedTextEmbedder:
+    """
+    Drop-in wrapper for `OpenAITextEmbedder` that only calls it for
+    queries whose embedding is not cached.
+    """
+
+    def __init__(self, embedder: Any, cache: Optional[QueryCache] = None):
+        """
+        :param embedder: The text embedder to call on cache misses.
+        :param cache: Cache to use. Defaults to an in-memory `QueryCache`.
+        """
+        self.embedder = embedder
+        self.cache = cache or QueryCache()
+        # Azure embedders are keyed on their deployment rather than a model name.
+        self.model = getattr(embedder, "model", None) or getattr(embedder, "azure_deployment", "")
+
+    @component.output_types(embedding=List[float], meta=Dict[str, Any])
+    def run(self, text: str):
+        """
+        Embed a query, reusing the cached vector for a repeated question.
+
+        :param text: Query to embed.
+        :return: The embedding and the wrapped embedder's meta, or only
+            the cache statistics on a hit.
+        """
+        # Keyed on the text as embedded, so embedders with different prefixes do not share vectors
+        embedded_text = getattr(self.embedder, "prefix", "") + text + getattr(self.embedder, "suffix", "")
+        key = QueryCache.embedding_key(embedded_text, self.model)
+        embedding = self.cache.get_embedding(key)
+        meta: Dict[str, Any] = {}
+        if embedding is None:
+            result = self.embedder.run(text=text)
+            embedding, meta = result["embedding"], result.get("meta", {})
+            self.cache.put_embedding(key, embedding)
+        meta["cache"] = self.cache.stats()
+        return {"embedding": embedding, "meta": meta}
+
+
+@component
+class CachedEmbeddingRetriever:
+    """
+    Drop-in wrapper for an embedding retriever that answers repeated
+    searches from the ids of the documents it returned last time.
+
+    A hit loads those documents by id instead of running the vector
+    search. If any of them is gone from the store, the entry is
+    dropped and the search runs again.
+    """
+
+    def __init__(self, retriever: Any, cache: Optional[QueryCache] = None):
+        """
+        :param retriever: The embedding retriever to call on cache misses,
+            e.g. `ElasticsearchEmbeddingRetriever` or `InMemoryEmbeddingRetriever`.
+        :param cache: Cache to use; share it with the `CachedTextEmbedder`.
+            Defaults to an in-memory `QueryCache`.
+        """
+        self.retriever = retriever
+        self.cache = cache or QueryCache()
+        # Elasticsearch retrievers keep the store in a private attribute
+        self.document_store = getattr(retriever, "document_store", None) or retriever._document_store
+
+    @component.output_types(documents=List[Document])
+    def run(self, query_embedding: List[float], filters: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None):
+        """
+        Retrieve documents for a query embedding, from the cache when possible.
+
+        :param query_embedding: Embedding of the query.
+        :param filters: Filters passed to the wrapped retriever.
+        :param top_k: Maximum number of documents to return.
+        :return: The retrieved documents, best first.
+        """
+        key = QueryCache.result_key(query_embedding, filters or self.retriever.filters, top_k or self.retriever.top_k)
+        hits = self.cache.get_result(key)
+        if hits is not None:
+            documents = self._load(hits)
+            if documents is not None:
+                return {"documents": documents}
+            self.cache.invalidate([doc_id for doc_id, _ in hits])
+
+        documents = self.retriever.run(query_embedding=query_embedding, filters=filters, top_k=top_k)["documents"]
+        self.cache.put_result(key, [(document.id, document.score) for document in documents])
+        return {"documents": documents}
+
+    def _load(self, hits: List[Tuple[str, Optional[float]]]) -> Optional[List[Document]]:
+        if not hits:
+            return []
+        ids = [doc_id for doc_id, _ in hits]
+        found = {
+            document.id: document
+            for document in self.document_store.filter_documents({"field": "id", "operator": "in", "value": ids})
+        }
+        if len(found) < len(ids):
+            return None
+        return [replace(found[doc_id], score=score) for doc_id, score in hits]
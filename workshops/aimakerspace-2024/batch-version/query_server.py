@@ -0,0 +1,204 @@
+"""Asyncio serving layer that answers many questions through one retriever pipeline."""
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+from haystack import Document, Pipeline
+from openai import AsyncOpenAI
+
+from numpy_document_store import NumpyEmbeddingRetriever
+
+logger = logging.getLogger(__name__)
+
+# A question waiting for its batch, with the future its documents are delivered to
+_Pending = Tuple[str, "asyncio.Future[List[Document]]"]
+
+
+class QueryServer:
+    """
+    Serve concurrent questions with the components of a retriever pipeline.
+
+    Questions that arrive within `max_wait` of the first one waiting,
+    up to `max_batch_size` of them, are embedded with one embeddings
+    request and searched together: with one matrix product when the
+    retriever is a `NumpyEmbeddingRetriever`, otherwise one retriever
+    call each in a thread. Every question then gets its own prompt from
+    the pipeline's prompt builder, and the answer is streamed from the
+    chat completions API as it is generated.
+
+        server = QueryServer(build_retriever_pipeline(document_store, open_ai_key))
+        async for token in server.stream(question):
+            print(token, end="")
+
+    The pipeline must have the components of `build_retriever_pipeline`:
+    `text_embedder` (an `OpenAITextEmbedder`, optionally wrapped in a
+    `CachedTextEmbedder`), `retriever`, `prompt_builder` and `llm` (an
+    `OpenAIGenerator`). The pipeline itself is not run.
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        max_batch_size: int = 32,
+        max_wait: timedelta = timedelta(milliseconds=10),
+        max_batches_in_flight: int = 4,
+    ):
+        """
+        :param pipeline: Retriever pipeline to take the components from.
+        :param max_batch_size: Most questions embedded and searched together.
+        :param max_wait: Longest time the first question of a batch waits for others.
+        :param max_batches_in_flight: Batches embedded and searched at the same time.
+        """
+        embedder = pipeline.get_component("text_embedder")
+        # A `CachedTextEmbedder` is bypassed for its cache and wrapped embedder
+        self._cache = getattr(embedder, "cache", None)
+        self._embedder = getattr(embedder, "embedder", embedder)
+        self._retriever = pipeline.get_component("retriever")
+        self._prompt_builder = pipeline.get_component("prompt_builder")
+        self._generator = pipeline.get_component("llm")
+
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_sizes: List[int] = []
+
+        self._embeddings_client = _async_client(self._embedder)
+        self._chat_client = _async_client(self._generator)
+        self._max_batches_in_flight = max_batches_in_flight
+        self._queue: Optional["asyncio.Queue[_Pending]"] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "QueryServer":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def retrieve(self, question: str) -> List[Document]:
+        """Documents for `question`, searched in a batch with concurrent questions."""
+        if self._batcher is None:
+            # Started here so the queue belongs to the running event loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self._max_batches_in_flight)
+            self._batcher = asyncio.create_task(self._batch_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((question, future))
+        return await future
+
+    async def stream(self, question: str) -> AsyncIterator[str]:
+        """Yield the answer to `question` piece by piece as the model writes it."""
+        documents = await self.retrieve(question)
+        prompt = self._prompt_builder.run(documents=documents, question=question)["prompt"]
+        messages = []
+        if self._generator.system_prompt:
+            messages.append({"role": "system", "content": self._generator.system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        response = await self._chat_client.chat.completions.create(
+            model=self._generator.model, messages=messages, stream=True, **self._generator.generation_kwargs
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def answer(self, question: str) -> str:
+        """The whole answer to `question`."""
+        return "".join([token async for token in self.stream(question)])
+
+    async def close(self) -> None:
+        """Answer the batches already running, cancel the questions still waiting and close the clients."""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, *self._batches, return_exceptions=True)
+            self._batcher = None
+            # Nothing takes these off the queue any more, so their callers would wait forever
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+        await self._embeddings_client.close()
+        await self._chat_client.close()
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            try:
+                deadline = loop.time() + self.max_wait.total_seconds()
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                # Questions keep queueing while every slot is busy, so batches grow under load
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                # Closed before the batch was started, so its questions are cancelled with it
+                for _, future in batch:
+                    future.cancel()
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[_Pending]) -> None:
+        try:
+            self.batch_sizes.append(len(batch))
+            embeddings = await self._embed([question for question, _ in batch])
+            results = await self._search(embeddings)
+            for (_, future), documents in zip(batch, results):
+                if not future.done():
+                    future.set_result(documents)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            self._slots.release()
+
+    async def _embed(self, questions: List[str]) -> List[List[float]]:
+        texts = [self._embedder.prefix + question + self._embedder.suffix for question in questions]
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        keys: List[Optional[str]] = [None] * len(texts)
+        if self._cache is not None:
+            for index, text in enumerate(texts):
+                keys[index] = self._cache.embedding_key(text, self._embedder.model)
+                embeddings[index] = self._cache.get_embedding(keys[index])
+
+        missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            extra: Dict[str, Any] = {"dimensions": self._embedder.dimensions} if self._embedder.dimensions else {}
+            response = await self._embeddings_client.embeddings.create(
+                model=self._embedder.model, input=[texts[index] for index in missing], **extra
+            )
+            for item in response.data:
+                index = missing[item.index]
+                embeddings[index] = item.embedding
+                if self._cache is not None:
+                    self._cache.put_embedding(keys[index], item.embedding)
+        return embeddings
+
+    async def _search(self, embeddings: List[List[float]]) -> List[List[Document]]:
+        loop = asyncio.get_running_loop()
+        retriever = self._retriever
+        # The search is CPU work, so it runs off the event loop
+        if isinstance(retriever, NumpyEmbeddingRetriever):
+            return await loop.run_in_executor(None, lambda: retriever.document_store.embedding_retrieval_batch(
+                embeddings, filters=retriever.filters, top_k=retriever.top_k,
+                scale_score=retriever.scale_score, return_embedding=retriever.return_embedding,
+            ))
+        results = await asyncio.gather(*[
+            loop.run_in_executor(None, lambda embedding=embedding: retriever.run(query_embedding=embedding))
+            for embedding in embeddings
+        ])
+        return [result["documents"] for result in results]
+
+
+def _async_client(component: Any) -> AsyncOpenAI:
+    """An async client with the settings of the component's sync one."""
+    client = component.client
+    return AsyncOpenAI(api_key=client.api_key, organization=client.organization, base_url=client.base_url)
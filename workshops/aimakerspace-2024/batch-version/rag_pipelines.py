@@ -8,7 +8,6 @@ from pathlib import Path
 from haystack.document_stores.types import DuplicatePolicy
 from haystack.utils import Secret
 from haystack_integrations.components.converters.unstructured import UnstructuredFileConverter
-from haystack.components.fetchers import LinkContentFetcher
 from haystack.components.converters import HTMLToDocument
 from haystack.document_stores.in_memory import InMemoryDocumentStore 
 
@@ -18,8 +17,13 @@ from haystack.components.retrievers.in_memory import InMemoryEmbeddingRetriever
 from haystack.components.builders import PromptBuilder
 from haystack.components.generators import OpenAIGenerator
 
+from async_fetcher import AsyncFetcher
+from jsonl_mmap import JsonlLines
+from numpy_document_store import NumpyDocumentStore, NumpyEmbeddingRetriever
+from query_cache import CachedEmbeddingRetriever, CachedTextEmbedder, QueryCache
+
 from haystack import component, Document
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 from haystack.dataclasses import ByteStream
 from dotenv import load_dotenv
 import os
@@ -44,7 +48,9 @@ class JSONLReader():
         # Set up cleaning mechanism
         regex_pattern = r"(?i)\bloading\s*\.*\s*|(\s*--\s*-\s*)+"
 
-        fetcher = LinkContentFetcher(retry_attempts=3, timeout=10)
+        # Fetches the URLs of each batch of lines concurrently, over pooled connections
+        self.fetcher = AsyncFetcher(max_concurrency=16, rate_limits={"www.sec.gov": 10},
+                                    retry_attempts=3, timeout=10)
         converter = HTMLToDocument()
         document_cleaner = DocumentCleaner(
                             remove_empty_lines=True,
@@ -58,12 +64,10 @@ class JSONLReader():
         self.pipeline = Pipeline()
 
         # Add components
-        self.pipeline.add_component("fetcher", fetcher)
         self.pipeline.add_component("converter", converter)
         self.pipeline.add_component("cleaner", document_cleaner)
 
         # Connect components
-        self.pipeline.connect("fetcher", "converter")
         self.pipeline.connect("converter", "cleaner")
 
     @component.output_types(documents=List[Document])
@@ -76,47 +80,56 @@ class JSONLReader():
         """
         documents = []
         for source in sources:
-            file_content = self._extract_content(source)
-            for line in file_content.strip().split('\n'):
-                if line.strip():
-                    data = json.loads(line)
-                    
-                    # Handle both direct dictionaries and lists with [null, {dict}] format
-                    if isinstance(data, list) and len(data) == 2 and isinstance(data[1], dict):
-                        data = data[1]  # Use the dictionary from the list
-                    elif not isinstance(data, dict):
-                        print(f"Unexpected format or missing data in line: {data}")
-                        continue  # Skip lines that do not match expected format
-                    
-                    # Extract URL and modify it if necessary
-                    url = data.get(self.link_keyword)
-                    if url and '-index.html' in url:
-                        url = url.replace('-index.html', '.txt')
-
-                    else:
-                        metadata = {field: data.get(field) for field in self.metadata_fields if field in data}
-                        # Assume a pipeline fetches and processes this URL
-                        doc = self.pipeline.run({"fetcher": {"urls": [url]}})
-                        document = doc['cleaner']['documents'][0].content
-
-                        # Create a document with fetched content and extracted metadata
-                        documents.append(Document(content=document, meta=metadata))
+            for batch in self._batches(source):
+                urls, metadatas = [], []
+                for line in batch:
+                    if line.strip():
+                        data = json.loads(line)
+                        
+                        # Handle both direct dictionaries and lists with [null, {dict}] format
+                        if isinstance(data, list) and len(data) == 2 and isinstance(data[1], dict):
+                            data = data[1]  # Use the dictionary from the list
+                        elif not isinstance(data, dict):
+                            print(f"Unexpected format or missing data in line: {data}")
+                            continue  # Skip lines that do not match expected format
+                        
+                        # Extract URL and modify it if necessary
+                        url = data.get(self.link_keyword)
+                        if url and '-index.html' in url:
+                            url = url.replace('-index.html', '.txt')
+
+                        elif url:
+                            urls.append(url)
+                            metadatas.append({field: data.get(field) for field in self.metadata_fields if field in data})
+
+                # The batch's URLs are fetched at once; documents keep the order of the lines
+                for index, stream in self.fetcher.fetch(urls, ordered=True):
+                    if stream is None:
+                        continue
+                    doc = self.pipeline.run({"converter": {"sources": [stream]}})
+                    document = doc['cleaner']['documents'][0].content
+
+                    # Create a document with fetched content and extracted metadata
+                    documents.append(Document(content=document, meta=metadatas[index]))
 
         return documents
 
-    def _extract_content(self, source: Union[str, Path, ByteStream]) -> str:
+    def _batches(self, source: Union[str, Path, ByteStream]) -> Iterator[List[bytes]]:
         """
-        Extracts content from the given data source.
-        :param source: The data source to extract content from.
-        :return: The extracted content as a string.
+        Yields the lines of the given data source in batches, without reading it whole.
+        Files are memory-mapped, so only the current batch is copied into memory.
+        :param source: The data source to read lines from.
+        :return: Lists of lines as bytes.
         """
         if isinstance(source, (str, Path)):
-            with open(source, 'r', encoding='utf-8') as file:
-                return file.read()
+            lines = JsonlLines.open(source)
         elif isinstance(source, ByteStream):
-            return source.data.decode('utf-8')
+            lines = JsonlLines(source.data)
         else:
             raise ValueError(f"Unsupported source type: {type(source)}")
+        with lines:
+            for batch, _offset in lines.batches():
+                yield batch
 
 def build_indexing_pipeline(document_store):
 
@@ -138,18 +151,28 @@ def build_indexing_pipeline(document_store):
 
 
 
-def build_retriever_pipeline(document_store, open_ai_key):
+def build_retriever_pipeline(document_store, open_ai_key, query_cache: Optional[QueryCache] = None):
     """
     Create a pipeline for retrieving documents from the document store.
     
-    :param document_store: DocumentStore to read the documents from.
+    :param document_store: DocumentStore to read the documents from, either an
+        InMemoryDocumentStore or a NumpyDocumentStore.
     :param open_ai_key: OpenAI API key.
+    :param query_cache: Cache of query embeddings and retrieved document ids.
+        Repeated questions then skip the embedding call and the vector search.
+        Call `query_cache.invalidate(ids)` after rewriting documents.
     
     :return: Pipeline for retrieving documents.
     """
 
     text_embedder = OpenAITextEmbedder(api_key = Secret.from_token(open_ai_key))
-    retriever = InMemoryEmbeddingRetriever(document_store)
+    if isinstance(document_store, NumpyDocumentStore):
+        retriever = NumpyEmbeddingRetriever(document_store)
+    else:
+        retriever = InMemoryEmbeddingRetriever(document_store)
+    if query_cache is not None:
+        text_embedder = CachedTextEmbedder(text_embedder, query_cache)
+        retriever = CachedEmbeddingRetriever(retriever, query_cache)
     generator = OpenAIGenerator(api_key = Secret.from_token(open_ai_key), 
         model="gpt-3.5-turbo")
 
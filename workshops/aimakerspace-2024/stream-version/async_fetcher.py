@@ -0,0 +1,310 @@
+"""Concurrent URL fetching stage for the Bytewax dataflow."""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, as_completed, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import logging
+import threading
+import time
+
+import httpx
+from bytewax import operators as op
+from bytewax.dataflow import Stream, operator
+from bytewax.operators import UnaryLogic
+from haystack.dataclasses import ByteStream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+
+class _HostRateLimiter:
+    """Space out request start times so a host never sees more than `rate` per second."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate
+        self._next_start = 0.0
+
+    def delay(self) -> float:
+        """Seconds until a request to the host may start."""
+        return self._next_start - time.monotonic()
+
+    def start(self) -> None:
+        self._next_start = time.monotonic() + self._interval
+
+
+def _retryable(error: httpx.HTTPError) -> bool:
+    # Other client errors, like 404 or 403, will not go away on a retry.
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class AsyncFetcher:
+    """
+    Fetch many URLs concurrently over a pool of keep-alive connections.
+
+    Requests run on an event loop in a background thread, so callers
+    submit URLs and collect finished fetches without blocking on the
+    rest. A fetcher is not shared between Bytewax workers; build one per
+    worker with `per_worker`.
+
+    Results are returned as `ByteStream`s with the same `url` and
+    `content_type` metadata `LinkContentFetcher` produces, so they can be
+    fed straight into `HTMLToDocument`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        rate_limits: Optional[Dict[str, float]] = None,
+        retry_attempts: int = 2,
+        timeout: float = 10,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        """
+        :param max_concurrency: Maximum number of requests in flight at once.
+        :param rate_limits: Maximum requests per second by host name,
+            for example `{"www.sec.gov": 10}`. Hosts not listed are unlimited.
+        :param retry_attempts: How many times to retry a request that failed
+            with a connection error, a timeout, a 429 or a 5xx response.
+        :param timeout: Timeout in seconds for each request.
+        :param headers: Headers sent with every request. Defaults to browser-like headers.
+        """
+        self.max_concurrency = max_concurrency
+        self.rate_limits = rate_limits or {}
+        self.retry_attempts = retry_attempts
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+
+        # One loop and client per fetcher so connections are reused across batches.
+        # The loop is started on the first submit.
+        self._loop = asyncio.new_event_loop()
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._limiters: Dict[str, _HostRateLimiter] = {}
+
+    def submit(self, url: str) -> "Future[Optional[ByteStream]]":
+        """
+        Start fetching `url`.
+
+        :param url: URL to fetch.
+        :return: A future of the fetched stream, or of `None` when the URL
+            could not be fetched.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop.run_forever, name="async-fetcher", daemon=True)
+            self._thread.start()
+        return asyncio.run_coroutine_threadsafe(self._fetch_one(url), self._loop)
+
+    def fetch(self, urls: List[str], ordered: bool = False) -> Iterator[Tuple[int, Optional[ByteStream]]]:
+        """
+        Fetch `urls` concurrently, yielding each result as soon as it is ready.
+
+        :param urls: URLs to fetch.
+        :param ordered: Yield results in the order of `urls` rather than
+            in the order they complete.
+        :return: `(index into urls, stream)` pairs. `stream` is `None`
+            when the URL could not be fetched.
+        """
+        futures = {self.submit(url): index for index, url in enumerate(urls)}
+        for future in (futures if ordered else as_completed(futures)):
+            yield futures[future], future.result()
+
+    def close(self) -> None:
+        if self._thread is not None:
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+                self._client = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+        self._loop.close()
+
+    async def _fetch_one(self, url: str) -> Optional[ByteStream]:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        limiter = self._limiter(url)
+        for attempt in range(self.retry_attempts + 1):
+            if attempt:
+                # Backs off outside the concurrency limit, like the rate limit wait
+                await asyncio.sleep(0.5 * attempt)
+            try:
+                response = await self._get(url, limiter)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.debug("Attempt %d for %s failed: %s", attempt + 1, url, e)
+                if not _retryable(e):
+                    break
+                continue
+            content_type = response.headers.get("Content-Type", "text/html").split(";")[0].strip()
+            return ByteStream(data=response.content,
+                              meta={"content_type": content_type, "url": url},
+                              mime_type=content_type)
+        logger.warning("Couldn't retrieve content from %s", url)
+        return None
+
+    async def _get(self, url: str, limiter: Optional[_HostRateLimiter]) -> httpx.Response:
+        # Waits for the host's rate limit without holding a concurrency
+        # slot, so a throttled host does not hold up the others.
+        while True:
+            if limiter is not None and limiter.delay() > 0:
+                await asyncio.sleep(limiter.delay())
+                continue
+            async with self._semaphore:
+                # Another request may have taken the host's turn while this one waited for a slot
+                if limiter is not None:
+                    if limiter.delay() > 0:
+                        continue
+                    limiter.start()
+                return await self._client.get(url)
+
+    def _limiter(self, url: str) -> Optional[_HostRateLimiter]:
+        host = urlsplit(url).hostname or ""
+        rate = self.rate_limits.get(host)
+        if rate is None:
+            return None
+        if host not in self._limiters:
+            self._limiters[host] = _HostRateLimiter(rate)
+        return self._limiters[host]
+
+
+# Events fetched but not emitted yet, oldest first.
+_FetchState = List[Dict[str, Any]]
+
+
+class _FetchLogic(UnaryLogic[Dict[str, Any], Tuple[Dict[str, Any], ByteStream], _FetchState]):
+    def __init__(
+        self,
+        fetcher: AsyncFetcher,
+        get_url: Callable[[Dict[str, Any]], Optional[str]],
+        ordered: bool,
+        max_in_flight: int,
+        poll_interval: timedelta,
+        resume_state: Optional[_FetchState],
+    ):
+        self._fetcher = fetcher
+        self._get_url = get_url
+        self._ordered = ordered
+        self._max_in_flight = max_in_flight
+        self._poll_interval = poll_interval
+        self._pending: Deque[Tuple[Dict[str, Any], Future]] = deque()
+        for event in resume_state or []:
+            self._submit(event)
+
+    def on_item(self, value: Dict[str, Any]) -> Tuple[Iterable[Tuple[Dict[str, Any], ByteStream]], bool]:
+        emitted = []
+        # Backpressure: block the worker while `max_in_flight` fetches are pending.
+        while len(self._pending) >= self._max_in_flight:
+            if self._ordered:
+                # Nothing is emitted before the oldest fetch, so waiting on any other would spin
+                wait([self._pending[0][1]])
+            else:
+                wait([future for _, future in self._pending], return_when=FIRST_COMPLETED)
+            emitted.extend(self._drain())
+        self._submit(value)
+        emitted.extend(self._drain())
+        return emitted, UnaryLogic.RETAIN
+
+    def on_notify(self) -> Tuple[Iterable[Tuple[Dict[str, Any], ByteStream]], bool]:
+        return self._drain(), UnaryLogic.RETAIN
+
+    def on_eof(self) -> Tuple[Iterable[Tuple[Dict[str, Any], ByteStream]], bool]:
+        wait([future for _, future in self._pending])
+        return self._drain(), UnaryLogic.RETAIN
+
+    def notify_at(self) -> Optional[datetime]:
+        if self._pending:
+            return datetime.now(timezone.utc) + self._poll_interval
+        return None
+
+    def snapshot(self) -> _FetchState:
+        # Fetches not emitted yet are started again after a resume.
+        return [event for event, _ in self._pending]
+
+    def _submit(self, event: Dict[str, Any]) -> None:
+        self._pending.append((event, self._fetcher.submit(self._get_url(event))))
+
+    def _drain(self) -> List[Tuple[Dict[str, Any], ByteStream]]:
+        """Emit finished fetches; when ordered, only those with no unfinished one before them."""
+        emitted = []
+        remaining: Deque[Tuple[Dict[str, Any], Future]] = deque()
+        for event, future in self._pending:
+            if future.done() and not (self._ordered and remaining):
+                stream = future.result()
+                if stream is not None:
+                    emitted.append((event, stream))
+            else:
+                remaining.append((event, future))
+        self._pending = remaining
+        return emitted
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+@operator
+def fetch_urls(
+    step_id: str,
+    up: Stream[Dict[str, Any]],
+    fetcher: Callable[[], AsyncFetcher],
+    get_url: Callable[[Dict[str, Any]], Optional[str]],
+    ordered: bool = False,
+    max_in_flight: int = 64,
+    poll_interval: timedelta = timedelta(milliseconds=10),
+) -> Stream[Tuple[Dict[str, Any], ByteStream]]:
+    """Fetch the URL of every event, emitting each as soon as its fetch completes.
+
+    Events are keyed by the host of their URL, so all requests to one
+    host, and its rate limit, stay on one worker while different hosts
+    are fetched on different workers. Events whose URL is missing or
+    could not be fetched are dropped.
+
+    :arg step_id: Unique ID.
+
+    :arg up: Stream of events.
+
+    :arg fetcher: Returns the worker's fetcher, which owns the
+        connection pool. Called on the worker that runs the step, so
+        wrap it with `per_worker`.
+
+    :arg get_url: Called with each event and returns the URL to fetch.
+
+    :arg ordered: Emit the events of a host in their upstream order
+        instead of as soon as their fetch completes. Defaults to
+        `False`.
+
+    :arg max_in_flight: Number of fetches started but not yet emitted
+        at which the worker stops taking input until one finishes.
+        Defaults to 64.
+
+    :arg poll_interval: How often finished fetches are collected when
+        no new events arrive. Defaults to 10 milliseconds.
+
+    :returns: Stream of `(event, stream)` pairs.
+
+    """
+
+    def builder(resume_state: Optional[_FetchState]) -> _FetchLogic:
+        return _FetchLogic(fetcher(), get_url, ordered, max_in_flight, poll_interval, resume_state)
+
+    with_urls = op.filter("has_url", up, lambda event: bool(get_url(event)))
+    keyed = op.key_on("key_on_host", with_urls, lambda event: _host(get_url(event)))
+    fetched = op.unary("fetch", keyed, builder)
+    return op.map("unkey", fetched, lambda key_fetched: key_fetched[1])
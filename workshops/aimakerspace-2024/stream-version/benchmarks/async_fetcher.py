@@ -0,0 +1,132 @@
+"""Throughput and behaviour of `AsyncFetcher` and `fetch_urls` against a local page server.
+
+Serves `--pages` pages from a local stand-in, the first one `--slow-ms`
+slower than the rest, and compares:
+
+* the old path: `LinkContentFetcher`, one URL at a time;
+* `AsyncFetcher.fetch`, in completion order and in input order;
+* `fetch_urls` inside a Bytewax dataflow, unordered and ordered.
+
+It checks that unordered results do not wait for the slow page, that
+ordered ones keep their input order without spinning the CPU while the
+slow page is pending, that connections are pooled, that a rate-limited
+host is spaced out without holding up the others, and that only
+connection errors, 429 and 5xx responses are retried.
+
+Run from the `stream-version` directory:
+
+    python -m benchmarks.async_fetcher --pages 200 --concurrency 16
+"""
+from concurrent.futures import wait
+import argparse
+import time
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSink, TestingSource, run_main
+from haystack.components.fetchers import LinkContentFetcher
+
+from async_fetcher import AsyncFetcher, fetch_urls
+from benchmarks.standins import PageServer
+
+
+def page(index):
+    return f"<html><body><p>Article {index}</p></body></html>".encode("utf-8")
+
+
+def run_flow(fetcher, events, ordered, max_in_flight):
+    """Fetch `events` through `fetch_urls`; return the emitted ids, wall and CPU seconds."""
+    out = []
+    flow = Dataflow("fetch")
+    stream = op.input("input", flow, TestingSource(events))
+    fetched = fetch_urls("fetch", stream, lambda: fetcher, lambda event: event["url"],
+                         ordered=ordered, max_in_flight=max_in_flight)
+    op.output("output", op.map("id", fetched, lambda event_stream: event_stream[0]["id"]), TestingSink(out))
+    wall, cpu = time.perf_counter(), time.process_time()
+    run_main(flow)
+    return out, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--slow-ms", type=float, default=1000.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=20.0)
+    args = parser.parse_args()
+
+    pages = {f"/article/{index}": page(index) for index in range(args.pages)}
+    pages.update({"/flaky": page("flaky"), "/throttled": page("throttled"), "/gone": page("gone")})
+    with PageServer(pages, latency=args.latency_ms / 1000,
+                    latencies={"/article/0": args.slow_ms / 1000},
+                    statuses={"/flaky": [500, 503], "/throttled": [429], "/gone": [403, 403, 403]}) as server:
+        urls = server.urls()[:args.pages]
+        fetcher = AsyncFetcher(max_concurrency=args.concurrency, retry_attempts=2)
+
+        serial = LinkContentFetcher(retry_attempts=0, timeout=10)
+        count = min(args.pages, 20)
+        start = time.perf_counter()
+        for url in urls[:count]:
+            serial.run(urls=[url])
+        per_page = (time.perf_counter() - start) / count
+        print(f"LinkContentFetcher     {count / (time.perf_counter() - start):7.1f} pages/s "
+              f"(first {count} pages, {per_page * args.pages:.1f}s projected for all)")
+
+        for ordered in (False, True):
+            server.reset()
+            start = time.perf_counter()
+            indices = [index for index, stream in fetcher.fetch(urls, ordered=ordered) if stream is not None]
+            seconds = time.perf_counter() - start
+            print(f"AsyncFetcher.fetch     {args.pages / seconds:7.1f} pages/s  ordered={ordered!s:<5}  "
+                  f"{server.requests} requests over {server.connections} connections")
+            assert sorted(indices) == list(range(args.pages)), "pages are missing"
+            assert server.connections <= args.concurrency, "connections were not pooled"
+            if ordered:
+                assert indices == list(range(args.pages)), "ordered results are out of order"
+            else:
+                assert indices[0] != 0, "unordered results waited for the slow page"
+
+        events = [{"id": index, "url": url} for index, url in enumerate(urls)]
+        for ordered in (False, True):
+            ids, wall, cpu = run_flow(fetcher, events, ordered, max_in_flight=args.concurrency)
+            print(f"fetch_urls dataflow    {args.pages / wall:7.1f} pages/s  ordered={ordered!s:<5}  "
+                  f"{cpu:.2f}s CPU over {wall:.2f}s")
+            assert sorted(ids) == list(range(args.pages)), "events are missing"
+            if ordered:
+                assert ids == list(range(args.pages)), "ordered events are out of order"
+                # Blocked on the slow page, the worker should sleep, not poll
+                assert cpu < 0.5 * wall, "the worker spun while waiting for the oldest fetch"
+            else:
+                assert ids[0] != 0, "unordered events waited for the slow page"
+
+        # The same pages under a second, rate-limited host name
+        limited = AsyncFetcher(max_concurrency=2, rate_limits={"localhost": args.rate}, retry_attempts=0)
+        count = int(args.rate)
+        server.reset()
+        start = time.perf_counter()
+        futures = [limited.submit(url) for url in server.urls("localhost")[1:count + 1]]
+        free = [limited.submit(url) for url in urls[1:5]]
+        wait(free)
+        free_seconds = time.perf_counter() - start
+        wait(futures)
+        starts = sorted(at for host, _, at in server.log if host == "localhost")
+        gap = min(later - earlier for earlier, later in zip(starts, starts[1:]))
+        print(f"rate limit {args.rate:.0f}/s: {count} requests in {time.perf_counter() - start:.2f}s, "
+              f"smallest gap {gap * 1000:.0f}ms; another host's 4 pages done after {free_seconds:.2f}s")
+        assert gap >= 0.8 / args.rate, "the rate-limited host saw requests too close together"
+        assert free_seconds < count / args.rate / 2, "waiting for the rate limit held up another host"
+        limited.close()
+
+        server.reset()
+        results = [fetcher.submit(f"{server.url}{path}").result() for path in ("/flaky", "/throttled", "/gone")]
+        requests = {path: sum(1 for _, logged, _ in server.log if logged == path)
+                    for path in ("/flaky", "/throttled", "/gone")}
+        print(f"retries: {requests}")
+        assert results[0] is not None and results[1] is not None, "retryable errors were not retried"
+        assert results[2] is None and requests["/gone"] == 1, "a 403 was retried"
+        fetcher.close()
+
+
+if __name__ == "__main__":
+    main()
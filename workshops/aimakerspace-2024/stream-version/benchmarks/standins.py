@@ -0,0 +1,120 @@
+"""Local HTTP stand-ins for the pages the dataflow fetches."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import time
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Called once per TCP connection, however many requests it carries
+        self.server.standin.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer:
+    """Run a handler class on a free local port in a background thread.
+
+    Use as a context manager; `url` is the base URL to hand to clients.
+    `requests` and `connections` count what the server has accepted.
+    """
+
+    handler_class = _StandInHandler
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _PageHandler(_StandInHandler):
+    def do_GET(self):
+        standin = self.server.standin
+        standin.count("requests")
+        status = standin.record(self.headers.get("Host", ""), self.path)
+        time.sleep(standin.latencies.get(self.path, standin.latency))
+        body = standin.pages.get(self.path)
+        if body is None:
+            self.send_body(b"<html><body>Not Found</body></html>", "text/html", status=404)
+        elif status != 200:
+            self.send_body(b"<html><body>Try again</body></html>", "text/html", status=status)
+        else:
+            self.send_body(body, "text/html; charset=utf-8")
+
+
+class PageServer(StandInServer):
+    """Serves `pages`, a dict of path to HTML bytes, after `latency` seconds.
+
+    `latencies` overrides the latency of single paths. `statuses` maps a
+    path to the status codes its first requests get, one per request,
+    before it is served normally, e.g. `{"/flaky": [503, 429]}`. Every
+    request is logged in `log` as `(host, path, monotonic start time)`;
+    the server listens on 127.0.0.1, so `localhost` URLs reach it under
+    a second host name.
+    """
+
+    handler_class = _PageHandler
+
+    def __init__(self, pages, latency=0.05, latencies=None, statuses=None):
+        super().__init__()
+        self.pages = pages
+        self.latency = latency
+        self.latencies = latencies or {}
+        self.statuses = {path: list(codes) for path, codes in (statuses or {}).items()}
+        self.log = []
+
+    def reset(self):
+        super().reset()
+        with self._lock:
+            self.log = []
+
+    def record(self, host, path):
+        """Log a request and return the status code it gets."""
+        with self._lock:
+            self.log.append((host.split(":")[0], path, time.monotonic()))
+            codes = self.statuses.get(path)
+            return codes.pop(0) if codes else 200
+
+    def urls(self, host="127.0.0.1"):
+        return [f"http://{host}:{self.port}{path}" for path in self.pages]
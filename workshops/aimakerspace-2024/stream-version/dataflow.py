@@ -6,7 +6,6 @@ from bytewax.connectors.files import FileSource
 from bytewax.testing import run_main
 
 from haystack import Pipeline
-from haystack.components.embedders import OpenAIDocumentEmbedder
 from haystack.components.preprocessors import DocumentCleaner
 from haystack.components.preprocessors import DocumentSplitter
 from haystack.components.writers import DocumentWriter
@@ -16,56 +15,26 @@ from haystack.utils import Secret
 from haystack.components.fetchers import LinkContentFetcher
 from haystack.components.converters import HTMLToDocument
 from haystack.document_stores.in_memory import InMemoryDocumentStore 
-from haystack.components.embedders import AzureOpenAIDocumentEmbedder
 
 from haystack import component, Document
 from typing import Any, Dict, List, Optional, Union
 from haystack.dataclasses import ByteStream
+from datetime import timedelta
 from dotenv import load_dotenv
 import os
-import json 
+
+from async_fetcher import AsyncFetcher, fetch_urls
+from deserialize import deserialize_batch
+from embedding_batcher import batch_embed
+from pipeline_factory import per_worker
 
 load_dotenv(".env")
 open_ai_key = os.environ.get("OPENAI_API_KEY")
-
-def safe_deserialize(data):
-    try:
-        # Attempt to load the JSON data
-        parsed_data = json.loads(data)
-        
-        # Check if the data is in the list format with a possible null as the first item
-        if isinstance(parsed_data, list):
-            if len(parsed_data) == 2 and (parsed_data[0] is None or isinstance(parsed_data[0], str)):
-                event = parsed_data[1]  # Select the dictionary which is the second item
-            else:
-                print(f"Skipping unexpected list format: {data}")
-                return None
-        elif isinstance(parsed_data, dict):
-            # It's the simple dictionary format
-            event = parsed_data
-        else:
-            print(f"Skipping unexpected data type: {data}")
-            return None
-        
-        if 'link' in event:
-            event['url'] = event.pop('link')
-        # Check for the presence of 'url' key to further validate the data
-        if "url" in event:
-            return event  # Return the entire event dict or adapt as needed
-        else:
-            print(f"Missing 'url' key in data: {data}")
-            return None
-
-    except json.JSONDecodeError as e:
-        print(f"JSON decode error ({e}) for data: {data}")
-        return None
-    except Exception as e:
-        print(f"Error processing data ({e}): {data}")
-        return None
-
+embedding_batch_size = int(os.environ.get("EMBEDDING_BATCH_SIZE", 256))
+embedding_batch_timeout = timedelta(milliseconds=int(os.environ.get("EMBEDDING_BATCH_TIMEOUT_MS", 500)))
 
 class JSONLReader:
-    def __init__(self, metadata_fields=None, open_ai_key=None, embedding_flag=False):
+    def __init__(self, metadata_fields=None, embedding_flag=False):
         """
         Initialize the JSONLReader with optional metadata fields and a link keyword.
         
@@ -77,7 +46,6 @@ class JSONLReader:
         # Set up cleaning mechanism
         regex_pattern = r"(?i)\bloading\s*\.*\s*|(\s*--\s*-\s*)+"
 
-        fetcher = LinkContentFetcher(retry_attempts=3, timeout=10)
         converter = HTMLToDocument()
         document_cleaner = DocumentCleaner(
                             remove_empty_lines=True,
@@ -88,56 +56,51 @@ class JSONLReader:
                         )
         
         document_splitter = DocumentSplitter(split_by="passage")        
-        document_embedder = OpenAIDocumentEmbedder(api_key=Secret.from_token(open_ai_key))                                                   
 
         # Initialize pipeline
         self.pipeline = Pipeline()
 
-        # Add components
-        self.pipeline.add_component("fetcher", fetcher)
+        # Add components; fetching happens upstream in the fetch_urls stage
         self.pipeline.add_component("converter", converter)
         self.pipeline.add_component("cleaner", document_cleaner)
         self.pipeline.add_component("splitter", document_splitter)
-        self.pipeline.add_component("embedder", document_embedder)
 
         # Connect components
-        self.pipeline.connect("fetcher", "converter")
         self.pipeline.connect("converter", "cleaner")
         self.pipeline.connect("cleaner", "splitter")
-        self.pipeline.connect("splitter", "embedder")
+        # Embedding happens downstream, in one request for the documents of many events
 
-    @component.output_types(documents=List[Document])
-    def run(self, event: List[Union[str, Path, ByteStream]]):
+    @staticmethod
+    def source_url(event: Dict[str, Any]) -> Optional[str]:
         """
-        Process each source file, read URLs and their associated metadata,
-        fetch HTML content using a pipeline, and convert to Haystack Documents.
-        :param sources: File paths or ByteStreams to process.
-        :return: A list of Haystack Documents.
+        Return the URL to fetch for an event, pointing SEC index pages at the full-text filing.
+        :param event: The deserialized event.
+        :return: The URL to fetch, or None if the event has none.
         """
-
-        # Extract URL and modify it if necessary
         url = event.get("url")
         if url and '-index.html' in url:
             url = url.replace('-index.html', '.txt')
+        return url
+
+    @component.output_types(documents=List[Document])
+    def run(self, event: Dict[str, Any], stream: ByteStream):
+        """
+        Convert the fetched HTML content of an event into a Haystack Document
+        carrying the event's metadata.
+        :param event: The deserialized event.
+        :param stream: The fetched content of the event's URL.
+        :return: A Haystack Document, not embedded yet.
+        """
 
         # else:
         metadata = {field: event.get(field) for field in self.metadata_fields if field in event}
-        # Assume a pipeline fetches and processes this URL
-        doc = self.pipeline.run({"fetcher": {"urls": [url]}})
-        print(doc)
-        document_obj = doc['embedder']['documents'][0]
+        # Process the content fetched upstream
+        doc = self.pipeline.run({"converter": {"sources": [stream]}})
+        document_obj = doc['splitter']['documents'][0]
         content = document_obj.content
         additional_metadata = document_obj.meta
 
-        if self.embedding_flag:
-            embedding = document_obj.embedding
-            # Safely access the embedding metadata
-            embedding_metadata = doc.get('embedder', {}).get('meta', {})
-            metadata.update(embedding_metadata) 
-            document = Document(id=document_obj.id, content=content, meta=metadata, embedding=embedding)
-
         metadata.update(additional_metadata)
-         # Merge embedding metadata
         document = Document(id=document_obj.id, content=content, meta=metadata)
         return document
     
@@ -167,22 +130,45 @@ class JSONLReader:
 
     
 
-jsonl_reader = JSONLReader(metadata_fields=['symbols', 'headline', 'url'],
-                           
-                           open_ai_key=open_ai_key,
-                           embedding_flag=True)
+@per_worker
+def jsonl_reader():
+    # Built on the first event each worker processes, not on import
+    return JSONLReader(metadata_fields=['symbols', 'headline', 'url'],
+                       embedding_flag=True)
 
-def process_event(event):
-    """Wrapper to handle the processing of each event."""
-    if event:
-        document = jsonl_reader.run(event)
-        return jsonl_reader.document_to_dict(document)
-    return None
+@per_worker
+def embedder():
+    # Imported here so importing the dataflow does not load the OpenAI SDK
+    from haystack.components.embedders import OpenAIDocumentEmbedder
+    return OpenAIDocumentEmbedder(api_key=Secret.from_token(open_ai_key),
+                                  batch_size=embedding_batch_size,
+                                  progress_bar=False)
+
+@per_worker
+def fetcher():
+    # SEC EDGAR asks for at most 10 requests per second; `fetch_urls` keeps
+    # each host on one worker, so the limit holds across workers
+    return AsyncFetcher(max_concurrency=16, rate_limits={"www.sec.gov": 10})
+
+def process_event(event_stream):
+    """Wrapper to handle the processing of each fetched event."""
+    event, stream = event_stream
+    return [jsonl_reader().run(event, stream)]
+
+
+def to_dicts(documents):
+    reader = jsonl_reader()
+    return [reader.document_to_dict(document) for document in documents]
 
 
 flow = Dataflow("rag-pipeline")
 input_data = op.input("input", flow, FileSource("data/news_out.jsonl"))
-deserialize_data = op.map("deserialize", input_data, safe_deserialize)
-extract_html = op.map("extract_html", deserialize_data, process_event)
-
-op.output("output", extract_html, StdOutSink())
+deserialize_data = op.flat_map_batch("deserialize", input_data, deserialize_batch)
+fetch_html = fetch_urls("fetch_html", deserialize_data, fetcher, JSONLReader.source_url)
+extract_html = op.map("extract_html", fetch_html, process_event)
+# The documents of many events are embedded in one request
+embed_content = batch_embed("embed_content", extract_html, embedder,
+                            max_size=embedding_batch_size, timeout=embedding_batch_timeout)
+dicts = op.flat_map("to_dict", embed_content, to_dicts)
+
+op.output("output", dicts, StdOutSink())
@@ -0,0 +1,87 @@
+"""Throughput and retries of `AzureSearchSink` against a local `docs/index` stand-in.
+
+Uploads `--documents` documents through `AzureSearchSink` in a Bytewax
+dataflow, one document per request as the sink used to, then in
+requests of up to 1000. The stand-in answers the first request with a
+429, fails a few documents with a retryable 503 the first time and one
+with a 400 every time. It checks that:
+
+* no request carries more than 1000 documents;
+* the 429 request is sent again whole;
+* only the 503 documents are sent again, and they end up indexed;
+* the 400 document is counted as failed and not retried;
+* `UploadStats` agree with the stand-in and no partition outlives the run.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.azure_upload --documents 5000 --latency-ms 50
+"""
+import argparse
+import gc
+import time
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSource, run_main
+
+from benchmarks.standins import SearchServer
+from custom_connectors import AzureSearchSink, _AzureSearchPartition
+
+
+def items(count, dimensions):
+    return [{"id": f"doc-{index}", "content": f"passage {index}", "meta": "{}",
+             "vector": [index % 7 / 7] * dimensions} for index in range(count)]
+
+
+def upload(server, documents, chunk_size, batch_size):
+    """Run `documents` through an `AzureSearchSink`; return the sink and the seconds taken."""
+    sink = AzureSearchSink(service_endpoint=server.url, api_key="stand-in", chunk_size=chunk_size, backoff=0.01)
+    flow = Dataflow("azure_upload")
+    op.output("output", op.input("input", flow, TestingSource(documents, batch_size)), sink)
+    start = time.perf_counter()
+    run_main(flow)
+    return sink, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--dimensions", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=2500)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--per-document", type=int, default=200,
+                        help="Documents to upload one per request, for comparison")
+    args = parser.parse_args()
+    documents = items(args.documents, args.dimensions)
+
+    with SearchServer(latency=args.latency_ms / 1000) as server:
+        _, seconds = upload(server, documents[:args.per_document], chunk_size=1, batch_size=args.batch_size)
+        print(f"1 document per request    {args.per_document / seconds:8.0f} docs/s  "
+              f"({args.per_document} documents, {server.requests} requests)")
+
+    retried, rejected = ["doc-3", "doc-1500", f"doc-{args.documents - 1}"], "doc-7"
+    statuses = {key: [503] for key in retried}
+    statuses[rejected] = [400, 400, 400, 400]
+    with SearchServer(latency=args.latency_ms / 1000, throttle=[429], document_status=statuses) as server:
+        sink, seconds = upload(server, documents, chunk_size=1000, batch_size=args.batch_size)
+        stats = sink.stats[0]
+        print(f"up to 1000 per request    {args.documents / seconds:8.0f} docs/s  "
+              f"({args.documents} documents, {server.requests} requests of {server.batches})")
+        print(f"stats: {stats.documents} uploaded, {stats.failed} failed, {stats.retries} retried, "
+              f"{stats.requests} requests")
+
+        assert max(server.batches) <= 1000, "a request carried more than 1000 documents"
+        assert server.batches[:2] == [1000, 1000], "the throttled request was not sent again whole"
+        # Each chunk holds one 503 document, which is sent again on its own
+        assert server.batches.count(1) == len(retried), "retries resent more than the failed documents"
+        assert set(server.documents) == {item["id"] for item in documents} - {rejected}, \
+            "documents are missing from the index"
+        assert stats.documents == args.documents - 1 and stats.failed == 1, "the stats do not match the index"
+        assert stats.requests == server.requests, "the stats missed requests"
+        gc.collect()
+        live = [obj for obj in gc.get_objects() if isinstance(obj, _AzureSearchPartition)]
+        assert not live, "the sink kept its partitions alive"
+
+
+if __name__ == "__main__":
+    main()
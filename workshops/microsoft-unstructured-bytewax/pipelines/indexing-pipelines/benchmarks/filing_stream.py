@@ -0,0 +1,142 @@
+"""Time to first chunk and peak memory of streamed vs whole-file filing splitting.
+
+Serves a generated EDGAR full-text submission from a local HTTP
+stand-in throttled to `--mbps`, then compares:
+
+* the old path: `requests.get(...).content`, decoded and split with
+  `DocumentSplitter`;
+* `iter_filing` + `IncrementalSplitter`;
+* `FilingChunkSource` inside a Bytewax dataflow.
+
+It checks that the streamed chunks equal `DocumentSplitter`'s.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.filing_stream --megabytes 30 --mbps 40
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import hashlib
+import json
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import requests
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSink, run_main
+from haystack import Document
+from haystack.components.preprocessors import DocumentSplitter
+
+from benchmarks.text_normalizer import sec_filing
+from custom_connectors import FilingChunkSource
+from filing_stream import IncrementalSplitter, iter_filing
+
+
+def serve(body, mbps):
+    """Serve `body` at any path, `mbps` megabytes per second, on a free port."""
+    piece = 65536
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            for start in range(0, len(body), piece):
+                self.wfile.write(body[start:start + piece])
+                time.sleep(piece / (mbps * 1e6))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(run):
+    """
+    Run `run(on_chunk)` and return chunk digests, first-chunk and total
+    seconds and peak traced MB. Only digests are kept so collecting the
+    chunks does not count towards the peak.
+    """
+    chunks = []
+    first = []
+    start = time.perf_counter()
+
+    def on_chunk(chunk):
+        if not first:
+            first.append(time.perf_counter() - start)
+        chunks.append(hashlib.sha1(chunk.encode("utf-8")).digest())
+
+    tracemalloc.start()
+    run(on_chunk)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chunks, first[0], time.perf_counter() - start, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=30)
+    parser.add_argument("--mbps", type=float, default=40)
+    parser.add_argument("--split-length", type=int, default=5)
+    parser.add_argument("--window-chars", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    text = sec_filing(random.Random(7), int(args.megabytes * 1e6))
+    # Blank lines between holdings, so passages are a few KB
+    body = text.replace("</invstOrSec>\n", "</invstOrSec>\n\n").encode("utf-8")
+    del text
+    server = serve(body, args.mbps)
+    url = f"http://127.0.0.1:{server.server_port}/0001145549-24-032499.txt"
+    print(f"{len(body) / 1e6:.0f} MB filing served at {args.mbps:g} MB/s")
+
+    splitter = DocumentSplitter(split_by="passage", split_length=args.split_length)
+
+    def whole(on_chunk):
+        content = requests.get(url).content.decode("utf-8")
+        for document in splitter.run(documents=[Document(content=content)])["documents"]:
+            on_chunk(document.content)
+
+    def streamed(on_chunk):
+        incremental = IncrementalSplitter("passage", args.split_length, args.window_chars)
+        for piece in iter_filing(url):
+            for chunk in incremental.feed(piece):
+                on_chunk(chunk)
+        for chunk in incremental.finish():
+            on_chunk(chunk)
+
+    def dataflow(on_chunk):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as events:
+            events.write(json.dumps({"id": "0", "link": url.replace(".txt", "-index.htm")}) + "\n")
+            events.flush()
+            flow = Dataflow("filing_stream")
+            chunks = op.input("input", flow, FilingChunkSource(
+                events.name, split_length=args.split_length, window_chars=args.window_chars))
+            # Chunks are dropped once seen, so the sink holds nothing
+            seen = op.filter_map("seen", chunks, lambda document: on_chunk(document.content))
+            op.output("output", seen, TestingSink([]))
+            run_main(flow)
+
+    results = {}
+    for name, run in [("get + DocumentSplitter", whole), ("iter_filing + IncrementalSplitter", streamed),
+                      ("FilingChunkSource dataflow", dataflow)]:
+        chunks, first, total, peak = measure(run)
+        results[name] = chunks
+        print(f"{name:<34} first chunk {first:6.2f}s  all {total:6.2f}s  peak {peak:7.1f} MB  "
+              f"({len(chunks)} chunks)")
+    server.shutdown()
+
+    reference = results["get + DocumentSplitter"]
+    for name, chunks in results.items():
+        assert chunks == reference, f"{name} chunks differ from DocumentSplitter"
+    print("all paths produced identical chunks")
+
+
+if __name__ == "__main__":
+    main()
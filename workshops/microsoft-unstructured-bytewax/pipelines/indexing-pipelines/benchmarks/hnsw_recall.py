@@ -0,0 +1,120 @@
+"""Recall vs latency of the local HNSW index against exhaustive KNN.
+
+Builds an `HnswIndex` with the parameters from `init_azure_index.py`
+(m=4, ef_construction=400, cosine) over clustered random vectors, then
+sweeps `ef_search` and reports recall@k and query latency next to an
+exhaustive NumPy scan of the same data. Finally adds vectors to the
+memory-mapped index and saves it back over the files it maps, as
+`HnswSink` does on restart, and checks the reloaded copy. Then has an
+`HnswDocumentStore` save fail halfway through its documents and checks
+that the documents saved before are still whole.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.hnsw_recall --count 5000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+from haystack import Document
+
+from hnsw_document_store import HnswDocumentStore, HnswIndex
+
+
+def clustered_vectors(count, dimensions, clusters, rng):
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    return centers[labels] + 0.3 * rng.standard_normal((count, dimensions)).astype(np.float32)
+
+
+def exhaustive(data, queries, k):
+    data = data / np.linalg.norm(data, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    start = time.perf_counter()
+    results = []
+    for query in queries:
+        scores = data @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        results.append(set(top[np.argsort(-scores[top])].tolist()))
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--dimensions", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, default=4)
+    parser.add_argument("--ef-construction", type=int, default=400)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[10, 25, 50, 100, 200, 500])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    data = clustered_vectors(args.count, args.dimensions, 50, rng)
+    queries = clustered_vectors(args.queries, args.dimensions, 50, rng)
+
+    index = HnswIndex(args.dimensions, m=args.m, ef_construction=args.ef_construction, capacity=args.count)
+    start = time.perf_counter()
+    for vector in data:
+        index.add(vector)
+    build = time.perf_counter() - start
+    print(f"built {args.count} x {args.dimensions} in {build:.1f}s "
+          f"({args.count / build:.0f} inserts/s), {index.max_level + 1} layers")
+
+    with tempfile.TemporaryDirectory() as path:
+        index.save(path)
+        start = time.perf_counter()
+        index = HnswIndex.load(path, mmap=True)
+        print(f"reloaded memory-mapped index in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        truth, exact_latency = exhaustive(data, queries, args.k)
+        print(f"{'exhaustive':>12}  recall@{args.k} 1.000  {exact_latency * 1000:7.3f}ms/query")
+
+        for ef in args.ef_search:
+            start = time.perf_counter()
+            found = [index.search(query, args.k, ef) for query in queries]
+            latency = (time.perf_counter() - start) / len(queries)
+            recall = np.mean([
+                len(truth_ids & {node for _, node in result}) / args.k
+                for truth_ids, result in zip(truth, found)
+            ])
+            print(f"{'ef=' + str(ef):>12}  recall@{args.k} {recall:.3f}  {latency * 1000:7.3f}ms/query")
+
+        # Saved once still mapped, as on a restart with nothing new, then again after inserts
+        extra = clustered_vectors(args.queries, args.dimensions, 50, rng)
+        for vectors in ([], extra):
+            for vector in vectors:
+                index.add(vector)
+            index.save(path)
+            reloaded = HnswIndex.load(path, mmap=True)
+            assert reloaded.count == index.count, "the saved index lost nodes"
+            assert np.array_equal(reloaded._vectors[: reloaded.count], index._vectors[: index.count])
+            assert np.array_equal(reloaded._layer0[: reloaded.count], index._layer0[: index.count])
+            index = reloaded
+        print(f"saved {index.count} nodes over the mapped files and reloaded them unchanged")
+
+    with tempfile.TemporaryDirectory() as path:
+        store = HnswDocumentStore(path=path)
+        documents = [Document(id=str(i), content=f"passage {i}", embedding=vector.tolist())
+                     for i, vector in enumerate(data[:100])]
+        store.write_documents(documents)
+        store.save()
+        # Rewritten behind a document whose meta JSON cannot encode, which stops the next save
+        store.delete_documents([document.id for document in documents])
+        store.write_documents([Document(id="broken", content="broken", meta={"value": object()},
+                                        embedding=data[100].tolist())])
+        store.write_documents(documents)
+        try:
+            store.save()
+        except TypeError:
+            pass
+        reloaded = HnswDocumentStore(path=path)
+        assert reloaded.count_documents() == len(documents), "a failed save truncated documents.jsonl"
+        print(f"a save that failed partway left the {reloaded.count_documents()} documents saved before")
+
+
+if __name__ == "__main__":
+    main()
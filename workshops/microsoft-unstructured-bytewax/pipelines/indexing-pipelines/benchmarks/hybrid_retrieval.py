@@ -0,0 +1,109 @@
+"""Recall and latency of BM25, vector and hybrid retrieval on exact and paraphrased questions.
+
+Builds an `HnswDocumentStore` over synthetic filing chunks. Each chunk
+belongs to a topic, a ticker and a form type; its embedding encodes the
+topic strongly and the ticker only faintly, as real embeddings blur
+symbols like "NVDA" and "10-K". Two kinds of questions are asked:
+
+- exact: one ticker and form type, e.g. "NVDA 8-K"; the relevant
+  chunks are those with both.
+- paraphrased: one topic, in words no chunk uses; the relevant chunks
+  are those on the topic.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.hybrid_retrieval --count 5000
+"""
+import argparse
+import time
+
+import numpy as np
+from haystack import Document
+
+from bm25_index import Bm25Index
+from hnsw_document_store import HnswDocumentStore, HnswEmbeddingRetriever, HnswHybridRetriever
+
+FORM_TYPES = ["10-K", "10-Q", "8-K", "S-1", "DEF 14A"]
+TOPICS = 20
+# Chunks describe a topic with its first words, paraphrased questions with the rest
+VOCABULARY = [[f"topic{i}word{j}" for j in range(8)] for i in range(TOPICS)]
+
+
+def tickers(count, rng):
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    return sorted({"".join(rng.choice(letters, rng.integers(3, 5))) for _ in range(count)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--dimensions", type=int, default=128)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-construction", type=int, default=400)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    symbols = tickers(args.tickers, rng)
+    topic_vectors = rng.standard_normal((TOPICS, args.dimensions)).astype(np.float32)
+    symbol_vectors = rng.standard_normal((len(symbols), args.dimensions)).astype(np.float32)
+
+    def embed(topic, symbol):
+        noise = rng.standard_normal(args.dimensions).astype(np.float32)
+        return (topic_vectors[topic] + 0.1 * symbol_vectors[symbol] + 0.5 * noise).tolist()
+
+    documents, labels = [], []
+    for i in range(args.count):
+        topic, symbol, form = rng.integers(TOPICS), rng.integers(len(symbols)), rng.integers(len(FORM_TYPES))
+        words = " ".join(rng.choice(VOCABULARY[topic][:4], 2, replace=False))
+        content = f"{symbols[symbol]} reported in its {FORM_TYPES[form]} filing on {words} and outlook"
+        documents.append(Document(id=str(i), content=content, embedding=embed(topic, symbol),
+                                  meta={"symbol": symbols[symbol], "form_type": FORM_TYPES[form]}))
+        labels.append((topic, symbol, form))
+
+    store = HnswDocumentStore(ef_construction=args.ef_construction)
+    start = time.perf_counter()
+    for document in documents:
+        store.write_documents([document])
+    build = time.perf_counter() - start
+    bm25 = Bm25Index()
+    start = time.perf_counter()
+    for document in documents:
+        bm25.add(document.id, document.content)
+    bm25_build = time.perf_counter() - start
+    print(f"indexed {args.count} chunks in {build:.1f}s; BM25 alone {args.count / bm25_build:.0f} documents/s")
+
+    questions = {"exact": [], "paraphrased": []}
+    for topic, symbol, form in (labels[i] for i in rng.choice(args.count, args.queries, replace=False)):
+        relevant = {str(i) for i, label in enumerate(labels) if label[1:] == (symbol, form)}
+        text = f"Latest {symbols[symbol]} {FORM_TYPES[form]}"
+        questions["exact"].append((text, embed(topic, symbol), relevant))
+        relevant = {str(i) for i, label in enumerate(labels) if label[0] == topic}
+        text = "What do companies say about " + " ".join(VOCABULARY[topic][4:]) + "?"
+        questions["paraphrased"].append((text, embed(topic, symbol), relevant))
+
+    runners = {
+        "vector": lambda text, embedding: HnswEmbeddingRetriever(store, top_k=args.k).run(
+            query_embedding=embedding),
+        "bm25": lambda text, embedding: {"documents": store.bm25_retrieval(text, top_k=args.k)},
+        "hybrid": lambda text, embedding: HnswHybridRetriever(store, top_k=args.k).run(
+            query=text, query_embedding=embedding),
+        "hybrid+prefilter": lambda text, embedding: HnswHybridRetriever(store, top_k=args.k, prefilter=True).run(
+            query=text, query_embedding=embedding),
+    }
+    for name, run in runners.items():
+        line = f"{name:>18}"
+        for kind, asked in questions.items():
+            recalls = []
+            start = time.perf_counter()
+            for text, embedding, relevant in asked:
+                found = {document.id for document in run(text, embedding)["documents"]}
+                recalls.append(len(found & relevant) / min(args.k, len(relevant)))
+            latency = (time.perf_counter() - start) / len(asked)
+            line += f"  {kind} recall@{args.k} {np.mean(recalls):.3f} {latency * 1000:6.2f}ms/query"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
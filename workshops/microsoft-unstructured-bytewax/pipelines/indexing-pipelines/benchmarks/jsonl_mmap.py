@@ -0,0 +1,142 @@
+"""Memory and throughput of reading JSONL through `JsonlLines` vs file objects.
+
+Repeats the events of `data/news_out.jsonl` into a temporary file of
+about `--megabytes` and compares:
+
+* the batch reader: `read().split('\\n')`, as `JSONLReader` in the
+  batch version did, against iterating `JsonlLines`, parsing every line
+  with `json.loads`. Peak memory is traced with `tracemalloc`, which
+  does not count the mapped pages; they belong to the page cache.
+* Bytewax input: `FileSource` (the old `SimulationSource`) against
+  `MmapJsonlSource`, each followed by `safe_deserialize`. Each run is
+  timed in CPU seconds, and the share spent in garbage collection is
+  shown apart: every line or parsed event alive in a batch adds to it.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.jsonl_mmap --megabytes 100 --batch-sizes 10 1000 10000
+"""
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, List
+
+from bytewax import operators as op
+from bytewax.connectors.files import FileSource
+from bytewax.dataflow import Dataflow
+from bytewax.outputs import DynamicSink, StatelessSinkPartition
+from bytewax.testing import run_main
+
+from custom_connectors import MmapJsonlSource
+from deserialize import BACKEND, safe_deserialize
+from jsonl_mmap import JsonlLines
+
+
+class _CountingPartition(StatelessSinkPartition[Any]):
+    def __init__(self, counts):
+        self._counts = counts
+
+    def write_batch(self, items: List[Any]) -> None:
+        self._counts.append(len(items))
+
+
+class _CountingSink(DynamicSink[Any]):
+    def __init__(self):
+        self.counts = []
+
+    def build(self, _step_id, _worker_index, _worker_count):
+        return _CountingPartition(self.counts)
+
+
+def split_reader(path):
+    with open(path, "r", encoding="utf-8") as file:
+        content = file.read()
+    return sum(1 for line in content.strip().split("\n") if line.strip() and json.loads(line))
+
+
+def mapped_reader(path):
+    with JsonlLines.open(path) as lines:
+        return sum(1 for batch, _ in lines.batches() for line in batch if json.loads(line))
+
+
+def traced(read, path):
+    """Seconds of an untraced run, then peak MB of a traced one, since tracing slows allocation."""
+    start = time.perf_counter()
+    count = read(path)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    read(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, seconds, peak / 1e6
+
+
+class _GcTimer:
+    """Adds up the seconds spent in garbage collection while installed."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._start = None
+
+    def __call__(self, phase, _info):
+        if phase == "start":
+            self._start = time.perf_counter()
+        else:
+            self.seconds += time.perf_counter() - self._start
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        gc.callbacks.remove(self)
+
+
+def dataflow(source):
+    """Event count, CPU seconds and GC seconds of reading `source` through `safe_deserialize`."""
+    sink = _CountingSink()
+    flow = Dataflow("jsonl_mmap")
+    events = op.filter_map("deserialize", op.input("input", flow, source), safe_deserialize)
+    op.output("output", events, sink)
+    with _GcTimer() as collections:
+        start = time.process_time()
+        run_main(flow)
+        seconds = time.process_time() - start
+    return sum(sink.counts), seconds, collections.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="data/news_out.jsonl")
+    parser.add_argument("--megabytes", type=float, default=100)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per source, the fastest is shown")
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as f:
+        chunk = f.read()
+    with tempfile.NamedTemporaryFile("wb", suffix=".jsonl", delete=False) as dump:
+        for _ in range(max(1, int(args.megabytes * 1e6 / len(chunk)))):
+            dump.write(chunk)
+    size = os.path.getsize(dump.name) / 1e6
+    print(f"{size:.0f} MB dump, safe_deserialize with {BACKEND}")
+    try:
+        for name, read in [("read + split", split_reader), ("JsonlLines", mapped_reader)]:
+            count, seconds, peak = traced(read, dump.name)
+            print(f"{name:<26} {seconds:6.2f}s  peak {peak:7.1f} MB  ({count} lines)")
+        for batch_size in args.batch_sizes:
+            for name, source in [("FileSource", FileSource(dump.name, batch_size=batch_size)),
+                                 ("MmapJsonlSource", MmapJsonlSource(dump.name, batch_size=batch_size))]:
+                count, seconds, collecting = min(dataflow(source) for _ in range(args.repeat))
+                print(f"{name:<16} batch {batch_size:<6} {seconds:6.2f}s  {size / seconds:6.1f} MB/s  "
+                      f"{collecting * 1000:4.0f}ms in GC  ({count} events)")
+    finally:
+        os.unlink(dump.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Whole-file vs page-range partitioning of long filings against a stand-in API.
+
+Serves generated filings of `--pages` form-feed separated pages from a
+`FilingServer` and partitions them with a `PartitionServer` whose
+latency grows with the number of pages per request, as the hosted API's
+does. Each filing is sent whole, then split into ranges of each
+`--split-pages` with `--split-concurrency` ranges in flight.
+
+It checks that every split run returns the same element texts and page
+numbers as the whole-file run.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.page_split --filings 2 --pages 300 --split-pages 10 25 50
+"""
+import argparse
+import logging
+import random
+import time
+
+from benchmarks.standins import FilingServer, PartitionServer
+from benchmarks.text_normalizer import pages, sec_filing
+from unstructured_component import UnstructuredParser
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filings", type=int, default=2)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--page-kilobytes", type=int, default=4)
+    parser.add_argument("--partition-latency", type=float, default=0.2)
+    parser.add_argument("--per-page-latency", type=float, default=0.02)
+    parser.add_argument("--split-pages", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--split-concurrency", type=int, default=8)
+    args = parser.parse_args()
+    logging.getLogger("unstructured_component").setLevel(logging.WARNING)
+
+    rng = random.Random(7)
+    files = {}
+    for index in range(args.filings):
+        text = sec_filing(rng, args.pages * args.page_kilobytes * 1000).replace("</invstOrSec>\n", "</invstOrSec>\n\n")
+        files[f"/Archives/edgar/data/{index}/0001145549-24-{index:06d}.txt"] = \
+            "\f".join(pages(text, args.page_kilobytes * 1000)[:args.pages]).encode("utf-8")
+
+    with FilingServer(files, latency=0) as edgar, \
+            PartitionServer(args.partition_latency, args.per_page_latency) as api:
+        urls = edgar.urls()
+        print(f"{len(urls)} filings of {args.pages} pages, {args.per_page_latency * 1000:g} ms per page "
+              f"+ {args.partition_latency * 1000:g} ms per request")
+
+        reference = None
+        for split_pages in [0] + args.split_pages:
+            unstructured = UnstructuredParser("stand-in", "by_page", "auto", "yolox", server_url=api.url,
+                                              max_in_flight=len(urls), split_pages=split_pages,
+                                              split_concurrency=args.split_concurrency)
+            api.reset()
+            result = unstructured.run(sources=urls)
+            elements = [(document.meta["source_url"], document.meta["page_number"], document.content)
+                        for document in result["documents"]]
+            timings = result["timings"]
+            name = f"{split_pages} pages x{args.split_concurrency}" if split_pages else "whole file"
+            print(f"{name:<16} {timings['total']:6.2f}s  partition {timings['partition']:6.2f}s summed  "
+                  f"{api.requests:4d} requests  ({len(elements)} elements)")
+            reference = reference or elements
+            assert elements == reference, f"{name} elements differ from the whole-file run"
+        print("all runs produced identical elements and page numbers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Check that a paced `ReplaySource` resumed mid-replay keeps its pace.
+
+Writes `--events` events `--spacing` seconds apart and replays them at
+`--speed` through one partition. Halfway through it snapshots the
+partition, closes it and builds a new one from the snapshot, as Bytewax
+does on recovery. The next event must arrive one scaled gap after the
+resume, like every other event, not later.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.replay_resume --speed 100
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from custom_connectors import ReplaySource
+
+
+def read_events(partition, count):
+    """Arrival times of the next `count` events, waking as the partition asks."""
+    arrivals = []
+    while len(arrivals) < count:
+        awake = partition.next_awake()
+        if awake is not None:
+            time.sleep(max(awake.timestamp() - time.time(), 0))
+        arrivals.extend(time.monotonic() for _ in partition.next_batch())
+    return arrivals[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--spacing", type=float, default=10.0)
+    parser.add_argument("--speed", type=float, default=100.0)
+    args = parser.parse_args()
+
+    gap = args.spacing / args.speed
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            for index in range(args.events):
+                file.write(json.dumps({"id": index, "url": f"https://example.com/{index}",
+                                     "updated_at": 1_700_000_000 + index * args.spacing}) + "\n")
+
+        source = ReplaySource(path, partitions=1, speed=args.speed, batch_size=1)
+        (part,) = source.list_parts()
+        partition = source.build_part("replay", part, None)
+        half = args.events // 2
+        before = read_events(partition, half)
+        state = partition.snapshot()
+        partition.close()
+
+        resumed_at = time.monotonic()
+        partition = source.build_part("replay", part, state)
+        after = read_events(partition, args.events - half)
+        partition.close()
+
+    delay = after[0] - resumed_at
+    print(f"snapshot at event {half}: {state}")
+    print(f"gap between events {gap * 1000:.0f}ms, first event after resume {delay * 1000:.0f}ms, "
+          f"{len(before) + len(after)} events")
+    assert delay < 2 * gap, "the resumed replay waited longer than one gap for its next event"
+
+
+if __name__ == "__main__":
+    main()
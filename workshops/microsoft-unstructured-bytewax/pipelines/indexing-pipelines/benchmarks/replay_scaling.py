@@ -0,0 +1,119 @@
+"""Throughput of a replayed dataflow across Bytewax worker and process counts.
+
+Repeats the events of `data/news_out.jsonl` into a temporary file and
+runs a small indexing-shaped dataflow over it with `python -m
+bytewax.testing -w W -p P` for every combination asked for:
+
+    input -> deserialize -> work -> output
+
+`work` stands in for the per-event steps: `--work io` sleeps
+`--work-ms` per event, like a call to the partition or embedding API,
+and `--work cpu` runs `TextNormalizer` over the event. The input is
+either `SimulationSource` (one partition, so one worker reads and works)
+or `ReplaySource` split into one partition per worker.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.replay_scaling --workers 1 2 4 --processes 1 2
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from typing import Any, List
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.outputs import DynamicSink, StatelessSinkPartition
+
+from custom_connectors import ReplaySource, SimulationSource
+from deserialize import safe_deserialize
+from text_normalizer import TextNormalizer
+
+
+class _CountingPartition(StatelessSinkPartition[Any]):
+    def __init__(self):
+        self._count = 0
+        self._start = time.time()
+
+    def write_batch(self, items: List[Any]) -> None:
+        self._count += len(items)
+
+    def close(self) -> None:
+        # Read by the driver from each process's stdout
+        print(f"sink {self._count} {self._start} {time.time()}", flush=True)
+
+
+class _CountingSink(DynamicSink[Any]):
+    def build(self, _step_id: str, _worker_index: int, _worker_count: int) -> _CountingPartition:
+        return _CountingPartition()
+
+
+def get_flow(path, source, partitions, work, work_ms):
+    """The benchmark dataflow; called by `bytewax.testing` in every process."""
+    if source == "replay":
+        inp = ReplaySource(path, partitions=partitions)
+    else:
+        inp = SimulationSource(path, batch_size=100, delay=timedelta(0))
+    normalizer = TextNormalizer()
+
+    def work_step(event):
+        if work == "io":
+            time.sleep(work_ms / 1000)
+        else:
+            normalizer.normalize(event.get("content") or event.get("title") or "")
+        return event["id"]
+
+    flow = Dataflow("replay_scaling")
+    events = op.filter_map("deserialize", op.input("input", flow, inp), safe_deserialize)
+    op.output("output", op.map("work", events, work_step), _CountingSink())
+    return flow
+
+
+def run(path, source, workers, processes, work, work_ms):
+    flow = f"benchmarks.replay_scaling:get_flow({path!r}, {source!r}, {workers * processes}, {work!r}, {work_ms})"
+    result = subprocess.run(
+        [sys.executable, "-m", "bytewax.testing", flow, "-w", str(workers), "-p", str(processes)],
+        capture_output=True, text=True, env=dict(os.environ, HAYSTACK_TELEMETRY_ENABLED="False"),
+    )
+    # Processes share the pipe, so their lines can interleave
+    sinks = re.findall(r"sink (\d+) ([\d.]+) ([\d.]+)", result.stdout)
+    if result.returncode != 0 or not sinks:
+        raise RuntimeError(result.stderr[-2000:])
+    count = sum(int(n) for n, _, _ in sinks)
+    # From the first sink being built to the last one closing, so imports are not counted
+    seconds = max(float(end) for _, _, end in sinks) - min(float(start) for _, start, _ in sinks)
+    return count, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="data/news_out.jsonl")
+    parser.add_argument("--repeat", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1])
+    parser.add_argument("--work", choices=["io", "cpu"], default="io")
+    parser.add_argument("--work-ms", type=float, default=2)
+    args = parser.parse_args()
+
+    with open(args.path) as f:
+        lines = [line for line in f if line.strip()]
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as replay:
+        replay.writelines(lines * args.repeat)
+    print(f"{len(lines) * args.repeat} events, {args.work} work, {os.cpu_count()} CPUs")
+    try:
+        for processes in args.processes:
+            for workers in args.workers:
+                for source in ("simulation", "replay"):
+                    count, seconds = run(replay.name, source, workers, processes, args.work, args.work_ms)
+                    print(f"-p {processes} -w {workers}  {source:<10}  {count / seconds:8.0f} events/s  ({count} events)")
+    finally:
+        os.unlink(replay.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Local HTTP stand-ins for EDGAR, the Unstructured partition API and Azure Search."""
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import hashlib
+import json
+import time
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Called once per TCP connection, however many requests it carries
+        self.server.standin.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer:
+    """Run a handler class on a free local port in a background thread.
+
+    Use as a context manager; `url` is the base URL to hand to clients.
+    `requests` and `connections` count what the server has accepted.
+    """
+
+    handler_class = _StandInHandler
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections = 0
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _FilingHandler(_StandInHandler):
+    def do_GET(self):
+        standin = self.server.standin
+        standin.count("requests")
+        body = standin.files.get(self.path)
+        time.sleep(standin.latency)
+        if body is None:
+            self.send_body(b"Not Found", "text/plain", status=404)
+        else:
+            self.send_body(body, "text/plain")
+
+
+class FilingServer(StandInServer):
+    """Serves `files`, a dict of path to bytes, after `latency` seconds."""
+
+    handler_class = _FilingHandler
+
+    def __init__(self, files, latency=0.05):
+        super().__init__()
+        self.files = files
+        self.latency = latency
+
+    def urls(self):
+        return [self.url + path for path in self.files]
+
+
+class _PartitionHandler(_StandInHandler):
+    def do_POST(self):
+        standin = self.server.standin
+        standin.count("requests")
+        if self.path != "/general/v0/general":
+            self.send_body(b'{"detail": "Not Found"}', "application/json", status=404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        head = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("ascii")
+        form = BytesParser(policy=HTTP).parsebytes(head + self.rfile.read(length))
+        fields = {}
+        for part in form.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+        file_name, content = fields["files"]
+        elements = standin.partition(content, file_name)
+        pages = len({element["metadata"]["page_number"] for element in elements})
+        time.sleep(standin.latency + standin.per_page_latency * pages)
+        self.send_body(json.dumps(elements).encode("utf-8"), "application/json")
+
+
+class PartitionServer(StandInServer):
+    """`/general/v0/general` answering like the Unstructured API, with latency.
+
+    Form feeds separate pages and blank lines separate elements, so a
+    request costs `latency` plus `per_page_latency` for each page.
+    Point `UnstructuredParser` at it with `server_url=server.url`.
+    """
+
+    handler_class = _PartitionHandler
+
+    def __init__(self, latency=0.2, per_page_latency=0.01):
+        super().__init__()
+        self.latency = latency
+        self.per_page_latency = per_page_latency
+
+    @staticmethod
+    def partition(content, file_name):
+        elements = []
+        text = content.decode("utf-8", errors="replace")
+        for page_number, page in enumerate(text.split("\f"), start=1):
+            for paragraph in page.split("\n\n"):
+                paragraph = paragraph.strip()
+                if not paragraph:
+                    continue
+                elements.append({
+                    "type": "NarrativeText",
+                    "element_id": hashlib.sha256(f"{page_number}:{paragraph}".encode("utf-8")).hexdigest()[:32],
+                    "text": paragraph,
+                    "metadata": {"filename": file_name, "filetype": "text/plain",
+                                 "languages": ["eng"], "page_number": page_number},
+                })
+        return elements
+
+
+class _SearchHandler(_StandInHandler):
+    def do_POST(self):
+        standin = self.server.standin
+        standin.count("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        documents = json.loads(self.rfile.read(length))["value"]
+        time.sleep(standin.latency)
+        status = standin.request_status(self.path, self.headers.get("api-key"), documents)
+        if status != 200:
+            self.send_body(json.dumps({"error": {"message": "stand-in"}}).encode("utf-8"),
+                           "application/json", status=status)
+            return
+        results = [standin.index(document) for document in documents]
+        multi_status = any(not result["status"] for result in results)
+        self.send_body(json.dumps({"value": results}).encode("utf-8"), "application/json",
+                       status=207 if multi_status else 200)
+
+
+class SearchServer(StandInServer):
+    """`/indexes/<name>/docs/index` answering like Azure Search, with latency.
+
+    `throttle` lists status codes, such as 429, that the first requests
+    get instead of being indexed. `document_status` maps a document id
+    to the per-document status codes its first uploads get, such as
+    `[503]` for a document that succeeds on its second try or `[400]`
+    for one that is never accepted. Indexed documents are kept in
+    `documents` by id; `batches` records the size of every request.
+    Point `AzureSearchSink` at it with `service_endpoint=server.url`.
+    """
+
+    handler_class = _SearchHandler
+
+    def __init__(self, latency=0.05, throttle=(), document_status=None):
+        super().__init__()
+        self.latency = latency
+        self.throttle = list(throttle)
+        self.document_status = {key: list(codes) for key, codes in (document_status or {}).items()}
+        self.documents = {}
+        self.batches = []
+
+    def request_status(self, path, api_key, documents):
+        """Record a request and return the status code it gets as a whole."""
+        with self._lock:
+            self.batches.append(len(documents))
+            if not path.split("?")[0].endswith("/docs/index") or not api_key:
+                return 404 if api_key else 403
+            if len(documents) > 1000:
+                return 413
+            return self.throttle.pop(0) if self.throttle else 200
+
+    def index(self, document):
+        """Index one document, or fail it as `document_status` says."""
+        key = document["id"]
+        with self._lock:
+            codes = self.document_status.get(key)
+            code = codes.pop(0) if codes else 201
+            if code < 300:
+                self.documents[key] = document
+        result = {"key": key, "status": code < 300, "statusCode": code}
+        if code >= 300:
+            result["errorMessage"] = f"stand-in status {code}"
+        return result
@@ -0,0 +1,127 @@
+"""Throughput of `TextNormalizer` on large SEC filings.
+
+Generates EDGAR full-text submissions (SGML header with ticker tags,
+an N-PORT XML holdings document and an HTML exhibit full of `&nbsp;`
+tables), splits them into page-sized elements like `chunking_strategy=
+"by_page"` and times, per element:
+
+* the old path: `UnstructuredParser`'s per-call pattern string with
+  `re.findall`/`re.sub`, then `DocumentCleaner` with the `JSONLReader`
+  `remove_regex`;
+* `TextNormalizer.has_content` for the parser's empty-element check
+  and `TextNormalizer.run` as the cleaner, on the same elements.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.text_normalizer --megabytes 50
+"""
+import argparse
+import random
+import re
+import time
+
+from haystack import Document
+from haystack.components.preprocessors import DocumentCleaner
+
+from text_normalizer import TextNormalizer
+
+
+def sec_filing(rng, target_bytes):
+    """An EDGAR-style submission of roughly `target_bytes`."""
+    tickers = ["".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(4)) + "X" for _ in range(6)]
+    parts = ["<SEC-HEADER>0001145549-24-032499.hdr.sgml : 20240529\n<ACCEPTANCE-DATETIME>20240529131500\n",
+             "<SERIES-AND-CLASSES-CONTRACTS-DATA>\n"]
+    for ticker in tickers:
+        parts.append(f"<CLASS-CONTRACT>\n<CLASS-CONTRACT-ID>C000{rng.randint(100000, 999999)}\n"
+                     f"<CLASS-CONTRACT-NAME>Class I Shares\n<CLASS-CONTRACT-TICKER-SYMBOL>{ticker}\n</CLASS-CONTRACT>\n")
+    parts.append("</SERIES-AND-CLASSES-CONTRACTS-DATA>\n</SEC-HEADER>\n<DOCUMENT>\n<TYPE>NPORT-P\n<TEXT>\n<XML>\n")
+    size = sum(len(part) for part in parts)
+    while size < target_bytes:
+        if rng.random() < 0.7:
+            part = (f"<invstOrSec>\n\t<name>{rng.choice(['Apple Inc.', 'U.S. Treasury Note', 'Microsoft Corp.'])}</name>\n"
+                    f"\t<lei>{rng.randint(10**19, 10**20 - 1)}</lei>\n\t<cusip>{rng.randint(10**8, 10**9 - 1)}</cusip>\n"
+                    f"\t<balance>{rng.uniform(1, 1e6):.2f}</balance>\n\t<valUSD>{rng.uniform(1, 1e8):.2f}</valUSD>\n"
+                    f"\t<pctVal>{rng.uniform(0, 5):.6f}</pctVal>\n</invstOrSec>\n")
+        else:
+            part = (f"<tr><td style=\"font-family:Times New Roman\">Net&nbsp;assets&nbsp;(%)</td>"
+                    f"<td>&nbsp;</td><td align=\"right\">${rng.uniform(1, 1e6):,.2f}</td></tr>\n"
+                    f"<p>The Fund's investment adviser -- as of 03/31/2024 -- reported {rng.randint(1, 99)}% "
+                    f"exposure (see Note {rng.randint(1, 12)}); all figures are unaudited.</p>\n")
+        parts.append(part)
+        size += len(part)
+    parts.append("</XML>\n</TEXT>\n</DOCUMENT>\n")
+    return "".join(parts)
+
+
+def pages(text, page_bytes):
+    return [text[index:index + page_bytes] for index in range(0, len(text), page_bytes)]
+
+
+def old_path(elements, cleaner):
+    kept = []
+    for text in elements:
+        regex_pattern = (
+            r'<.*?>'  # HTML tags
+            r'|\t'  # Tabs
+            r'|\n+'  # Newlines
+            r'|&nbsp;'  # Non-breaking spaces
+            r'|[^a-zA-Z0-9\s-]'  # Any non-alphanumeric character (excluding whitespace)
+        )
+        meta = {}
+        symbol_matches = re.findall(r'<CLASS-CONTRACT-TICKER-SYMBOL>(\S+)', text)
+        if symbol_matches:
+            meta['symbol'] = ','.join(symbol_matches)
+        if re.sub(regex_pattern, '', text) == "":
+            continue
+        kept.append(Document(content=text, meta=meta))
+    return cleaner.run(documents=kept)["documents"]
+
+
+def new_path(elements, parser_normalizer, normalizer):
+    kept = []
+    for text in elements:
+        meta = {}
+        symbol_matches = parser_normalizer.symbols(text)
+        if symbol_matches:
+            meta['symbol'] = ','.join(symbol_matches)
+        if not parser_normalizer.has_content(text):
+            continue
+        kept.append(Document(content=text, meta=meta))
+    return normalizer.run(documents=kept)["documents"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=50)
+    parser.add_argument("--filing-megabytes", type=float, default=10)
+    parser.add_argument("--page-bytes", type=int, default=4000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    filings = [sec_filing(rng, int(args.filing_megabytes * 2**20))
+               for _ in range(max(1, round(args.megabytes / args.filing_megabytes)))]
+    elements = [page for filing in filings for page in pages(filing, args.page_bytes)]
+    total = sum(len(element) for element in elements) / 2**20
+    print(f"{len(filings)} filings, {len(elements)} elements, {total:.1f} MB")
+
+    cleaner = DocumentCleaner(remove_empty_lines=True, remove_extra_whitespaces=True,
+                              remove_repeated_substrings=False, remove_substrings=None,
+                              remove_regex=(r'<.*?>|\t|\n+|&nbsp;|[^a-zA-Z0-9\s]'))
+    start = time.perf_counter()
+    old_documents = old_path(elements, cleaner)
+    old_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_documents = new_path(elements, TextNormalizer(keep_characters="-"), TextNormalizer())
+    new_seconds = time.perf_counter() - start
+
+    for name, seconds, documents in [("findall/sub + DocumentCleaner", old_seconds, old_documents),
+                                     ("TextNormalizer", new_seconds, new_documents)]:
+        symbols = sum(1 for document in documents if document.meta.get("symbol"))
+        print(f"{name:<30} {total / seconds:7.1f} MB/s  {len(elements) / seconds:>9,.0f} elements/s  "
+              f"({len(documents)} documents, {symbols} with symbols)")
+    print(f"speedup {old_seconds / new_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Connections and wall time of `UnstructuredParser` against local stand-ins.
+
+Serves generated filings from a `FilingServer` and partitions them with
+a `PartitionServer`, both with simulated latency, then compares:
+
+* the old path: a new `UnstructuredClient` and a bare `requests.get`
+  per call, one call per filing as `JSONLReader` makes them;
+* the pooled parser, one call per filing;
+* the pooled parser, all filings in one call, at each `--max-in-flight`.
+
+It checks that every path produces the same element texts.
+
+Run from the `indexing-pipelines` directory:
+
+    python -m benchmarks.unstructured_parser --filings 16 --max-in-flight 1 4 8
+"""
+import argparse
+import logging
+import random
+import time
+
+import requests
+from unstructured.staging.base import dict_to_elements
+from unstructured_client import UnstructuredClient
+from unstructured_client.models import shared
+
+from benchmarks.standins import FilingServer, PartitionServer
+from benchmarks.text_normalizer import pages, sec_filing
+from text_normalizer import TextNormalizer
+from unstructured_component import HEADERS, UnstructuredParser
+
+API_KEY = "stand-in"
+
+
+def legacy_run(server_url, sources, normalizer):
+    """`UnstructuredParser.run` before pooling: new client, bare GET, serial."""
+    client = UnstructuredClient(api_key_auth=API_KEY, server_url=server_url)
+    texts = []
+    for source in sources:
+        content = requests.get(source, headers=HEADERS).content
+        response = client.general.partition(shared.PartitionParameters(
+            files=shared.Files(content=content, file_name=source),
+            strategy="auto", hi_res_model_name="yolox", chunking_strategy="by_page"))
+        texts.extend(item.text for item in dict_to_elements(response.elements)
+                     if normalizer.has_content(item.text))
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filings", type=int, default=16)
+    parser.add_argument("--filing-kilobytes", type=int, default=200)
+    parser.add_argument("--page-kilobytes", type=int, default=10)
+    parser.add_argument("--download-latency", type=float, default=0.05)
+    parser.add_argument("--partition-latency", type=float, default=0.2)
+    parser.add_argument("--per-page-latency", type=float, default=0.005)
+    parser.add_argument("--max-in-flight", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+    logging.getLogger("unstructured_component").setLevel(logging.WARNING)
+
+    rng = random.Random(7)
+    files = {}
+    for index in range(args.filings):
+        text = sec_filing(rng, args.filing_kilobytes * 1000).replace("</invstOrSec>\n", "</invstOrSec>\n\n")
+        files[f"/Archives/edgar/data/{index}/0001145549-24-{index:06d}.txt"] = \
+            "\f".join(pages(text, args.page_kilobytes * 1000)).encode("utf-8")
+
+    with FilingServer(files, args.download_latency) as edgar, \
+            PartitionServer(args.partition_latency, args.per_page_latency) as api:
+        urls = edgar.urls()
+        normalizer = TextNormalizer(keep_characters="-")
+        print(f"{len(urls)} filings of {args.filing_kilobytes} KB, "
+              f"{args.filing_kilobytes // args.page_kilobytes} pages each; connections/requests per server")
+
+        def per_call(run):
+            texts = []
+            for url in urls:
+                texts.extend(run([url]))
+            return texts
+
+        def parsed(parser):
+            return lambda sources: [document.content for document in parser.run(sources)["documents"]]
+
+        def pooled(max_in_flight):
+            return UnstructuredParser(API_KEY, "by_page", "auto", "yolox",
+                                      server_url=api.url, max_in_flight=max_in_flight)
+
+        runs = [("old, one call per filing", lambda: per_call(lambda sources: legacy_run(api.url, sources, normalizer))),
+                ("pooled, one call per filing", lambda parser=pooled(1): per_call(parsed(parser)))]
+        for max_in_flight in args.max_in_flight:
+            runs.append((f"pooled, one call, x{max_in_flight}",
+                         lambda parser=pooled(max_in_flight): parsed(parser)(urls)))
+
+        reference = None
+        for name, run in runs:
+            edgar.reset()
+            api.reset()
+            start = time.perf_counter()
+            texts = run()
+            seconds = time.perf_counter() - start
+            print(f"{name:<30} {seconds:6.2f}s  {len(urls) / seconds:6.1f} filings/s  "
+                  f"connections: edgar {edgar.connections:3d}/{edgar.requests:<3d} "
+                  f"api {api.connections:3d}/{api.requests:<3d}  ({len(texts)} elements)")
+            reference = reference or texts
+            assert texts == reference, f"{name} elements differ from the old path"
+        print("all paths produced identical elements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Incremental BM25 inverted index and reciprocal rank fusion.
+
+Mirrors the full-text side of the Azure AI Search index in
+`init_azure_index.py`, where `content` and `meta` are searchable, so
+keyword and vector results can be fused locally.
+"""
+from collections import Counter
+from dataclasses import replace
+from heapq import nlargest
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import math
+import re
+
+from haystack import Document
+
+# Words, plus identifiers joined by "-", "." or "&" such as "10-K", "BRK.B" or "S&P"
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-.&][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase `text` and split it into terms.
+
+    Ticker symbols and form types stay single terms, so "10-K" only
+    matches "10-K" and not every "10" and "K" in the corpus.
+    """
+    return _TOKEN.findall(text.lower())
+
+
+class Bm25Index:
+    """
+    Okapi BM25 over an inverted index that is updated one document at a time.
+
+    Every `add` and `remove` updates the postings, document lengths and
+    collection statistics in place, so the index follows a stream
+    without rebuilds. Scores use the statistics at query time.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        :param k1: Term frequency saturation.
+        :param b: Document length normalization, from 0 (none) to 1 (full).
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        # Distinct terms of every document, so removing one only touches its postings
+        self._terms: Dict[str, Tuple[str, ...]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._lengths
+
+    def add(self, doc_id: str, text: str) -> None:
+        """Index `text` under `doc_id`, replacing what was indexed for it before."""
+        if doc_id in self._lengths:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+        length = sum(terms.values())
+        self._lengths[doc_id] = length
+        self._terms[doc_id] = tuple(terms)
+        self._total_length += length
+
+    def remove(self, doc_id: str) -> None:
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Tuple[float, str]]:
+        """
+        Return up to `k` `(score, doc_id)` pairs for `query`, best first.
+
+        Only documents containing at least one query term are scored.
+        Without `k` every such document is returned.
+        """
+        count = len(self._lengths)
+        if not count:
+            return []
+        average_length = self._total_length / count
+        norm = self.k1 * (1 - self.b)
+        scale = self.k1 * self.b / average_length
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                tf = frequency * (self.k1 + 1) / (frequency + norm + scale * self._lengths[doc_id])
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf
+        ranked = ((score, doc_id) for doc_id, score in scores.items())
+        if k is None:
+            return sorted(ranked, reverse=True)
+        return nlargest(k, ranked)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Iterable[Document]],
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+    top_k: Optional[int] = None,
+) -> List[Document]:
+    """
+    Merge ranked document lists by reciprocal rank fusion.
+
+    A document scores `weight / (k + rank)` in every list it appears in,
+    with ranks starting at 1, and the scores are summed. Only ranks are
+    used, so BM25 and cosine scores need no normalization.
+
+    :param rankings: Document lists, best first.
+    :param k: Damping constant; larger values flatten the rank curve.
+    :param weights: Weight of each list. Defaults to 1 each.
+    :param top_k: Number of documents to return. Defaults to all.
+    :return: The fused documents with their fusion score, best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, document in enumerate(ranking, start=1):
+            scores[document.id] = scores.get(document.id, 0.0) + weight / (k + rank)
+            documents.setdefault(document.id, document)
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [replace(documents[doc_id], score=score) for doc_id, score in fused]
@@ -1,31 +1,88 @@
 """Connectors for local text files with delay."""
 from pathlib import Path
-from typing import Callable, List, Dict, Any, Optional, Union
+from typing import Callable, List, Dict, Any, Optional, Tuple, Union
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+import functools
 import json
+import logging
 import os
+import time
+import zlib
 
 import requests
+import requests.adapters
 from typing_extensions import override
-from bytewax.connectors.files import FileSource, _FileSourcePartition
+from bytewax.connectors.files import FileSource
 from bytewax.outputs import StatelessSinkPartition, DynamicSink
+from haystack import Document
+from haystack.document_stores.types import DuplicatePolicy
 from dotenv import load_dotenv
 load_dotenv(".env")
 search_api_key = os.getenv("AZURE_SEARCH_ADMIN_KEY")
 
 from bytewax import inputs
+from bytewax.inputs import (DynamicSource, FixedPartitionedSource, StatefulSourcePartition,
+                            StatelessSourcePartition)
+
+from deserialize import safe_deserialize
+from filing_stream import IncrementalSplitter, filing_text_url, iter_filing
+from hnsw_document_store import HnswDocumentStore
+from jsonl_mmap import JsonlLines
+
+logger = logging.getLogger(__name__)
 
 def _get_path_dev(path: Path) -> str:
     return hex(path.stat().st_dev)
 
-class _SimulationSourcePartition(_FileSourcePartition):
+class _MmapJsonlPartition(StatefulSourcePartition[bytes, int]):
+    def __init__(self, path: Path, batch_size: int, resume_state: Optional[int]):
+        self._lines = JsonlLines.open(path)
+        self._offset = resume_state or 0
+        self._batches = self._lines.batches(self._offset, batch_size)
+
+    @override
+    def next_batch(self) -> List[bytes]:
+        # Raises StopIteration at the end of the file
+        batch, self._offset = next(self._batches)
+        return batch
+
+    @override
+    def snapshot(self) -> int:
+        return self._offset
+
+    @override
+    def close(self) -> None:
+        self._lines.close()
+
+class MmapJsonlSource(FileSource):
+    """Read a JSONL file through a memory map, in large batches.
+
+    Takes the same arguments as {py:obj}`FileSource` and reads each
+    unique file on one worker the same way, but emits every line as
+    `bytes` copied out of the map instead of a decoded `str`. Pass the
+    lines to `safe_deserialize`, which parses them without decoding.
+
+    The state is the byte offset of the next line, so a resumed run
+    continues at the first line not yet emitted.
+    """
+
+    @override
+    def build_part(
+        self, step_id: str, for_part: str, resume_state: Optional[int]
+    ) -> _MmapJsonlPartition:
+        _fs_id, path = for_part.split("::", 1)
+        assert path == str(self._path), "Can't resume reading from different file"
+        return _MmapJsonlPartition(self._path, self._batch_size, resume_state)
+
+class _SimulationSourcePartition(_MmapJsonlPartition):
     def __init__(self, path: Path, batch_size: int, resume_state: Optional[int], delay: timedelta):
         super().__init__(path, batch_size, resume_state)
         self._delay = delay
         self._next_awake = datetime.now(timezone.utc)
 
     @override
-    def next_batch(self) -> List[str]:
+    def next_batch(self) -> List[bytes]:
         if self._delay:
             self._next_awake += self._delay
         return super().next_batch()
@@ -34,8 +91,11 @@ class _SimulationSourcePartition(_FileSourcePartition):
     def next_awake(self) -> Optional[datetime]:
         return self._next_awake
 
-class SimulationSource(FileSource):
-    """Read a path line-by-line from the filesystem with a delay between batches."""
+class SimulationSource(MmapJsonlSource):
+    """Read a path line-by-line from the filesystem with a delay between batches.
+
+    Lines are emitted as `bytes`, as with {py:obj}`MmapJsonlSource`.
+    """
 
     def __init__(
         self,
@@ -74,49 +134,569 @@ class SimulationSource(FileSource):
         assert path == str(self._path), "Can't resume reading from different file"
         return _SimulationSourcePartition(self._path, self._batch_size, resume_state, self._delay)
 
+def _event_seconds(value: Any) -> Optional[float]:
+    """Epoch seconds of an ISO 8601 string or a number, or None."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+@functools.lru_cache(maxsize=16)
+def _first_event_seconds(path: str, time_field: str, _mtime: float) -> Optional[float]:
+    """Earliest `time_field` in the file; the replay clock starts there for every partition."""
+    times = []
+    with open(path, "rb") as f:
+        for line in f:
+            event = safe_deserialize(line)
+            seconds = _event_seconds(event.get(time_field)) if event else None
+            if seconds is not None:
+                times.append(seconds)
+    return min(times, default=None)
+
+
+def _line_start(f, offset: int) -> int:
+    """Offset of the first line starting at or after `offset`."""
+    if offset == 0:
+        return 0
+    f.seek(offset - 1)
+    f.readline()
+    return f.tell()
+
+
+# Byte offset of the next unread line and replay clock position in event-time seconds
+_ReplayState = Tuple[int, float]
+
+
+class _ReplayPartition(StatefulSourcePartition[str, _ReplayState]):
+    def __init__(
+        self,
+        path: Path,
+        start: int,
+        end: Optional[int],
+        shard: Optional[Callable[[bytes], bool]],
+        batch_size: int,
+        speed: Optional[float],
+        time_field: str,
+        first_seconds: Optional[float],
+        resume_state: Optional[_ReplayState],
+    ):
+        self._file = open(path, "rb")
+        self._offset, self._position = resume_state or (start, 0.0)
+        self._file.seek(self._offset)
+        self._end = end
+        self._shard = shard
+        self._batch_size = batch_size
+        self._speed = speed
+        self._time_field = time_field
+        self._first_seconds = first_seconds
+        # Wall-clock time at which the replay clock read 0
+        self._origin = datetime.now(timezone.utc) - timedelta(seconds=self._position / (speed or 1))
+        self._pending: Optional[Tuple[bytes, int, datetime]] = None
+
+    def _next_line(self) -> Optional[Tuple[bytes, int, datetime]]:
+        """The next line of this partition, its end offset and when it is due."""
+        while self._end is None or self._file.tell() < self._end:
+            line = self._file.readline()
+            if not line:
+                break
+            if not line.strip() or (self._shard is not None and not self._shard(line)):
+                self._offset = self._file.tell()
+                continue
+            due = self._origin
+            if self._speed and self._first_seconds is not None:
+                event = safe_deserialize(line)
+                seconds = _event_seconds(event.get(self._time_field)) if event else None
+                if seconds is not None:
+                    position = max((seconds - self._first_seconds) / self._speed, 0.0)
+                    due = self._origin + timedelta(seconds=position)
+            return line, self._file.tell(), due
+        return None
+
+    @override
+    def next_batch(self) -> List[str]:
+        batch: List[str] = []
+        now = datetime.now(timezone.utc)
+        while len(batch) < self._batch_size:
+            if self._pending is None:
+                self._pending = self._next_line()
+                if self._pending is None:
+                    if batch:
+                        return batch
+                    raise StopIteration()
+            line, end, due = self._pending
+            if due > now:
+                break
+            batch.append(line.decode("utf-8").rstrip("\r\n"))
+            self._offset = end
+            # In event time, so a resumed replay keeps its place at any speed
+            elapsed = (due - self._origin).total_seconds() * (self._speed or 1)
+            self._position = max(self._position, elapsed)
+            self._pending = None
+        return batch
+
+    @override
+    def next_awake(self) -> Optional[datetime]:
+        return self._pending[2] if self._pending is not None else None
+
+    @override
+    def snapshot(self) -> _ReplayState:
+        return self._offset, self._position
+
+    @override
+    def close(self) -> None:
+        self._file.close()
+
+
+class ReplaySource(FixedPartitionedSource[str, _ReplayState]):
+    """Replay a JSONL file as N partitions, paced by event time or unthrottled.
+
+    Unlike `SimulationSource`, whose single partition is read by one
+    worker, the file is split into `partitions` shards that Bytewax
+    spreads over all workers, so a replay exercises `-w`/`-p` the way
+    production input would. Shards are contiguous line ranges of
+    roughly equal size, or, with `shard_by`, every line whose key
+    hashes to the partition, so all events of one ticker or filer stay
+    in order on one worker.
+
+    With `speed`, each line is emitted when the replay clock reaches
+    its `time_field`, scaled: 60 replays an hour in a minute. All
+    partitions start their clock at the file's earliest event time.
+    Lines without a time are emitted right away. Items are the raw
+    lines, as from `FileSource`. Resume state is the byte offset of
+    the next unread line and the event time the replay clock reached.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        partitions: int = 4,
+        shard_by: Union[None, str, Callable[[Dict[str, Any]], Any]] = None,
+        speed: Optional[float] = None,
+        time_field: str = "updated_at",
+        batch_size: int = 100,
+    ):
+        """Init.
+
+        :arg path: JSONL file of events, bare or as `[key, event]`.
+
+        :arg partitions: Number of shards. Defaults to 4.
+
+        :arg shard_by: `None` to shard by line range, an event field
+            such as "cik" or "symbols", or a function of the event
+            returning its key. Defaults to line ranges.
+
+        :arg speed: Replay speed relative to the original event times,
+            or `None` to replay as fast as possible. Defaults to `None`.
+
+        :arg time_field: Event field holding the event time, as ISO
+            8601 or epoch seconds. Defaults to "updated_at".
+
+        :arg batch_size: Most lines per batch. Defaults to 100.
+
+        """
+        if partitions <= 0:
+            raise ValueError("partitions must be greater than 0")
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be greater than 0, or None to replay as fast as possible")
+        self._path = Path(path)
+        self._partitions = partitions
+        if isinstance(shard_by, str):
+            field = shard_by
+            shard_by = lambda event: event.get(field)
+        self._shard_by = shard_by
+        self._speed = speed
+        self._time_field = time_field
+        self._batch_size = batch_size
+
+    @override
+    def list_parts(self) -> List[str]:
+        # Every worker can read the file; Bytewax assigns each shard to one of them
+        return [f"replay-{index}-of-{self._partitions}" for index in range(self._partitions)]
+
+    def _key_shard(self, index: int) -> Callable[[bytes], bool]:
+        def in_shard(line: bytes) -> bool:
+            event = safe_deserialize(line)
+            key = self._shard_by(event) if event is not None else None
+            return zlib.crc32(str(key).encode("utf-8")) % self._partitions == index
+
+        return in_shard
+
+    @override
+    def build_part(
+        self, step_id: str, for_part: str, resume_state: Optional[_ReplayState]
+    ) -> _ReplayPartition:
+        index = int(for_part.split("-")[1])
+        if self._shard_by is None:
+            size = self._path.stat().st_size
+            with open(self._path, "rb") as f:
+                start = _line_start(f, index * size // self._partitions)
+                end = _line_start(f, (index + 1) * size // self._partitions)
+            shard = None
+        else:
+            start, end, shard = 0, None, self._key_shard(index)
+        first_seconds = None
+        if self._speed:
+            first_seconds = _first_event_seconds(str(self._path), self._time_field,
+                                                 self._path.stat().st_mtime)
+        return _ReplayPartition(self._path, start, end, shard, self._batch_size, self._speed,
+                                self._time_field, first_seconds, resume_state)
+
+
+class _FilingChunkPartition(StatelessSourcePartition[Document]):
+    def __init__(
+        self,
+        events: List[Dict[str, Any]],
+        metadata_fields: List[str],
+        split_by: str,
+        split_length: int,
+        window_chars: int,
+        read_bytes: int,
+    ):
+        self._events = events
+        self._metadata_fields = metadata_fields
+        self._split_by = split_by
+        self._split_length = split_length
+        self._window_chars = window_chars
+        self._read_bytes = read_bytes
+        self._session = requests.Session()
+        self._next_event = 0
+        self._event: Optional[Dict[str, Any]] = None
+        self._pieces = None
+
+    @override
+    def next_batch(self) -> List[Document]:
+        if self._pieces is None:
+            if self._next_event == len(self._events):
+                raise StopIteration()
+            self._start(self._events[self._next_event])
+            self._next_event += 1
+
+        # One network read per batch, so chunks flow downstream while the filing downloads
+        try:
+            texts = self._splitter.feed(next(self._pieces))
+        except StopIteration:
+            texts = self._splitter.finish()
+            self._pieces = None
+        except requests.RequestException as e:
+            logger.error("Download of %s failed: %s", self._url, e)
+            texts = self._splitter.finish()
+            self._pieces = None
+        return [self._document(text) for text in texts]
+
+    @override
+    def close(self) -> None:
+        if self._pieces is not None:
+            self._pieces.close()
+        self._session.close()
+
+    def _start(self, event: Dict[str, Any]) -> None:
+        self._event = event
+        self._url = filing_text_url(event["url"])
+        self._pieces = iter_filing(self._url, self._session, self._read_bytes)
+        self._splitter = IncrementalSplitter(self._split_by, self._split_length, self._window_chars)
+        self._chunk_index = 0
+        self._page_number = 1
+
+    def _document(self, text: str) -> Document:
+        meta = {field: self._event[field] for field in self._metadata_fields if field in self._event}
+        meta.update(source_url=self._url, chunk_index=self._chunk_index, page_number=self._page_number)
+        self._chunk_index += 1
+        self._page_number += text.count("\f")
+        return Document(content=text, meta=meta)
+
+
+class FilingChunkSource(DynamicSource[Document]):
+    """Stream SEC filings listed in a JSONL file as chunk documents.
+
+    Each event's `url` is rewritten from the EDGAR index page to the
+    full-text `.txt` submission, which is downloaded in pieces and
+    split incrementally. A chunk is emitted as soon as its last unit
+    has arrived, so downstream steps start before the download ends,
+    and memory stays bounded by `window_chars` however large the
+    filing is. Events are spread over workers by line.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        metadata_fields: Optional[List[str]] = None,
+        split_by: str = "passage",
+        split_length: int = 5,
+        window_chars: int = 1_000_000,
+        read_bytes: int = 65536,
+    ):
+        """Init.
+
+        :arg path: JSONL file of SEC events with a `url` or `link`.
+
+        :arg metadata_fields: Event fields copied to every chunk's
+            meta. Defaults to title, form_type, cik and symbol.
+
+        :arg split_by: "page", "passage", "sentence" or "word", as for
+            `DocumentSplitter`. Defaults to "passage".
+
+        :arg split_length: Units per chunk. Defaults to 5.
+
+        :arg window_chars: Most characters held back per filing while
+            waiting for a chunk to complete. Defaults to 1,000,000.
+
+        :arg read_bytes: Largest network read per batch. Defaults to
+            64 KiB.
+
+        """
+        self._path = Path(path)
+        self._metadata_fields = metadata_fields or ["title", "form_type", "cik", "symbol"]
+        self._split_by = split_by
+        self._split_length = split_length
+        self._window_chars = window_chars
+        self._read_bytes = read_bytes
+
+    @override
+    def build(
+        self, _step_id: str, worker_index: int, worker_count: int
+    ) -> _FilingChunkPartition:
+        with open(self._path) as f:
+            lines = [line for index, line in enumerate(f) if index % worker_count == worker_index]
+        events = [event for event in map(safe_deserialize, lines) if event is not None]
+        return _FilingChunkPartition(events, self._metadata_fields, self._split_by,
+                                     self._split_length, self._window_chars, self._read_bytes)
+
+
+@dataclass
+class UploadStats:
+    """Running upload totals of one worker's Azure Search sink partitions."""
+
+    documents: int = 0
+    failed: int = 0
+    retries: int = 0
+    requests: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Uploaded documents per second spent waiting on the service."""
+        return self.documents / self.seconds if self.seconds else 0.0
+
+    @property
+    def latency(self) -> float:
+        """Mean seconds per `docs/index` request."""
+        return self.seconds / self.requests if self.requests else 0.0
+
+# Per-document status codes worth retrying, see
+# https://learn.microsoft.com/en-us/rest/api/searchservice/addupdate-or-delete-documents
+_RETRYABLE_DOCUMENT_STATUS = {409, 422, 503}
+_RETRYABLE_REQUEST_STATUS = {429, 502, 503, 504}
+
 class _AzureSearchPartition(StatelessSinkPartition[Any]):
+    def __init__(self, endpoint: str, api_key: str, chunk_size: int, max_retries: int, backoff: float,
+                 stats: UploadStats):
+        self._endpoint = endpoint
+        self._chunk_size = chunk_size
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self.stats = stats
+
+        # One pooled keep-alive session for every request of this worker
+        self._session = requests.Session()
+        self._session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._session.headers.update({
+            'Content-Type': 'application/json',
+            'api-key': api_key
+        })
+
     @override
-    def write_batch(self, dictionary) -> None:
-        index_name = "bytewax-index"
-        search_api_version = '2023-11-01'
-        search_endpoint = f'https://bytewax-workshop.search.windows.net/indexes/{index_name}/docs/index?api-version={search_api_version}'  
-        headers = {  
-            'Content-Type': 'application/json',  
-            'api-key': search_api_key  
-        }  
-
-        dictionary = dictionary[0]
-        # Use the flattened meta directly
-        flattened_meta = dictionary['meta']
-        
-        # Convert DataFrame to the format expected by Azure Search  
-        body = json.dumps({  
-            "value": [  
-                {  
-                    "@search.action": "upload",  
-                    "id": dictionary['id'],  
-                    "content": dictionary['content'],  
-                    "meta": flattened_meta,  # Use flattened meta
-                    "vector": dictionary['vector']  # Include the generated embeddings  
-                } 
-            ]  
-        })  
-        
-        # Upload documents to Azure Search  
-        response = requests.post(search_endpoint, 
-                                 headers=headers, data=body) 
-
-        return {"status": "success" if response.status_code == 200 else response.text}
+    def write_batch(self, items: List[Dict[str, Any]]) -> None:
+        for start in range(0, len(items), self._chunk_size):
+            self._upload(items[start:start + self._chunk_size])
+        logger.info("Azure Search: %d documents, %d failed, %.0f docs/s, %.3fs/request",
+                    self.stats.documents, self.stats.failed, self.stats.throughput, self.stats.latency)
+
+    @override
+    def close(self) -> None:
+        self._session.close()
+
+    def _upload(self, items: List[Dict[str, Any]]) -> None:
+        pending = {item['id']: item for item in items}
+        for attempt in range(self._max_retries + 1):
+            if attempt:
+                self.stats.retries += len(pending)
+                time.sleep(self._backoff * 2 ** (attempt - 1))
+
+            body = json.dumps({
+                "value": [
+                    {
+                        "@search.action": "upload",
+                        "id": item['id'],
+                        "content": item['content'],
+                        "meta": item['meta'],  # Flattened meta serialized by JSONLReader
+                        "vector": item['vector']
+                    }
+                    for item in pending.values()
+                ]
+            })
+            start = time.perf_counter()
+            response = self._session.post(self._endpoint, data=body)
+            self.stats.seconds += time.perf_counter() - start
+            self.stats.requests += 1
+
+            if response.status_code in _RETRYABLE_REQUEST_STATUS:
+                logger.warning("Azure Search returned %d, retrying %d documents", response.status_code, len(pending))
+                continue
+            response.raise_for_status()
+
+            # 200 means every document succeeded, 207 that some failed
+            retry = {}
+            for result in response.json()["value"]:
+                if result["status"]:
+                    self.stats.documents += 1
+                elif result["statusCode"] in _RETRYABLE_DOCUMENT_STATUS:
+                    retry[result["key"]] = pending[result["key"]]
+                else:
+                    self.stats.failed += 1
+                    logger.error("Azure Search rejected %s: %s", result["key"], result.get("errorMessage"))
+            pending = retry
+            if not pending:
+                return
+
+        self.stats.failed += len(pending)
+        logger.error("Giving up on %d documents after %d retries: %s",
+                     len(pending), self._max_retries, list(pending))
 
 class AzureSearchSink(DynamicSink[Any]):
-    """Write each output item to Azure Search
+    """Upload output items to an Azure Search index in bulk.
+
+    Each Bytewax batch is sent in `docs/index` requests of up to
+    `chunk_size` documents over a pooled session. Documents the
+    service reports as throttled or conflicting are retried with
+    exponential backoff. `stats` holds the `UploadStats` of each
+    worker index, carried over when a worker's partition is rebuilt.
     """
 
+    def __init__(
+        self,
+        index_name: str = "bytewax-index",
+        service_endpoint: str = "https://bytewax-workshop.search.windows.net",
+        api_key: Optional[str] = search_api_key,
+        api_version: str = "2023-11-01",
+        chunk_size: int = 1000,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        """Init.
+
+        :arg index_name: Name of the search index. Defaults to
+            "bytewax-index".
+
+        :arg service_endpoint: Base URL of the search service.
+
+        :arg api_key: Admin key. Defaults to the
+            `AZURE_SEARCH_ADMIN_KEY` environment variable.
+
+        :arg api_version: REST API version. Defaults to "2023-11-01".
+
+        :arg chunk_size: Documents per request. Azure Search accepts
+            at most 1000. Defaults to 1000.
+
+        :arg max_retries: How many times to retry failed documents.
+            Defaults to 3.
+
+        :arg backoff: Seconds to wait before the first retry; doubled
+            for every further retry. Defaults to 0.5.
+
+        """
+        self._endpoint = f"{service_endpoint}/indexes/{index_name}/docs/index?api-version={api_version}"
+        self._api_key = api_key
+        self._chunk_size = min(chunk_size, 1000)
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self.stats: Dict[int, UploadStats] = {}
+
     @override
     def build(
-        self, _step_id: str, _worker_index: int, _worker_count: int
+        self, _step_id: str, worker_index: int, _worker_count: int
     ) -> _AzureSearchPartition:
-        return _AzureSearchPartition()
+        # Only the totals outlive a partition, one per worker however often it is rebuilt
+        stats = self.stats.setdefault(worker_index, UploadStats())
+        return _AzureSearchPartition(self._endpoint, self._api_key, self._chunk_size,
+                                     self._max_retries, self._backoff, stats)
+
+class _HnswPartition(StatelessSinkPartition[Any]):
+    def __init__(self, store: HnswDocumentStore, save_every: int):
+        self._store = store
+        self._save_every = save_every
+        self._unsaved = 0
+
+    @override
+    def write_batch(self, items: List[Dict[str, Any]]) -> None:
+        documents = [
+            Document(id=item['id'], content=item['content'], meta=json.loads(item['meta']), embedding=item['vector'])
+            for item in items
+        ]
+        self._store.write_documents(documents, policy=DuplicatePolicy.OVERWRITE)
+        self._unsaved += len(documents)
+        if self._unsaved >= self._save_every:
+            self._store.save()
+            self._unsaved = 0
+
+    @override
+    def close(self) -> None:
+        self._store.save()
+
+class HnswSink(DynamicSink[Any]):
+    """Insert each output item into a local HNSW index.
+
+    Items are the dictionaries produced by `JSONLReader.run`. Every
+    worker owns one shard of the index in `<path>/worker-<index>`,
+    which is reloaded on restart and saved every `save_every` items
+    and on shutdown. The store's BM25 index is updated with the same
+    items, so the shard serves `HnswHybridRetriever` as well.
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        m: int = 4,
+        ef_construction: int = 400,
+        ef_search: int = 500,
+        metric: str = "cosine",
+        save_every: int = 1000,
+    ):
+        """Init.
+
+        :arg path: Directory holding one index shard per worker.
+
+        :arg m: HNSW links per node and layer. Defaults to 4, as in
+            `init_azure_index.py`.
+
+        :arg ef_construction: Candidate list size while inserting.
+            Defaults to 400.
+
+        :arg ef_search: Candidate list size while searching. Defaults
+            to 500.
+
+        :arg metric: "cosine", "euclidean" or "dotProduct". Defaults
+            to "cosine".
+
+        :arg save_every: Number of items between saves. Defaults to
+            1000.
+
+        """
+        self._path = Path(path)
+        self._params = dict(m=m, ef_construction=ef_construction, ef_search=ef_search, metric=metric)
+        self._save_every = save_every
+
+    @override
+    def build(
+        self, _step_id: str, worker_index: int, _worker_count: int
+    ) -> _HnswPartition:
+        store = HnswDocumentStore(path=str(self._path / f"worker-{worker_index}"), **self._params)
+        return _HnswPartition(store, self._save_every)
 
 ## Usage Example
 # from simulated_connector import SimulationSource
@@ -0,0 +1,126 @@
+"""Streaming download and incremental splitting of SEC full-text filings."""
+from typing import Iterator, List, Optional
+import codecs
+import logging
+import re
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Same units as haystack's DocumentSplitter
+DELIMITERS = {"page": "\f", "passage": "\n\n", "sentence": ".", "word": " "}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+}
+
+_INDEX_PAGE = re.compile(r"-index\.html?$")
+
+
+def filing_text_url(url: str) -> str:
+    """Point an EDGAR `-index.htm(l)` page at the full-text `.txt` submission."""
+    return _INDEX_PAGE.sub(".txt", url)
+
+
+def iter_filing(
+    url: str,
+    session: Optional[requests.Session] = None,
+    read_bytes: int = 65536,
+    timeout: float = 30,
+) -> Iterator[bytes]:
+    """
+    Yield the body of `url` in pieces of at most `read_bytes` as they arrive.
+
+    :param url: URL to download.
+    :param session: Session to reuse connections from.
+    :param read_bytes: Largest piece to yield.
+    :param timeout: Seconds to wait for the connection and for each read.
+    """
+    session = session or requests.Session()
+    with session.get(url, headers=HEADERS, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        yield from response.iter_content(chunk_size=read_bytes)
+
+
+class IncrementalSplitter:
+    """
+    Splits text that arrives in pieces the way `DocumentSplitter` splits
+    the whole text, emitting each chunk as soon as its last unit is
+    complete.
+
+    At most about `window_chars` characters are held at once. A chunk
+    that would grow past the window is emitted early, and a single unit
+    longer than the window is cut at its last space before the limit.
+    """
+
+    def __init__(
+        self,
+        split_by: str = "passage",
+        split_length: int = 5,
+        window_chars: int = 1_000_000,
+        encoding: str = "utf-8",
+    ):
+        """
+        :param split_by: `"page"`, `"passage"`, `"sentence"` or `"word"`.
+        :param split_length: Number of units per chunk.
+        :param window_chars: Upper bound on the characters held back.
+        :param encoding: Encoding of the incoming bytes.
+        """
+        if split_by not in DELIMITERS:
+            raise ValueError(f"split_by must be one of {', '.join(DELIMITERS)}")
+        if split_length <= 0:
+            raise ValueError("split_length must be greater than 0")
+        self._delimiter = DELIMITERS[split_by]
+        self._split_length = split_length
+        self._window_chars = window_chars
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._tail = ""
+        self._units: List[str] = []
+        self._units_chars = 0
+
+    def feed(self, data: bytes) -> List[str]:
+        """Add the next bytes and return the chunks they complete."""
+        return self._split(self._decoder.decode(data), final=False)
+
+    def finish(self) -> List[str]:
+        """Return the remaining chunks once all bytes have been fed."""
+        return self._split(self._decoder.decode(b"", final=True), final=True)
+
+    def _split(self, text: str, final: bool) -> List[str]:
+        parts = (self._tail + text).split(self._delimiter)
+        # The piece after the last delimiter may still grow
+        self._tail = parts.pop()
+        chunks: List[str] = []
+        for part in parts:
+            self._add_unit(part + self._delimiter, chunks)
+
+        if final:
+            self._add_unit(self._tail, chunks)
+            self._tail = ""
+            self._emit(chunks)
+        elif len(self._tail) + self._units_chars > self._window_chars:
+            self._emit(chunks)
+            while len(self._tail) > self._window_chars:
+                cut = self._tail.rfind(" ", 0, self._window_chars) + 1 or self._window_chars
+                chunks.append(self._tail[:cut])
+                self._tail = self._tail[cut:]
+        return chunks
+
+    def _add_unit(self, unit: str, chunks: List[str]) -> None:
+        self._units.append(unit)
+        self._units_chars += len(unit)
+        if len(self._units) == self._split_length:
+            self._emit(chunks)
+
+    def _emit(self, chunks: List[str]) -> None:
+        chunk = "".join(self._units)
+        self._units = []
+        self._units_chars = 0
+        if chunk:
+            chunks.append(chunk)
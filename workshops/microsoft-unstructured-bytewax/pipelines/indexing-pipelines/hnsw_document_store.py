@@ -0,0 +1,715 @@
+"""Local HNSW vector index exposed as a Haystack document store and retrievers.
+
+Mirrors the `HnswParameters` configured on Azure AI Search in
+`init_azure_index.py` so the same recall/latency trade-off can be run
+on-prem. A BM25 index over `content` and `meta` is kept alongside for
+hybrid retrieval.
+"""
+from dataclasses import replace
+from heapq import heapify, heappop, heappush
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import json
+import logging
+import os
+
+import numpy as np
+from haystack import Document, component, default_from_dict, default_to_dict
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+from haystack.utils.filters import document_matches_filter
+
+from bm25_index import Bm25Index, reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("cosine", "euclidean", "dotProduct")
+
+_NO_NEIGHBORS = np.zeros(0, dtype=np.int32)
+
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    # A loaded index may still map `path`; writing into it would truncate the map
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as file:
+        np.save(file, array)
+    os.replace(temporary, path)
+
+
+def _replace_text(path: Path, text: str) -> None:
+    temporary = path.with_name(path.name + ".tmp")
+    temporary.write_text(text)
+    os.replace(temporary, path)
+
+
+class HnswIndex:
+    """
+    Hierarchical navigable small world graph over float32 vectors.
+
+    Nodes are numbered in insertion order. Removed nodes stay in the graph
+    for navigation but are never returned from `search`.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        m: int = 4,
+        ef_construction: int = 400,
+        ef_search: int = 500,
+        metric: str = "cosine",
+        capacity: int = 1024,
+        seed: int = 0,
+    ):
+        """
+        :param dimensions: Length of the vectors.
+        :param m: Number of links each node gets per layer; layer 0 allows `2 * m`.
+        :param ef_construction: Size of the candidate list while inserting.
+        :param ef_search: Size of the candidate list while searching.
+        :param metric: One of "cosine", "euclidean" or "dotProduct".
+        :param capacity: Number of nodes to allocate up front.
+        :param seed: Seed for drawing node levels.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}, got {metric!r}")
+        self.dimensions = dimensions
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.metric = metric
+        self.count = 0
+        self.entry_point = -1
+        self.max_level = -1
+
+        self._level_mult = 1 / np.log(max(m, 2))
+        self._rng = np.random.default_rng(seed)
+        self._vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._levels = np.zeros(capacity, dtype=np.int32)
+        self._deleted = np.zeros(capacity, dtype=bool)
+        self._layer0 = np.full((capacity, 2 * m), -1, dtype=np.int32)
+        # Upper layers are sparse: one {node: links} dict per layer above 0.
+        self._upper: List[Dict[int, np.ndarray]] = []
+
+    def add(self, vector: List[float]) -> int:
+        """
+        Insert a vector and return its node number.
+        """
+        node = self.count
+        if node == self._vectors.shape[0]:
+            self._grow(2 * node)
+        query = self._prepare(vector)
+        level = int(-np.log(1.0 - self._rng.random()) * self._level_mult)
+        self._vectors[node] = query
+        self._levels[node] = level
+        while len(self._upper) < level:
+            self._upper.append({})
+        self.count += 1
+
+        if self.entry_point < 0:
+            self.entry_point, self.max_level = node, level
+            return node
+
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+
+        for layer in range(min(level, self.max_level), -1, -1):
+            candidates = self._search_layer(query, entry_points, self.ef_construction, layer)
+            neighbors = self._select_neighbors(candidates, self.m)
+            self._set_neighbors(node, layer, neighbors)
+
+            max_links = 2 * self.m if layer == 0 else self.m
+            for neighbor in neighbors:
+                links = self._neighbors(neighbor, layer).tolist() + [node]
+                if len(links) > max_links:
+                    distances = self._distances(self._vectors[neighbor], np.asarray(links))
+                    links = self._select_neighbors(sorted(zip(distances.tolist(), links)), max_links)
+                self._set_neighbors(neighbor, layer, links)
+            entry_points = [candidate for _, candidate in candidates]
+
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+        return node
+
+    def remove(self, node: int) -> None:
+        self._deleted[node] = True
+
+    def search(self, vector: List[float], k: int, ef: Optional[int] = None) -> List[Tuple[float, int]]:
+        """
+        Return up to `k` `(distance, node)` pairs closest to `vector`, nearest first.
+
+        :param vector: The query vector.
+        :param k: Number of results.
+        :param ef: Candidate list size. Defaults to `ef_search`; never less than `k`.
+        """
+        if self.entry_point < 0:
+            return []
+        query = self._prepare(vector)
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+        candidates = self._search_layer(query, entry_points, max(ef or self.ef_search, k), 0)
+        return [(distance, node) for distance, node in candidates if not self._deleted[node]][:k]
+
+    def distances(self, vector: List[float], nodes: List[int]) -> List[Tuple[float, int]]:
+        """
+        Return the exact `(distance, node)` pairs of `nodes` to `vector`, nearest first.
+        """
+        if not nodes:
+            return []
+        distances = self._distances(self._prepare(vector), np.asarray(nodes))
+        return sorted(zip(distances.tolist(), nodes))
+
+    def similarity(self, distance: float) -> float:
+        """Convert an internal distance into a score where higher is more similar."""
+        if self.metric == "cosine":
+            return 1.0 - distance
+        if self.metric == "dotProduct":
+            return -distance
+        return 1.0 / (1.0 + float(np.sqrt(distance)))
+
+    def vector(self, node: int) -> np.ndarray:
+        return self._vectors[node]
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Write the index as `.npy` files plus a `hnsw.json` header into directory `path`.
+
+        Every file is written next to its target and moved over it, so an
+        index loaded from `path` with `mmap=True` can be saved back to it.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        _save_array(path / "vectors.npy", self._vectors[: self.count])
+        _save_array(path / "levels.npy", self._levels[: self.count])
+        _save_array(path / "deleted.npy", self._deleted[: self.count])
+        _save_array(path / "layer0.npy", self._layer0[: self.count])
+        for layer, links in enumerate(self._upper, start=1):
+            nodes = np.fromiter(links.keys(), dtype=np.int32, count=len(links))
+            padded = np.full((len(links), self.m), -1, dtype=np.int32)
+            for row, neighbors in enumerate(links.values()):
+                padded[row, : len(neighbors)] = neighbors
+            _save_array(path / f"layer{layer}_nodes.npy", nodes)
+            _save_array(path / f"layer{layer}_links.npy", padded)
+        header = {
+            "dimensions": self.dimensions,
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "metric": self.metric,
+            "count": self.count,
+            "entry_point": self.entry_point,
+            "max_level": self.max_level,
+            "upper_layers": len(self._upper),
+        }
+        _replace_text(path / "hnsw.json", json.dumps(header))
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> "HnswIndex":
+        """
+        Load an index written by `save`.
+
+        :param path: Directory the index was saved to.
+        :param mmap: Memory-map the vectors and layer 0 links instead of reading
+            them into memory. The maps are copy-on-write, so the loaded index
+            still accepts inserts.
+        """
+        path = Path(path)
+        header = json.loads((path / "hnsw.json").read_text())
+        index = cls(
+            dimensions=header["dimensions"],
+            m=header["m"],
+            ef_construction=header["ef_construction"],
+            ef_search=header["ef_search"],
+            metric=header["metric"],
+            capacity=0,
+        )
+        mmap_mode = "c" if mmap else None
+        index._vectors = np.load(path / "vectors.npy", mmap_mode=mmap_mode)
+        index._layer0 = np.load(path / "layer0.npy", mmap_mode=mmap_mode)
+        index._levels = np.load(path / "levels.npy")
+        index._deleted = np.load(path / "deleted.npy")
+        for layer in range(1, header["upper_layers"] + 1):
+            nodes = np.load(path / f"layer{layer}_nodes.npy")
+            links = np.load(path / f"layer{layer}_links.npy")
+            index._upper.append({int(node): row[row >= 0] for node, row in zip(nodes, links)})
+        index.count = header["count"]
+        index.entry_point = header["entry_point"]
+        index.max_level = header["max_level"]
+        return index
+
+    def _prepare(self, vector: List[float]) -> np.ndarray:
+        query = np.asarray(vector, dtype=np.float32)
+        if self.metric == "cosine":
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+        return query
+
+    def _distances(self, query: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        vectors = self._vectors[nodes]
+        if self.metric == "euclidean":
+            diff = vectors - query
+            return np.einsum("ij,ij->i", diff, diff)
+        if self.metric == "cosine":
+            return 1.0 - vectors @ query
+        return -(vectors @ query)
+
+    def _neighbors(self, node: int, layer: int) -> np.ndarray:
+        if layer == 0:
+            links = self._layer0[node]
+            return links[links >= 0]
+        return self._upper[layer - 1].get(node, _NO_NEIGHBORS)
+
+    def _set_neighbors(self, node: int, layer: int, neighbors: List[int]) -> None:
+        if layer == 0:
+            self._layer0[node] = -1
+            self._layer0[node, : len(neighbors)] = neighbors
+        else:
+            self._upper[layer - 1][node] = np.asarray(neighbors, dtype=np.int32)
+
+    def _search_layer(
+        self, query: np.ndarray, entry_points: List[int], ef: int, layer: int
+    ) -> List[Tuple[float, int]]:
+        visited = set(entry_points)
+        distances = self._distances(query, np.asarray(entry_points)).tolist()
+        candidates = list(zip(distances, entry_points))
+        heapify(candidates)
+        # Max-heap of the best `ef` found so far, stored with negated distances.
+        results = [(-distance, node) for distance, node in candidates]
+        heapify(results)
+
+        while candidates:
+            distance, node = heappop(candidates)
+            if distance > -results[0][0]:
+                break
+            neighbors = [n for n in self._neighbors(node, layer).tolist() if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            for neighbor_distance, neighbor in zip(
+                self._distances(query, np.asarray(neighbors)).tolist(), neighbors
+            ):
+                if len(results) < ef or neighbor_distance < -results[0][0]:
+                    heappush(candidates, (neighbor_distance, neighbor))
+                    heappush(results, (-neighbor_distance, neighbor))
+                    if len(results) > ef:
+                        heappop(results)
+        return sorted((-distance, node) for distance, node in results)
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        # Heuristic from the HNSW paper: skip a candidate that is closer to an
+        # already selected neighbor than to the base node, which keeps links
+        # spread out and the graph navigable at small `m`.
+        selected: List[int] = []
+        for distance, candidate in candidates:
+            if len(selected) == m:
+                break
+            if selected:
+                to_selected = self._distances(self._vectors[candidate], np.asarray(selected))
+                if (to_selected < distance).any():
+                    continue
+            selected.append(candidate)
+        return selected
+
+    def _grow(self, capacity: int) -> None:
+        capacity = max(capacity, 1)
+        count = self.count
+        vectors = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        vectors[:count] = self._vectors[:count]
+        levels = np.zeros(capacity, dtype=np.int32)
+        levels[:count] = self._levels[:count]
+        deleted = np.zeros(capacity, dtype=bool)
+        deleted[:count] = self._deleted[:count]
+        layer0 = np.full((capacity, 2 * self.m), -1, dtype=np.int32)
+        layer0[:count] = self._layer0[:count]
+        self._vectors, self._levels, self._deleted, self._layer0 = vectors, levels, deleted, layer0
+
+
+class HnswDocumentStore:
+    """
+    Document store backed by a local `HnswIndex`.
+
+    Accepts the same parameters as Azure AI Search's `HnswParameters`.
+    Documents without an embedding are stored but cannot be retrieved by
+    `embedding_retrieval`. Every document's content and meta values are
+    also kept in a `Bm25Index` for `bm25_retrieval`; it is rebuilt from
+    the documents when a saved store is loaded.
+    """
+
+    def __init__(
+        self,
+        m: int = 4,
+        ef_construction: int = 400,
+        ef_search: int = 500,
+        metric: str = "cosine",
+        path: Optional[str] = None,
+    ):
+        """
+        :param m: Number of bi-directional links per node and layer.
+        :param ef_construction: Candidate list size while inserting.
+        :param ef_search: Candidate list size while searching.
+        :param metric: One of "cosine", "euclidean" or "dotProduct".
+        :param path: Directory to load a saved store from, if it exists, and
+            to save to by default.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}, got {metric!r}")
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.metric = metric
+        self.path = path
+
+        self.index: Optional[HnswIndex] = None
+        self.bm25 = Bm25Index()
+        self._documents: Dict[str, Document] = {}
+        self._nodes: Dict[str, int] = {}
+        self._node_ids: List[Optional[str]] = []
+        if path is not None and (Path(path) / "hnsw.json").exists():
+            self._load(Path(path))
+
+    @classmethod
+    def from_hnsw_parameters(cls, parameters: Any, path: Optional[str] = None) -> "HnswDocumentStore":
+        """
+        Build a store from an `azure.search.documents.indexes.models.HnswParameters`.
+        """
+        metric = getattr(parameters.metric, "value", parameters.metric) or "cosine"
+        return cls(
+            m=parameters.m,
+            ef_construction=parameters.ef_construction,
+            ef_search=parameters.ef_search,
+            metric=metric,
+            path=path,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            m=self.m,
+            ef_construction=self.ef_construction,
+            ef_search=self.ef_search,
+            metric=self.metric,
+            path=self.path,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HnswDocumentStore":
+        return default_from_dict(cls, data)
+
+    def count_documents(self) -> int:
+        return len(self._documents)
+
+    def filter_documents(self, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        documents = [self._with_embedding(document) for document in self._documents.values()]
+        if filters:
+            documents = [document for document in documents if document_matches_filter(filters, document)]
+        return documents
+
+    def write_documents(self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.NONE) -> int:
+        if policy == DuplicatePolicy.NONE:
+            policy = DuplicatePolicy.FAIL
+
+        written = 0
+        for document in documents:
+            if document.id in self._documents:
+                if policy == DuplicatePolicy.FAIL:
+                    raise DuplicateDocumentError(f"ID '{document.id}' already exists.")
+                if policy == DuplicatePolicy.SKIP:
+                    logger.warning("ID '%s' already exists", document.id)
+                    continue
+                self.delete_documents([document.id])
+
+            if document.embedding is not None:
+                if self.index is None:
+                    self.index = HnswIndex(
+                        dimensions=len(document.embedding),
+                        m=self.m,
+                        ef_construction=self.ef_construction,
+                        ef_search=self.ef_search,
+                        metric=self.metric,
+                    )
+                node = self.index.add(document.embedding)
+                self._nodes[document.id] = node
+                self._node_ids.append(document.id)
+            self._documents[document.id] = replace(document, embedding=None, score=None)
+            self.bm25.add(document.id, _searchable_text(document))
+            written += 1
+        return written
+
+    def delete_documents(self, document_ids: List[str]) -> None:
+        for doc_id in document_ids:
+            self._documents.pop(doc_id, None)
+            self.bm25.remove(doc_id)
+            node = self._nodes.pop(doc_id, None)
+            if node is not None:
+                self.index.remove(node)
+                self._node_ids[node] = None
+
+    def embedding_retrieval(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        ef_search: Optional[int] = None,
+        return_embedding: bool = False,
+        document_ids: Optional[List[str]] = None,
+    ) -> List[Document]:
+        """
+        Retrieve the approximate `top_k` nearest documents to `query_embedding`.
+
+        :param query_embedding: Embedding of the query.
+        :param filters: Haystack filters applied to the `ef_search` candidates,
+            so fewer than `top_k` documents may come back for selective filters.
+        :param top_k: The number of documents to return.
+        :param ef_search: Overrides the store's `ef_search` for this query.
+        :param return_embedding: Whether to return the embedding of the retrieved Documents.
+        :param document_ids: Only rank these documents, exactly, instead of
+            searching the graph.
+        :return: The retrieved documents, most similar first.
+        """
+        if self.index is None:
+            return []
+        if document_ids is not None:
+            nodes = [self._nodes[doc_id] for doc_id in document_ids if doc_id in self._nodes]
+            candidates = self.index.distances(query_embedding, nodes)
+        else:
+            ef = ef_search or self.ef_search
+            candidates = self.index.search(query_embedding, ef if filters else top_k, ef)
+        documents = []
+        for distance, node in candidates:
+            document = self._documents[self._node_ids[node]]
+            if filters and not document_matches_filter(filters, document):
+                continue
+            embedding = self.index.vector(node).tolist() if return_embedding else None
+            documents.append(replace(document, score=self.index.similarity(distance), embedding=embedding))
+            if len(documents) == top_k:
+                break
+        return documents
+
+    def bm25_retrieval(
+        self,
+        query: str,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+    ) -> List[Document]:
+        """
+        Retrieve the `top_k` documents that best match the terms of `query` by BM25.
+
+        :param query: Keywords; ticker symbols and form types such as "10-K" match exactly.
+        :param filters: Haystack filters applied to every matching document.
+        :param top_k: The number of documents to return.
+        :return: The retrieved documents, best match first.
+        """
+        documents = []
+        for score, doc_id in self.bm25.search(query, None if filters else top_k):
+            document = self._documents[doc_id]
+            if filters and not document_matches_filter(filters, document):
+                continue
+            documents.append(replace(document, score=score))
+            if len(documents) == top_k:
+                break
+        return documents
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Save the index and documents to `path`, defaulting to the store's own path.
+        """
+        path = Path(path or self.path)
+        path.mkdir(parents=True, exist_ok=True)
+        if self.index is not None:
+            self.index.save(path)
+        # Written next to the old file and moved over it, like the index files, so a
+        # save that fails halfway leaves the previous documents whole
+        temporary = path / "documents.jsonl.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            for doc_id, document in self._documents.items():
+                record = {"document": document.to_dict(flatten=False), "node": self._nodes.get(doc_id)}
+                file.write(json.dumps(record) + "\n")
+        os.replace(temporary, path / "documents.jsonl")
+
+    def _load(self, path: Path) -> None:
+        self.index = HnswIndex.load(path)
+        self._node_ids = [None] * self.index.count
+        with open(path / "documents.jsonl", encoding="utf-8") as file:
+            for line in file:
+                record = json.loads(line)
+                document = Document.from_dict(record["document"])
+                self._documents[document.id] = document
+                self.bm25.add(document.id, _searchable_text(document))
+                if record["node"] is not None:
+                    self._nodes[document.id] = record["node"]
+                    self._node_ids[record["node"]] = document.id
+        logger.info("Loaded %d documents from %s", len(self._documents), path)
+
+    def _with_embedding(self, document: Document) -> Document:
+        node = self._nodes.get(document.id)
+        if node is None:
+            return document
+        return replace(document, embedding=self.index.vector(node).tolist())
+
+
+def _searchable_text(document: Document) -> str:
+    """Content and meta values, the fields `init_azure_index.py` makes searchable."""
+    values = [str(value) for value in document.meta.values() if value is not None]
+    return " ".join([document.content or "", *values])
+
+
+@component
+class HnswEmbeddingRetriever:
+    """
+    Retrieves documents from an `HnswDocumentStore` using approximate vector search.
+    """
+
+    def __init__(
+        self,
+        document_store: HnswDocumentStore,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        ef_search: Optional[int] = None,
+    ):
+        """
+        :param document_store: An instance of HnswDocumentStore.
+        :param filters: A dictionary with filters to narrow down the search space.
+        :param top_k: The maximum number of documents to retrieve.
+        :param ef_search: Overrides the store's `ef_search`.
+        """
+        if not isinstance(document_store, HnswDocumentStore):
+            raise ValueError("document_store must be an instance of HnswDocumentStore")
+        self.document_store = document_store
+        self.filters = filters
+        self.top_k = top_k
+        self.ef_search = ef_search
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            document_store=self.document_store.to_dict(),
+            filters=self.filters,
+            top_k=self.top_k,
+            ef_search=self.ef_search,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HnswEmbeddingRetriever":
+        init_params = data["init_parameters"]
+        init_params["document_store"] = HnswDocumentStore.from_dict(init_params["document_store"])
+        return default_from_dict(cls, data)
+
+    @component.output_types(documents=List[Document])
+    def run(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+    ):
+        """
+        Run the retriever on the given query embedding.
+
+        :param query_embedding: Embedding of the query.
+        :param filters: A dictionary with filters to narrow down the search space.
+        :param top_k: The maximum number of documents to return.
+        :return: The retrieved documents.
+        """
+        documents = self.document_store.embedding_retrieval(
+            query_embedding=query_embedding,
+            filters=filters or self.filters,
+            top_k=top_k or self.top_k,
+            ef_search=self.ef_search,
+        )
+        return {"documents": documents}
+
+
+@component
+class HnswHybridRetriever:
+    """
+    Retrieves documents from an `HnswDocumentStore` by BM25 and vector
+    search, fused with reciprocal rank fusion.
+
+    Keyword matches catch the ticker symbols and form types embeddings
+    blur, and vector matches catch paraphrases with no shared terms.
+    With `prefilter`, the vector ranking is computed exactly over the
+    BM25 candidates instead of searching the whole graph, which is
+    cheaper but only finds documents sharing a term with the query.
+    """
+
+    def __init__(
+        self,
+        document_store: HnswDocumentStore,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        bm25_top_k: int = 50,
+        embedding_top_k: int = 50,
+        rrf_k: int = 60,
+        prefilter: bool = False,
+        ef_search: Optional[int] = None,
+    ):
+        """
+        :param document_store: An instance of HnswDocumentStore.
+        :param filters: A dictionary with filters to narrow down the search space.
+        :param top_k: The maximum number of documents to return.
+        :param bm25_top_k: Number of BM25 results to fuse.
+        :param embedding_top_k: Number of vector results to fuse.
+        :param rrf_k: Reciprocal rank fusion constant.
+        :param prefilter: Rank only the BM25 candidates by vector, falling
+            back to the graph when no document shares a term with the query.
+        :param ef_search: Overrides the store's `ef_search`.
+        """
+        if not isinstance(document_store, HnswDocumentStore):
+            raise ValueError("document_store must be an instance of HnswDocumentStore")
+        self.document_store = document_store
+        self.filters = filters
+        self.top_k = top_k
+        self.bm25_top_k = bm25_top_k
+        self.embedding_top_k = embedding_top_k
+        self.rrf_k = rrf_k
+        self.prefilter = prefilter
+        self.ef_search = ef_search
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            document_store=self.document_store.to_dict(),
+            filters=self.filters,
+            top_k=self.top_k,
+            bm25_top_k=self.bm25_top_k,
+            embedding_top_k=self.embedding_top_k,
+            rrf_k=self.rrf_k,
+            prefilter=self.prefilter,
+            ef_search=self.ef_search,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HnswHybridRetriever":
+        init_params = data["init_parameters"]
+        init_params["document_store"] = HnswDocumentStore.from_dict(init_params["document_store"])
+        return default_from_dict(cls, data)
+
+    @component.output_types(documents=List[Document])
+    def run(
+        self,
+        query: str,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+    ):
+        """
+        Run the retriever on the given query and its embedding.
+
+        :param query: Text of the query, for BM25.
+        :param query_embedding: Embedding of the query.
+        :param filters: A dictionary with filters to narrow down the search space.
+        :param top_k: The maximum number of documents to return.
+        :return: The retrieved documents, with their fusion score.
+        """
+        filters = filters or self.filters
+        keyword = self.document_store.bm25_retrieval(query=query, filters=filters, top_k=self.bm25_top_k)
+        candidates = [document.id for document in keyword] if self.prefilter and keyword else None
+        vector = self.document_store.embedding_retrieval(
+            query_embedding=query_embedding,
+            filters=filters,
+            top_k=self.embedding_top_k,
+            ef_search=self.ef_search,
+            document_ids=candidates,
+        )
+        documents = reciprocal_rank_fusion([keyword, vector], k=self.rrf_k, top_k=top_k or self.top_k)
+        return {"documents": documents}
@@ -0,0 +1,112 @@
+"""Memory-mapped JSONL files indexed by line offsets.
+
+`JsonlLines` maps a file once, finds every newline once and then
+copies lines out of the map one batch at a time. Reading a multi-GB
+dump therefore neither copies it into a string nor splits it into a
+list; the pages stay in the OS page cache and only the offset index
+(8 bytes per line) and the current batch live on the heap.
+"""
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterator, List, Tuple, Union
+import mmap
+import os
+
+
+def _line_starts(buffer) -> array:
+    """Byte offset of the start of every line in `buffer`."""
+    starts = array("Q")
+    size = len(buffer)
+    if size:
+        starts.append(0)
+    find = buffer.find
+    position = find(b"\n")
+    while position != -1 and position + 1 < size:
+        starts.append(position + 1)
+        position = find(b"\n", position + 1)
+    return starts
+
+
+class JsonlLines:
+    """Lines of a JSONL buffer, by index or in batches from a byte offset.
+
+        with JsonlLines.open("data/news_out.jsonl") as lines:
+            for batch, offset in lines.batches(batch_size=1000):
+                events = [json.loads(line) for line in batch]
+
+    Lines are `bytes` without their line ending. They are copies rather
+    than `memoryview`s into the map: a view costs as much to build,
+    is tracked by the garbage collector and cannot be pickled, and
+    views still referenced would keep the map from closing.
+    The offset after each batch is the start of the next line, so it
+    can be stored and passed back to `batches` to resume.
+    """
+
+    def __init__(self, buffer: Union[bytes, bytearray, mmap.mmap]):
+        """
+        :arg buffer: Bytes of the JSONL file; any object supporting the
+            buffer protocol and `find`.
+        """
+        self._buffer = buffer
+        self.size = len(buffer)
+        self.offsets = _line_starts(buffer)
+
+    @classmethod
+    def open(cls, path: Union[Path, str]) -> "JsonlLines":
+        """Map the file at `path` read-only."""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped
+                return cls(b"")
+            # The map holds its own handle, so the file can be closed
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __enter__(self) -> "JsonlLines":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def line(self, index: int) -> bytes:
+        """Line `index` without its `\\n` or `\\r\\n` ending."""
+        start = self.offsets[index]
+        end = self.offset(index + 1)
+        if end > start and self._buffer[end - 1] == 10:
+            end -= 1
+            if end > start and self._buffer[end - 1] == 13:
+                end -= 1
+        return bytes(self._buffer[start:end])
+
+    def offset(self, index: int) -> int:
+        """Byte offset of line `index`, or the size of the buffer past the last line."""
+        return self.offsets[index] if index < len(self.offsets) else self.size
+
+    def index(self, offset: int) -> int:
+        """Index of the first line starting at or after byte `offset`."""
+        return bisect_left(self.offsets, offset)
+
+    def batches(self, offset: int = 0, batch_size: int = 1000) -> Iterator[Tuple[List[bytes], int]]:
+        """
+        Yield lists of up to `batch_size` non-empty lines starting at
+        byte `offset`, each with the byte offset of the line after it.
+        """
+        buffer, offsets = self._buffer, self.offsets
+        index = self.index(offset)
+        count = len(offsets)
+        while index < count:
+            stop = min(index + batch_size, count)
+            # Every line but the last ends with the `\n` before the next one starts
+            lines = [buffer[start:end - 1] for start, end in zip(offsets[index:stop], offsets[index + 1:stop + 1])]
+            if stop == count:
+                lines.append(self.line(count - 1))
+            batch = [line[:-1] if line.endswith(b"\r") else line for line in lines if line and line != b"\r"]
+            index = stop
+            yield batch, self.offset(index)
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
@@ -4,12 +4,18 @@ from bytewax import operators as op
 from bytewax.testing import run_main
 from bytewax.connectors.kafka import KafkaSource
 from custom_connectors import SimulationSource
-from rag_custom_pipeline import safe_deserialize, JSONLReader
-
-jsonl_reader = JSONLReader(metadata_fields=['title',
-                                             'form_type',
-                                             'symbol',
-                                               'url'])
+from deserialize import safe_deserialize
+from pipeline_factory import per_worker
+
+@per_worker
+def jsonl_reader():
+    # Built on the first event each worker processes, so importing the
+    # dataflow loads neither unstructured nor the Azure OpenAI client
+    from rag_custom_pipeline import JSONLReader
+    return JSONLReader(metadata_fields=['title',
+                                        'form_type',
+                                        'symbol',
+                                        'url'])
 
 def process_event_edgar(event):
     pass
@@ -20,7 +26,7 @@ def process_event_news(event):
 def process_event(event):
     """Wrapper to handle the processing of each event."""
     if event:
-        dict_document = jsonl_reader.run(event)
+        dict_document = jsonl_reader().run(event)
         return dict_document
     return None
 
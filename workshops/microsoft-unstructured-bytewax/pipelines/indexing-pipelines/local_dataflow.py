@@ -3,27 +3,50 @@ from bytewax.dataflow import Dataflow
 from bytewax import operators as op
 from bytewax.connectors.stdio import StdOutSink
 from custom_connectors import SimulationSource, AzureSearchSink
-from rag_custom_pipeline import safe_deserialize, JSONLReader
+from deserialize import safe_deserialize
+from embedding_batcher import batch_embed
+from pipeline_factory import per_worker
+from rag_custom_pipeline import JSONLReader, document_embedder
 
+from datetime import timedelta
+import os
 
+embedding_batch_size = int(os.environ.get("EMBEDDING_BATCH_SIZE", 256))
+embedding_batch_timeout = timedelta(milliseconds=int(os.environ.get("EMBEDDING_BATCH_TIMEOUT_MS", 500)))
 
-jsonl_reader = JSONLReader(metadata_fields=['title', \
-                                            'form_type', \
-                                            'symbol',
-                                            'url'])
+
+@per_worker
+def jsonl_reader():
+    # Built on the first event each worker processes, so importing the
+    # dataflow loads neither unstructured nor the Azure OpenAI client
+    return JSONLReader(metadata_fields=['title', \
+                                        'form_type', \
+                                        'symbol',
+                                        'url'])
+
+
+# Each worker embeds with its own client
+embedder = per_worker(document_embedder)
 
 
 def process_event(event):
     """Wrapper to handle the processing of each event."""
     if event:
-        dict_document = jsonl_reader.run(event)
-        return dict_document
+        return [jsonl_reader().run(event)]
     return None
 
 
+def to_dicts(documents):
+    return [JSONLReader.document_to_dict(document) for document in documents]
+
+
 flow = Dataflow("rag-pipeline")
 input_data = op.input("input", flow, SimulationSource("data/test.jsonl", batch_size=1))
 deserialize_data = op.map("deserialize", input_data, safe_deserialize)
 extract_html = op.filter_map("build_indeces", deserialize_data, process_event)
-op.output("output", extract_html, StdOutSink())
+# The documents of many events are embedded in one request
+embed_content = batch_embed("embed_content", extract_html, embedder,
+                            max_size=embedding_batch_size, timeout=embedding_batch_timeout)
+dicts = op.flat_map("to_dict", embed_content, to_dicts)
+op.output("output", dicts, StdOutSink())
 
@@ -0,0 +1,69 @@
+"""Splitting files into page ranges that can be partitioned concurrently."""
+from typing import Any, Dict, List, NamedTuple
+import io
+
+from filing_stream import DELIMITERS
+
+PAGE_BREAK = DELIMITERS["page"].encode("ascii")
+
+
+class PageRange(NamedTuple):
+    first_page: int
+    content: bytes
+
+
+def split_page_ranges(content: bytes, file_name: str, pages_per_range: int) -> List[PageRange]:
+    """
+    Split `content` into ranges of at most `pages_per_range` pages.
+
+    PDFs are split with pypdf. Other files are treated as text whose
+    pages end with a form feed, the same page unit `DocumentSplitter`
+    uses.
+
+    :param content: The whole file.
+    :param file_name: Name of the file; a `.pdf` suffix or `%PDF` header selects PDF splitting.
+    :param pages_per_range: Largest number of pages per range.
+    :return: The ranges in page order, numbered from 1.
+    """
+    if pages_per_range <= 0:
+        raise ValueError("pages_per_range must be greater than 0")
+    if file_name.lower().endswith(".pdf") or content.startswith(b"%PDF"):
+        return _split_pdf(content, pages_per_range)
+    return _split_text(content, pages_per_range)
+
+
+def _split_text(content: bytes, pages_per_range: int) -> List[PageRange]:
+    pages = content.split(PAGE_BREAK)
+    return [
+        PageRange(start + 1, PAGE_BREAK.join(pages[start:start + pages_per_range]))
+        for start in range(0, len(pages), pages_per_range)
+    ]
+
+
+def _split_pdf(content: bytes, pages_per_range: int) -> List[PageRange]:
+    # pypdf comes with unstructured-client; imported here so text-only runs skip it
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(content))
+    ranges = []
+    for start in range(0, len(reader.pages), pages_per_range):
+        writer = PdfWriter()
+        for page in reader.pages[start:start + pages_per_range]:
+            writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        ranges.append(PageRange(start + 1, buffer.getvalue()))
+    return ranges
+
+
+def offset_page_numbers(elements: List[Dict[str, Any]], page_range: PageRange) -> List[Dict[str, Any]]:
+    """
+    Renumber the elements partitioned from `page_range` as pages of the whole file.
+
+    The API numbers each range from page 1. Elements without a page
+    number are given the range's first page.
+    """
+    for element in elements:
+        metadata = element.setdefault("metadata", {})
+        metadata["page_number"] = page_range.first_page + metadata.get("page_number", 1) - 1
+    return elements
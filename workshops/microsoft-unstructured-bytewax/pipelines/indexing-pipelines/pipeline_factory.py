@@ -0,0 +1,32 @@
+"""Pipelines and clients built on first use, once per Bytewax worker."""
+from typing import Callable, TypeVar
+import functools
+import threading
+
+T = TypeVar("T")
+
+
+def per_worker(factory: Callable[[], T]) -> Callable[[], T]:
+    """Memoize a zero-argument factory for each Bytewax worker.
+
+    The first call on a worker runs `factory` and every later call on
+    that worker returns the same object. Bytewax runs the workers of a
+    process as threads, so the value is kept per thread: workers never
+    share a pipeline or client, and nothing is built, or imported by
+    `factory`, on workers that never call it.
+
+    Importing a dataflow module then only defines the flow; the heavy
+    imports and client setup move to the first item each worker sees,
+    or to a sink, source or operator `build` hook that calls it.
+    """
+    local = threading.local()
+
+    @functools.wraps(factory)
+    def get() -> T:
+        try:
+            return local.value
+        except AttributeError:
+            local.value = factory()
+            return local.value
+
+    return get
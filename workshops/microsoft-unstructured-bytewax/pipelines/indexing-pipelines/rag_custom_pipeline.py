@@ -1,11 +1,10 @@
 from haystack import Pipeline
-from haystack.components.embedders import AzureOpenAIDocumentEmbedder
-from haystack.components.preprocessors import DocumentCleaner
 from pathlib import Path
 from haystack.utils import Secret
 
 
-from unstructured_component import UnstructuredParser
+from text_normalizer import TextNormalizer
+from deserialize import safe_deserialize
 import logging
 import requests
 from haystack import component, Document
@@ -53,42 +52,14 @@ def flatten_meta(meta):
     return _flatten(meta)
 
 
-def safe_deserialize(data):
-    """
-    Safely deserialize JSON data, handling various formats.
-    
-    :param data: JSON data to deserialize.
-    :return: Deserialized data or None if an error occurs.
-    """
-    try:
-        parsed_data = json.loads(data)
-        if isinstance(parsed_data, list):
-            if len(parsed_data) == 2 and (parsed_data[0] is None or isinstance(parsed_data[0], str)):
-                event = parsed_data[1]
-            else:
-                logger.info(f"Skipping unexpected list format: {data}")
-                return None
-        elif isinstance(parsed_data, dict):
-            event = parsed_data
-        else:
-            logger.info(f"Skipping unexpected data type: {data}")
-            return None
-        
-        if 'link' in event:
-            event['url'] = event.pop('link')
-        
-        if "url" in event:
-            return event
-        else:
-            logger.info(f"Missing 'url' key in data: {data}")
-            return None
-
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error ({e}) for data: {data}")
-        return None
-    except Exception as e:
-        logger.error(f"Error processing data ({e}): {data}")
-        return None
+def document_embedder():
+    """The Azure OpenAI embedder the dataflows send batches of documents to with `batch_embed`."""
+    # Imported here so modules that only need the helpers below skip the OpenAI SDK
+    from haystack.components.embedders import AzureOpenAIDocumentEmbedder
+    return AzureOpenAIDocumentEmbedder(azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                                       api_key=Secret.from_token(AZURE_OPENAI_KEY),
+                                       azure_deployment=AZURE_OPENAI_EMBEDDING_SERVICE,
+                                       progress_bar=False)
 
 
 class JSONLReader:
@@ -99,29 +70,16 @@ class JSONLReader:
         :param metadata_fields: List of fields in the JSONL to retain as metadata.
         """
         self.metadata_fields = metadata_fields or []
-        
+
+        # Imported here so modules that only need the helpers below skip unstructured
+        from unstructured_component import UnstructuredParser
+
         unstructured_parser = UnstructuredParser(unstructured_key=unstructured_api_key,
                                           chunking_strategy="by_page",
                                           strategy="auto",
                                           model="yolox")
-        regex_pattern = (
-            r'<.*?>'  # HTML tags
-            r'|\t'  # Tabs
-            r'|\n+'  # Newlines
-            r'|&nbsp;'  # Non-breaking spaces
-            r'|[^a-zA-Z0-9\s]'  # Any non-alphanumeric character (excluding whitespace)
-        )
-        document_cleaner = DocumentCleaner(
-                            remove_empty_lines=True,
-                            remove_extra_whitespaces=True,
-                            remove_repeated_substrings=False,
-                            remove_substrings=None,  
-                            remove_regex=regex_pattern
-                        )
-
-        document_embedder = AzureOpenAIDocumentEmbedder(azure_endpoint=AZURE_OPENAI_ENDPOINT,
-                                                                api_key=Secret.from_token(AZURE_OPENAI_KEY),
-                                                                azure_deployment=AZURE_OPENAI_EMBEDDING_SERVICE) 
+        # Tags, tabs, newlines, nbsp and non-alphanumerics removed in one scan
+        document_cleaner = TextNormalizer()
 
 
         # Initialize pipeline
@@ -130,11 +88,10 @@ class JSONLReader:
         # Add components
         self.pipeline.add_component("unstructured", unstructured_parser)
         self.pipeline.add_component("cleaner", document_cleaner)
-        self.pipeline.add_component("embedder", document_embedder)
 
-        # Connect components
+        # Connect components; embedding happens downstream, in one
+        # request for the documents of many events
         self.pipeline.connect("unstructured", "cleaner")
-        self.pipeline.connect("cleaner", "embedder")
 
     @component.output_types(documents=List[Document])
     def run(self, event: List[Union[str, Path, ByteStream]]):
@@ -142,7 +99,7 @@ class JSONLReader:
         Process each source file, read URLs and their associated metadata,
         fetch HTML content using a pipeline, and convert to Haystack Documents.
         :param event: A list of source files, URLs, or ByteStreams.
-        :return: A dictionary containing the processed document and the result of writing to Azure Search.
+        :return: The processed document with the event's metadata, not embedded yet.
         """
 
         # Extract URL and modify it if necessary
@@ -158,26 +115,20 @@ class JSONLReader:
         except Exception as e:
             logger.error(f"Error running pipeline for URL {url}: {e}")
             raise
-        document_obj = doc['embedder']['documents'][0]
+        document_obj = doc['cleaner']['documents'][0]
         content = document_obj.content
-        additional_metadata = document_obj.meta
-
-        
-        embedding = document_obj.embedding
-        # Safely access the embedding metadata
-        embedding_metadata = doc.get('embedder', {}).get('meta', {})
-        metadata.update(embedding_metadata) 
-        document = Document(id=document_obj.id, content=content, meta=metadata, embedding=embedding)
 
-        dictionary = self.document_to_dict(document)
+        # Only the event's metadata fields are indexed, not the element metadata of the parser
+        document = Document(id=document_obj.id, content=content, meta=metadata)
 
         # # write to Azure Search
         # result = self.write_to_ai_search(dictionary)
 
         # results = {"document": dictionary, "result": result}
-        return dictionary
+        return document
     
-    def document_to_dict(self, document: Document) -> Dict:
+    @staticmethod
+    def document_to_dict(document: Document) -> Dict:
         """
         Convert a Haystack Document object to a dictionary.
         """
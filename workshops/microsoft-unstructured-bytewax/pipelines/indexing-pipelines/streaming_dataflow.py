@@ -0,0 +1,38 @@
+from datetime import timedelta
+import os
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+
+from custom_connectors import FilingChunkSource, AzureSearchSink
+from embedding_batcher import batch_embed
+from pipeline_factory import per_worker
+from rag_custom_pipeline import JSONLReader, document_embedder
+from text_normalizer import TextNormalizer
+
+# Filings are chunked while they download, so the first chunks are
+# embedded and uploaded long before a tens-of-megabytes 10-K has arrived.
+normalizer = TextNormalizer()
+embedding_batch_size = int(os.environ.get("EMBEDDING_BATCH_SIZE", 256))
+embedding_batch_timeout = timedelta(milliseconds=int(os.environ.get("EMBEDDING_BATCH_TIMEOUT_MS", 500)))
+
+# Each worker embeds with its own client
+embedder = per_worker(document_embedder)
+
+
+def normalize(documents):
+    # One list per network read, so `batch_embed` can combine the chunks of several reads
+    return [normalizer.run(documents=documents)["documents"]]
+
+
+def to_dicts(documents):
+    return [JSONLReader.document_to_dict(document) for document in documents]
+
+
+flow = Dataflow("filing-stream")
+chunks = op.input("input", flow, FilingChunkSource("data/sec_out.jsonl", split_by="passage", split_length=5))
+normalized = op.flat_map_batch("normalize", chunks, normalize)
+embedded = batch_embed("embed", normalized, embedder,
+                       max_size=embedding_batch_size, timeout=embedding_batch_timeout)
+dicts = op.flat_map("to_dict", embedded, to_dicts)
+op.output("output", dicts, AzureSearchSink())
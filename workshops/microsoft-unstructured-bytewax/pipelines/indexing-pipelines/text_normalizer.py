@@ -0,0 +1,89 @@
+"""Precompiled text normalization for SEC filing elements."""
+import re
+from copy import deepcopy
+from typing import List
+
+from haystack import Document, component
+
+TICKER_TAG = "<CLASS-CONTRACT-TICKER-SYMBOL>"
+_TICKER = re.compile(re.escape(TICKER_TAG) + r"(\S+)")
+
+
+@component
+class TextNormalizer:
+    """
+    Normalizes the text of SEC filing elements with one precompiled regex substitution.
+
+    HTML/SGML tags, `&nbsp;` and every character that is not a letter, a
+    digit or whitespace are removed by one precompiled alternation;
+    whitespace runs, including tabs and newlines, are then collapsed to a
+    single space. Ticker symbols tagged `<CLASS-CONTRACT-TICKER-SYMBOL>`
+    are collected into the `symbol` meta field unless it is already set.
+    Only elements that contain the tag, found by a plain substring
+    search, are scanned for symbols, so the substitution is the only
+    regex pass over most elements.
+    """
+
+    def __init__(self, keep_characters: str = "", extract_symbols: bool = True):
+        """
+        Compile the removal pattern.
+
+        :param keep_characters: Non-alphanumeric characters to keep, e.g. `"-"`.
+        :param extract_symbols: Whether to set `meta["symbol"]` from ticker tags.
+        """
+        self.keep_characters = keep_characters
+        self.extract_symbols = extract_symbols
+        self._pattern = re.compile(
+            r"<.*?>"  # HTML tags
+            r"|&nbsp;"  # Non-breaking spaces
+            r"|[^a-zA-Z0-9\s" + re.escape(keep_characters) + r"]"  # Any other non-alphanumeric character
+        )
+        # Same tokens, but stops at the first character that survives normalization
+        self._content = re.compile(r"<.*?>|&nbsp;|([a-zA-Z0-9" + re.escape(keep_characters) + r"])")
+
+    def normalize(self, text: str) -> str:
+        """
+        Return `text` with tags, `&nbsp;` and non-alphanumeric characters
+        removed and whitespace collapsed.
+        """
+        return " ".join(self._pattern.sub("", text).split())
+
+    def has_content(self, text: str) -> bool:
+        """
+        Whether `normalize(text)` would be non-empty, usually without
+        scanning past the first few characters.
+        """
+        for match in self._content.finditer(text):
+            if match.lastindex:
+                return True
+        return False
+
+    @staticmethod
+    def symbols(text: str) -> List[str]:
+        """
+        Return the ticker symbols tagged in `text`, in order.
+        """
+        if TICKER_TAG not in text:
+            return []
+        return _TICKER.findall(text)
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]):
+        """
+        Normalize the content of each document.
+
+        :param documents: Documents to normalize.
+        :return: A dictionary with the normalized `documents`.
+        """
+        normalized = []
+        for document in documents:
+            if document.content is None:
+                normalized.append(document)
+                continue
+            meta = deepcopy(document.meta)
+            if self.extract_symbols and "symbol" not in meta:
+                symbols = self.symbols(document.content)
+                if symbols:
+                    meta["symbol"] = ",".join(symbols)
+            normalized.append(Document(content=self.normalize(document.content), meta=meta))
+        return {"documents": normalized}
@@ -1,15 +1,18 @@
-import re
-from typing import Any, Dict, List, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 from pathlib import Path
 import requests
 import time
 import uuid
 from dotenv import load_dotenv
 from haystack import Document, component
+from requests.adapters import HTTPAdapter
 from unstructured_client import UnstructuredClient
 from unstructured_client.models import shared
 from unstructured_client.models.errors import SDKError
 from unstructured.staging.base import dict_to_elements
+from page_ranges import offset_page_numbers, split_page_ranges
+from text_normalizer import TextNormalizer
 # Setup logging
 import logging
 
@@ -17,82 +20,106 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 load_dotenv(".env")
 
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Stages reported in the `timings` output, summed over sources
+STAGES = ("download", "partition", "convert")
+
+
+def pooled_session(pool_size: int) -> requests.Session:
+    """A session keeping up to `pool_size` connections per host alive."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 @component
 class UnstructuredParser:
     """
-    A component generating personal welcome message and making it upper case
+    Downloads files, partitions them with the Unstructured API and returns
+    the elements as Haystack Documents.
+
+    The API client and the download session are created once and keep
+    their connections alive between calls. Sources in one call are
+    downloaded and partitioned in parallel, at most `max_in_flight` at a
+    time.
+
+    With `split_pages`, each file is cut into ranges of that many pages
+    which are partitioned concurrently and merged back in page order,
+    numbered as pages of the whole file. Chunks then never span a range,
+    which matches the whole file for `chunking_strategy="by_page"`.
     """
-    def __init__(self, unstructured_key: str, chunking_strategy, strategy, model):
+    def __init__(self, unstructured_key: str, chunking_strategy, strategy, model,
+                 server_url: Optional[str] = None, max_in_flight: int = 4, timeout: float = 60,
+                 split_pages: int = 0, split_concurrency: int = 4):
         """
         Initialize the UnstructuredParser with an API key.
         :param unstructured_key: The API key for the Unstructured API.
         :param chunking_strategy: The chunking strategy to use. https://docs.unstructured.io/api-reference/api-services/chunking
         :param strategy: The strategy to use. https://docs.unstructured.io/api-reference/api-services/partitioning
         :param model: The model to use. 
+        :param server_url: Base URL of the partition API. Defaults to the hosted Unstructured API.
+        :param max_in_flight: Most sources downloaded or partitioned at once, and connections kept per host.
+        :param timeout: Seconds to wait for the connection and for each read of a download.
+        :param split_pages: Pages per partition request, or 0 to send each file whole.
+        :param split_concurrency: Most page ranges of one file partitioned at once.
         """
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight must be greater than 0")
+        if split_pages < 0 or split_concurrency <= 0:
+            raise ValueError("split_pages must be at least 0 and split_concurrency greater than 0")
         self.unstructured_key = unstructured_key
         self.chunking_strategy = chunking_strategy
         self.strategy = strategy
         self.model = model
+        self.server_url = server_url
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.split_pages = split_pages
+        self.split_concurrency = split_concurrency
+        # As before, hyphens count as content when deciding whether an element is empty
+        self.normalizer = TextNormalizer(keep_characters="-")
+        self.session = pooled_session(max_in_flight)
+        self.session.headers.update(HEADERS)
+        api_connections = max_in_flight * (split_concurrency if split_pages else 1)
+        self.client = UnstructuredClient(api_key_auth=unstructured_key, server_url=server_url,
+                                         client=pooled_session(api_connections))
 
-    @component.output_types(documents=List[Document])
+    @component.output_types(documents=List[Document], timings=Dict[str, float])
     def run(self, sources: List[Union[str, Path]]):
         """
         Process each source file, read URLs and their associated metadata,
         fetch any unstructured content using a pipeline, and convert to Haystack Documents.
         :param sources: File paths or URLs to process.
-        :return: A list of Haystack Documents.
+        :return: A list of Haystack Documents, in source order, and the seconds spent
+            in each stage summed over sources, plus the wall-clock `total`.
         """
-        
-        regex_pattern = (
-        r'<.*?>'  # HTML tags
-        r'|\t'  # Tabs
-        r'|\n+'  # Newlines
-        r'|&nbsp;'  # Non-breaking spaces
-        r'|[^a-zA-Z0-9\s-]'  # Any non-alphanumeric character (excluding whitespace)
-        )
-        
-        client = UnstructuredClient(api_key_auth=self.unstructured_key)
+        start = time.perf_counter()
+        if len(sources) > 1 and self.max_in_flight > 1:
+            with ThreadPoolExecutor(min(self.max_in_flight, len(sources))) as pool:
+                results = list(pool.map(self._parse, sources))
+        else:
+            results = [self._parse(source) for source in sources]
+
         documents = []
         all_symbols = set()
-        for source in sources:
-            file_content = self.download_file(source)
-            if file_content:  # Check if download was successful
-                req = shared.PartitionParameters(
-                    files=shared.Files(
-                        content=file_content,
-                        file_name=str(source),
-                    ),
-                    strategy=self.strategy,
-                    hi_res_model_name=self.model,
-                    chunking_strategy=self.chunking_strategy,
-                )
-                try:
-                    resp = client.general.partition(req)
-                    elements = dict_to_elements(resp.elements)
-                    for item in elements:
-                        doc_id = str(uuid.uuid4())
-                        metadata = item.metadata.to_dict()
-                        
-                        # Extract CLASS-CONTRACT-TICKER-SYMBOL if present
-                        symbol_matches = re.findall(r'<CLASS-CONTRACT-TICKER-SYMBOL>(\S+)', item.text)
-                        if symbol_matches:
-                            symbols = ','.join(symbol_matches)
-                            all_symbols.update(symbol_matches)  # Add to all symbols set
-                            metadata['symbol'] = symbols
-
-
-                        cleaned_text = re.sub(regex_pattern, '', item.text)
-                        if cleaned_text=="":  # Skip empty documents
-                            continue
-
-                        metadata.pop('orig_elements', None)
-                        metadata['source_url'] = str(source)
-                        documents.append(Document(content=item.text, id=doc_id, meta=metadata))
-
-            
-                except SDKError as e:
-                    print(e)
+        timings = dict.fromkeys(STAGES, 0.0)
+        for source_documents, symbols, source_timings in results:
+            documents.extend(source_documents)
+            all_symbols.update(symbols)
+            for stage, seconds in source_timings.items():
+                timings[stage] += seconds
+        timings["total"] = time.perf_counter() - start
 
         # Ensure all documents have the same symbols metadata if any were found
         if all_symbols:
@@ -100,29 +127,92 @@ class UnstructuredParser:
             for document in documents:
                 document.meta['symbol'] = symbols_str
 
-        return {"documents": documents}
+        logger.info("Parsed %d sources into %d documents in %.2fs (download %.2fs, partition %.2fs, convert %.2fs)",
+                    len(sources), len(documents), timings["total"],
+                    timings["download"], timings["partition"], timings["convert"])
+        return {"documents": documents, "timings": timings}
+
+    def _parse(self, source: Union[str, Path]) -> Tuple[List[Document], Set[str], Dict[str, float]]:
+        """Download and partition one source; returns its documents, symbols and stage timings."""
+        timings = dict.fromkeys(STAGES, 0.0)
+        documents = []
+        all_symbols = set()
+
+        start = time.perf_counter()
+        file_content = self.download_file(source)
+        timings["download"] = time.perf_counter() - start
+        if not file_content:  # Check if download was successful
+            return documents, all_symbols, timings
+
+        start = time.perf_counter()
+        try:
+            partitioned = self._partition(file_content, str(source))
+        except SDKError as e:
+            logger.error("Partitioning %s failed: %s", source, e)
+            return documents, all_symbols, timings
+        finally:
+            timings["partition"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        elements = dict_to_elements(partitioned)
+        for item in elements:
+            doc_id = str(uuid.uuid4())
+            metadata = item.metadata.to_dict()
+
+            # Extract CLASS-CONTRACT-TICKER-SYMBOL if present
+            symbol_matches = self.normalizer.symbols(item.text)
+            if symbol_matches:
+                symbols = ','.join(symbol_matches)
+                all_symbols.update(symbol_matches)  # Add to all symbols set
+                metadata['symbol'] = symbols
+
+            if not self.normalizer.has_content(item.text):  # Skip empty documents
+                continue
+
+            metadata.pop('orig_elements', None)
+            metadata['source_url'] = str(source)
+            documents.append(Document(content=item.text, id=doc_id, meta=metadata))
+        timings["convert"] = time.perf_counter() - start
+        return documents, all_symbols, timings
+
+    def _partition(self, content: bytes, file_name: str) -> List[Dict[str, Any]]:
+        """Partition one file, split into page ranges if configured; returns element dicts."""
+        ranges = split_page_ranges(content, file_name, self.split_pages) if self.split_pages else []
+        if len(ranges) <= 1:
+            return self._partition_request(content, file_name)
+
+        with ThreadPoolExecutor(min(self.split_concurrency, len(ranges))) as pool:
+            results = list(pool.map(lambda page_range: self._partition_request(page_range.content, file_name), ranges))
+        # A failed range raises, so a file is never indexed with pages missing
+        elements = []
+        for page_range, range_elements in zip(ranges, results):
+            elements.extend(offset_page_numbers(range_elements, page_range))
+        return elements
+
+    def _partition_request(self, content: bytes, file_name: str) -> List[Dict[str, Any]]:
+        req = shared.PartitionParameters(
+            files=shared.Files(
+                content=content,
+                file_name=file_name,
+            ),
+            strategy=self.strategy,
+            hi_res_model_name=self.model,
+            chunking_strategy=self.chunking_strategy,
+        )
+        return self.client.general.partition(req).elements
 
     # Helper function to download file from URL
-    def download_file(self, source: Union[str, Path]) -> bytes:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
+    def download_file(self, source: Union[str, Path]) -> Optional[bytes]:
         try:
-            response = requests.get(source, headers=headers)
-            
+            response = self.session.get(source, timeout=self.timeout)
+
             if response.status_code == 200:
-                print("Download succeeded")
+                logger.debug("Downloaded %s", source)
                 return response.content
             else:
-                print(f"Download failed with status code: {response.status_code}")
+                logger.warning("Download of %s failed with status code: %s", source, response.status_code)
         except Exception as e:
-            print("Download failed:", e)
+            logger.warning("Download of %s failed: %s", source, e)
         return None
 
 # How to initialize the component
@@ -0,0 +1,98 @@
+"""Compare per-event `DocumentWriter` calls with the buffered `bulk_write` stage.
+
+Replays `data/news_out.jsonl`, split into passages and given stand-in
+embeddings, against a local Elasticsearch `_bulk` stand-in. The stand-in
+refreshes every `--refresh-interval-ms`, so the per-event baseline,
+which writes with `refresh=wait_for`, waits for a refresh per event as
+it would against the single node from `docker-compose.yml`.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.bulk_writes --events 100 --refresh false wait_for
+"""
+from datetime import timedelta
+import argparse
+import random
+import statistics
+import time
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSink, TestingSource, run_main
+from haystack.components.writers import DocumentWriter
+from haystack.document_stores.types import DuplicatePolicy
+from haystack_integrations.document_stores.elasticsearch import ElasticsearchDocumentStore
+
+from benchmarks.embedding_batches import load_events
+from benchmarks.standins import ElasticsearchServer
+from bulk_writer import bulk_write
+
+
+def embed(events, dimensions):
+    rng = random.Random(0)
+    for documents in events:
+        for document in documents:
+            document.embedding = [rng.uniform(-1, 1) for _ in range(dimensions)]
+    return events
+
+
+def per_event(events, store):
+    writer = DocumentWriter(document_store=store, policy=DuplicatePolicy.OVERWRITE)
+    for documents in events:
+        writer.run(documents=documents)
+
+
+def buffered(events, store, args, refresh):
+    flushes = []
+    flow = Dataflow("bulk-benchmark")
+    inp = op.input("input", flow, TestingSource(events))
+    written = bulk_write("write", inp, store, max_documents=args.max_documents, max_bytes=args.max_bytes,
+                         timeout=timedelta(milliseconds=args.timeout_ms), refresh=refresh)
+    op.output("output", written, TestingSink(flushes))
+    run_main(flow)
+    return flushes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="data/news_out.jsonl")
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--max-documents", type=int, default=500)
+    parser.add_argument("--max-bytes", type=int, default=5_000_000)
+    parser.add_argument("--timeout-ms", type=int, default=1000)
+    parser.add_argument("--refresh", nargs="+", default=["false", "wait_for"])
+    parser.add_argument("--refresh-interval-ms", type=float, default=1000)
+    parser.add_argument("--reject-every", type=int, default=0,
+                        help="Reject every n-th document with a 429, as a full write queue does")
+    args = parser.parse_args()
+
+    events = embed(load_events(args.path)[:args.events], args.dimensions)
+    documents = sum(len(event) for event in events)
+    print(f"{len(events)} events, {documents} passages")
+
+    server_args = dict(refresh_interval=args.refresh_interval_ms / 1000)
+    with ElasticsearchServer(**server_args) as server:
+        start = time.perf_counter()
+        per_event(events, ElasticsearchDocumentStore(hosts=server.url))
+        baseline = time.perf_counter() - start
+        print(f"per-event DocumentWriter: {baseline:6.2f}s  {documents / baseline:6.0f} docs/s  "
+              f"{server.requests} requests")
+
+    for refresh in args.refresh:
+        with ElasticsearchServer(reject_every=args.reject_every, **server_args) as server:
+            start = time.perf_counter()
+            flushes = buffered(events, ElasticsearchDocumentStore(hosts=server.url), args, refresh)
+            elapsed = time.perf_counter() - start
+            latencies = sorted(flush.seconds * 1000 for flush in flushes)
+            rejected = sum(len(flush.rejected) for flush in flushes)
+            print(f"bulk_write refresh={refresh:<8} {elapsed:6.2f}s  {documents / elapsed:6.0f} docs/s  "
+                  f"{server.requests} requests  flush p50 {statistics.median(latencies):.0f} ms "
+                  f"max {latencies[-1]:.0f} ms  "
+                  f"{statistics.mean(flush.bytes for flush in flushes) / 1e6:.1f} MB/flush  {rejected} rejected")
+            assert sum(flush.documents for flush in flushes) == documents
+            assert len(server.indices["default"]) + rejected == len({d.id for event in events for d in event})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Check that an edited article only re-embeds the chunk that changed.
+
+Splits every article of `data/news_out.jsonl` with `split_change`,
+reports how many chunks the articles split into, then edits one word in
+the last paragraph of every article with more than one chunk and runs
+the update through `diff_chunks`. It fails unless each edit yields
+exactly one chunk to embed and one stale chunk.
+
+Then sends one article and its edit through `chunk_diffs` in a
+dataflow, `--pause-ms` apart, once with a TTL longer than the pause and
+once with a shorter one. The short TTL must forget the article, so the
+edit is diffed as a new article.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.chunk_updates
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import argparse
+import json
+import re
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.inputs import DynamicSource, StatelessSourcePartition
+from bytewax.testing import TestingSink, run_main
+
+from chunk_diff import chunk_diffs, diff_chunks
+from news_chunking import split_change
+from news_updates import UPSERT
+
+
+def edit_last_word(html):
+    """Misspell the last word of the text, leaving tags and entities alone."""
+    for match in reversed(list(re.finditer(r"[A-Za-z]{4,}", html))):
+        start = match.start()
+        inside_tag = html.rfind("<", 0, start) > html.rfind(">", 0, start)
+        if not inside_tag and html[start - 1] != "&":
+            return html[:start] + match.group()[::-1] + html[match.end():]
+    return html + " updated"
+
+
+class _PausedPartition(StatelessSourcePartition):
+    def __init__(self, batches, pause):
+        self._batches = list(batches)
+        self._pause = pause
+        self._awake = None
+
+    def next_batch(self):
+        if not self._batches:
+            raise StopIteration()
+        self._awake = datetime.now(timezone.utc) + self._pause
+        return self._batches.pop(0)
+
+    def next_awake(self):
+        return self._awake
+
+
+class PausedSource(DynamicSource):
+    """Emits each of `batches` on every worker, `pause` apart."""
+
+    def __init__(self, batches, pause):
+        self._batches = batches
+        self._pause = pause
+
+    def build(self, step_id, worker_index, worker_count):
+        return _PausedPartition(self._batches, self._pause)
+
+
+def diff_after_pause(change, update, pause, ttl):
+    """The `ChunkDiff` of `update`, sent `pause` after `change` through `chunk_diffs` with `ttl`."""
+    out = []
+    flow = Dataflow("chunk_ttl")
+    changes = op.input("input", flow, PausedSource([[("article", change)], [("article", update)]], pause))
+    op.output("output", chunk_diffs("chunk_diff", changes, ttl=ttl), TestingSink(out))
+    run_main(flow, epoch_interval=timedelta(milliseconds=20))
+    return out[-1][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="data/news_out.jsonl")
+    parser.add_argument("--pause-ms", type=int, default=300)
+    args = parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as file:
+        events = {}
+        for line in file:
+            if line.strip():
+                event = json.loads(line)
+                events[str(event["id"])] = event
+
+    counts = Counter()
+    edited = failures = 0
+    for article_id, event in events.items():
+        _, chunks = split_change((UPSERT, dict(event)))
+        counts[len(chunks)] += 1
+        if len(chunks) < 2:
+            continue
+
+        indexed, _ = diff_chunks(None, (UPSERT, chunks))
+        # Edit the last word of the article, which sits in its last chunk
+        update = dict(event, content=edit_last_word(event["content"]))
+        _, new_chunks = split_change((UPSERT, update))
+        _, diff = diff_chunks(indexed, (UPSERT, new_chunks))
+        edited += 1
+        last_edit = chunks, new_chunks
+        if len(diff.documents) != 1 or len(diff.stale_ids) != 1:
+            failures += 1
+            print(f"article {article_id}: {len(diff.documents)} to embed, {len(diff.stale_ids)} stale")
+
+    print(f"{len(events)} articles by number of chunks: {dict(sorted(counts.items()))}")
+    print(f"{edited} multi-chunk articles edited, {edited - failures} re-embed exactly one chunk")
+    assert edited and not failures, f"{failures} of {edited} edits re-embedded more than the changed chunk"
+
+    pause = timedelta(milliseconds=args.pause_ms)
+    chunks, new_chunks = last_edit
+    kept = diff_after_pause((UPSERT, chunks), (UPSERT, new_chunks), pause, ttl=pause * 10)
+    forgotten = diff_after_pause((UPSERT, chunks), (UPSERT, new_chunks), pause, ttl=pause / 3)
+    print(f"edit after {args.pause_ms}ms: {len(kept.stale_ids)} stale with a longer TTL, "
+          f"{len(forgotten.stale_ids)} stale and {len(forgotten.documents)} of {len(new_chunks)} "
+          f"chunks to embed with a shorter one")
+    assert len(kept.documents) == 1 and len(kept.stale_ids) == 1, "the article was forgotten within its TTL"
+    assert len(forgotten.documents) == len(new_chunks) and not forgotten.stale_ids, \
+        "the article's chunk ids outlived the TTL"
+
+
+if __name__ == "__main__":
+    main()
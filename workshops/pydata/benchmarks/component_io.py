@@ -0,0 +1,93 @@
+"""Flag per-item I/O in the CPU steps of the news dataflow.
+
+Runs the events of `data/news_out.jsonl`, repeated and held in memory,
+through the steps of `dataflow.py` up to embedding (deserialize, article
+changes, cleaning and splitting, chunk diff) inside a Bytewax dataflow,
+and then through the chunking pipeline one event at a time, as
+`BenzingaEmbeder.run` does. Both run under `IOGuard`, which reports any
+file, network or subprocess activity by component and exits non-zero if
+it finds some. Embedding and writing are left out; talking to the
+network is their job.
+
+`--draw` adds the `Pipeline.draw` call `BenzingaEmbeder.run` used to
+make for every event. The strict guard stops its mermaid.ink request,
+so nothing leaves the machine.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.component_io --repeat 5
+"""
+import argparse
+import sys
+import time
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSink, TestingSource, run_main
+from haystack.core.errors import PipelineDrawingError
+
+from chunk_diff import chunk_diffs
+from deserialize import deserialize_batch
+from io_guard import IOGuard, IOGuardError
+from news_chunking import chunking_pipeline, split_change
+from news_updates import article_changes
+
+
+def run_dataflow(lines):
+    out = []
+    flow = Dataflow("component_io")
+    events = op.flat_map_batch("deserialize", op.input("input", flow, TestingSource(lines, 64)),
+                               deserialize_batch)
+    changes = article_changes("article_changes", op.key_on("key_on_id", events, lambda event: str(event["id"])))
+    chunks = op.map_value("split_content", changes, split_change)
+    op.output("output", chunk_diffs("chunk_diff", chunks), TestingSink(out))
+    run_main(flow)
+    return len(out)
+
+
+def run_per_event(events, draw):
+    pipeline = chunking_pipeline()
+    for event in events:
+        pipeline.run({"get_news": {"sources": [dict(event)]}})
+        if draw:
+            try:
+                pipeline.draw("benzinga_pipeline.png")
+            except PipelineDrawingError:
+                pass  # the strict guard refused the request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="data/news_out.jsonl")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--draw", action="store_true", help="Also draw the pipeline per event, as before")
+    args = parser.parse_args()
+
+    with open(args.path) as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    events = deserialize_batch(lines)
+    # Each repetition is a new version of every article, so all are re-split
+    lines = [line.replace('"content": "', f'"content": "<p>Revision {i}</p>', 1)
+             for i in range(args.repeat) for line in lines]
+    events = events * args.repeat
+
+    flagged = 0
+    for name, run in [("dataflow", lambda: run_dataflow(lines)),
+                      ("per-event pipeline" + (" + draw" if args.draw else ""),
+                       lambda: run_per_event(events, args.draw))]:
+        with IOGuard(strict=args.draw) as guard:
+            start = time.perf_counter()
+            try:
+                run()
+            except IOGuardError:
+                pass
+            seconds = time.perf_counter() - start
+        flagged += guard.count
+        print(f"{name:<28} {len(events) / seconds:8.0f} events/s  {guard.count} I/O events")
+        if guard.count:
+            print(guard.report(items=len(events)))
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
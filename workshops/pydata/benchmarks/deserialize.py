@@ -0,0 +1,151 @@
+"""Lines/sec of the shared deserializer against the per-dataflow copy it replaced.
+
+Repeats `data/news_out.jsonl`, wrapping every other line in the
+`[key, event]` envelope and dropping `url` from a few so the skip
+paths are exercised, then times:
+
+* the old `safe_deserialize` copy (stdlib `json`, f-string logging),
+* `deserialize.safe_deserialize` with each available backend,
+* `deserialize.deserialize_batch` over `--batch-size` slices,
+* both inside a Bytewax dataflow, per line with `filter_map` and per
+  batch with `flat_map_batch`.
+
+Each figure is the best of `--rounds` runs.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.deserialize --repeat 50
+"""
+import argparse
+import json
+import logging
+import time
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSink, TestingSource, run_main
+
+import deserialize
+
+logger = logging.getLogger("legacy")
+
+
+def legacy_deserialize(data):
+    """The copy previously pasted into each dataflow."""
+    try:
+        parsed_data = json.loads(data)
+        if isinstance(parsed_data, list):
+            if len(parsed_data) == 2 and (parsed_data[0] is None or isinstance(parsed_data[0], str)):
+                event = parsed_data[1]
+            else:
+                logger.info(f"Skipping unexpected list format: {data}")
+                return None
+        elif isinstance(parsed_data, dict):
+            event = parsed_data
+        else:
+            logger.info(f"Skipping unexpected data type: {data}")
+            return None
+
+        if 'link' in event:
+            event['url'] = event.pop('link')
+
+        if "url" in event:
+            return event
+        else:
+            logger.info(f"Missing 'url' key in data: {data}")
+            return None
+
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error ({e}) for data: {data}")
+        return None
+
+
+def load_lines(path, repeat):
+    with open(path, encoding="utf-8") as file:
+        events = [json.loads(line) for line in file if line.strip()]
+    lines = []
+    for copy in range(repeat):
+        for index, event in enumerate(events):
+            if index % 10 == 0:
+                event = {key: value for key, value in event.items() if key != "url"}
+            if index % 2:
+                lines.append(json.dumps([str(event["id"]), event]))
+            else:
+                lines.append(json.dumps(event))
+    return lines
+
+
+def best_of(rounds, run):
+    """Fastest of `rounds` calls of `run`, which returns `(kept, seconds)`."""
+    return min((run() for _ in range(rounds)), key=lambda result: result[1])
+
+
+def time_function(deserializer, lines):
+    start = time.perf_counter()
+    # Kept like the batch and the dataflow keep them; the garbage collector walks live events
+    events = [event for event in map(deserializer, lines) if event is not None]
+    return len(events), time.perf_counter() - start
+
+
+def time_batch(lines, batch_size):
+    start = time.perf_counter()
+    kept = sum(
+        len(deserialize.deserialize_batch(lines[index:index + batch_size]))
+        for index in range(0, len(lines), batch_size)
+    )
+    return kept, time.perf_counter() - start
+
+
+def time_dataflow(lines, batched, batch_size):
+    out = []
+    flow = Dataflow("deserialize")
+    up = op.input("input", flow, TestingSource(lines, batch_size))
+    if batched:
+        events = op.flat_map_batch("deserialize", up, deserialize.deserialize_batch)
+    else:
+        events = op.filter_map("deserialize", up, deserialize.safe_deserialize)
+    op.output("out", events, TestingSink(out))
+    start = time.perf_counter()
+    run_main(flow)
+    return len(out), time.perf_counter() - start
+
+
+def report(name, lines, kept, seconds):
+    print(f"{name:<34} {len(lines) / seconds:>12,.0f} lines/s  ({kept} kept, {seconds:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="data/news_out.jsonl")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--log-level", default="WARNING",
+                        help="Level of the root logger; skipped lines log at INFO")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+
+    lines = load_lines(args.data, args.repeat)
+    print(f"{len(lines)} lines, log level {args.log_level}")
+
+    rounds = args.rounds
+    report("legacy copy (json)", lines, *best_of(rounds, lambda: time_function(legacy_deserialize, lines)))
+    backends = ["json"] + (["orjson"] if deserialize.orjson is not None else [])
+    for backend in backends:
+        deserialize.set_backend(backend)
+        report(f"safe_deserialize ({backend})", lines,
+               *best_of(rounds, lambda: time_function(deserialize.safe_deserialize, lines)))
+        report(f"deserialize_batch ({backend})", lines,
+               *best_of(rounds, lambda: time_batch(lines, args.batch_size)))
+
+    print()
+    for backend in backends:
+        deserialize.set_backend(backend)
+        report(f"filter_map ({backend})", lines,
+               *best_of(rounds, lambda: time_dataflow(lines, False, args.batch_size)))
+        report(f"flat_map_batch ({backend})", lines,
+               *best_of(rounds, lambda: time_dataflow(lines, True, args.batch_size)))
+
+
+if __name__ == "__main__":
+    main()
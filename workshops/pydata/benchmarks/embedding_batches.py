@@ -0,0 +1,100 @@
+"""Compare per-event embedding with the batched embedding stage.
+
+Replays `data/news_out.jsonl` against a local OpenAI-compatible
+embedding stand-in, once calling the embedder for every event and once
+through `batch_embed`.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.embedding_batches
+"""
+from datetime import timedelta
+import argparse
+import json
+import re
+import time
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSink, TestingSource, run_main
+from haystack import Document
+from haystack.components.embedders import OpenAIDocumentEmbedder
+from haystack.components.preprocessors import DocumentSplitter
+from haystack.utils import Secret
+
+from benchmarks.standins import EmbeddingServer
+from embedding_batcher import batch_embed
+
+
+def load_events(path):
+    """Split every news item into passages, the way the dataflow does before embedding."""
+    splitter = DocumentSplitter(split_by="passage", split_length=5)
+    events = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            event = json.loads(line)
+            text = re.sub(r"<[^>]*>", "", event.get("content", "")).strip()
+            if not text:
+                continue
+            documents = splitter.run(documents=[Document(content=text, meta={"id": event["id"]})])
+            events.append(documents["documents"])
+    return events
+
+
+def make_embedder(url, batch_size):
+    return OpenAIDocumentEmbedder(api_key=Secret.from_token("stand-in"),
+                                  api_base_url=f"{url}/v1",
+                                  batch_size=batch_size,
+                                  progress_bar=False)
+
+
+def per_event(events, embedder):
+    for documents in events:
+        embedder.run(documents=documents)
+
+
+def batched(events, embedder, max_size, timeout):
+    out = []
+    flow = Dataflow("embedding-benchmark")
+    inp = op.input("input", flow, TestingSource(events))
+    embedded = batch_embed("embed", inp, embedder, max_size=max_size, timeout=timeout)
+    op.output("output", embedded, TestingSink(out))
+    run_main(flow)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="data/news_out.jsonl")
+    parser.add_argument("--max-size", type=int, default=256)
+    parser.add_argument("--timeout-ms", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    events = load_events(args.path)
+    documents = sum(len(event) for event in events)
+    print(f"{len(events)} events, {documents} passages")
+
+    with EmbeddingServer(latency=args.latency_ms / 1000) as server:
+        start = time.perf_counter()
+        per_event(events, make_embedder(server.url, 32))
+        baseline = time.perf_counter() - start
+        baseline_requests = server.requests
+        print(f"per-event: {baseline:.2f}s, {documents / baseline:.0f} docs/s, "
+              f"{baseline_requests} requests")
+
+        server.requests = 0
+        start = time.perf_counter()
+        out = batched(events, make_embedder(server.url, args.max_size),
+                      args.max_size, timedelta(milliseconds=args.timeout_ms))
+        elapsed = time.perf_counter() - start
+        print(f"batched:   {elapsed:.2f}s, {documents / elapsed:.0f} docs/s, "
+              f"{server.requests} requests")
+
+    assert sum(len(event) for event in out) == documents
+    assert all(document.embedding for event in out for document in event)
+    print(f"speedup: {baseline / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Compare the BeautifulSoup + DocumentCleaner path with `clean_html`.
+
+Runs every event of `data/news_out.jsonl`, repeated, through:
+
+* the old `BenzingaNews.clean_text`, a BeautifulSoup parse of every
+  string field followed by `DocumentCleaner`;
+* `clean_html` on the `content`, `headline` and `summary` fields only.
+
+It reports events/s for both and fails if any cleaned field or
+document text differs between them.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.html_cleaning --repeat 5
+"""
+import argparse
+import json
+import re
+import time
+import warnings
+
+from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
+from haystack import Document
+from haystack.components.preprocessors import DocumentCleaner
+
+from html_cleaner import clean_html
+
+FIELDS = ("content", "headline", "summary")
+
+
+def soup_clean_text(text):
+    """The `BenzingaNews.clean_text` this replaces."""
+    soup = BeautifulSoup(text, "html.parser")
+    text = soup.get_text()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def soup_path(events, cleaner):
+    documents = []
+    for source in events:
+        for key in source:
+            if type(source[key]) == str:
+                source[key] = soup_clean_text(source[key])
+        if source['content'] == "":
+            continue
+        documents.append(Document(content=source['content'], meta=source))
+    return cleaner.run(documents=documents)["documents"]
+
+
+def single_pass(events):
+    documents = []
+    for source in events:
+        for key in FIELDS:
+            if isinstance(source.get(key), str):
+                source[key] = clean_html(source[key])
+        if not source.get('content'):
+            continue
+        documents.append(Document(content=source['content'], meta=source))
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="data/news_out.jsonl")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
+
+    with open(args.data, encoding="utf-8") as file:
+        lines = [line for line in file if line.strip()]
+    lines = lines * args.repeat
+    cleaner = DocumentCleaner(remove_empty_lines=True, remove_extra_whitespaces=True,
+                              remove_repeated_substrings=False)
+
+    old_events = [json.loads(line) for line in lines]
+    start = time.perf_counter()
+    old_documents = soup_path(old_events, cleaner)
+    old_seconds = time.perf_counter() - start
+
+    new_events = [json.loads(line) for line in lines]
+    start = time.perf_counter()
+    new_documents = single_pass(new_events)
+    new_seconds = time.perf_counter() - start
+
+    print(f"{'BeautifulSoup + DocumentCleaner':<32} {len(lines) / old_seconds:>10,.0f} events/s  ({old_seconds:.2f}s)")
+    print(f"{'clean_html':<32} {len(lines) / new_seconds:>10,.0f} events/s  ({new_seconds:.2f}s)")
+    print(f"speedup {old_seconds / new_seconds:.1f}x")
+
+    mismatches = [
+        (old[field], new[field])
+        for old, new in zip(old_events, new_events)
+        for field in FIELDS
+        if isinstance(new.get(field), str) and old[field] != new[field]
+    ]
+    mismatches += [
+        (old.content, new.content)
+        for old, new in zip(old_documents, new_documents)
+        if old.content != new.content
+    ]
+    if len(old_documents) != len(new_documents):
+        mismatches.append((len(old_documents), len(new_documents)))
+    for old, new in mismatches[:5]:
+        print(f"mismatch:\n  old {old!r:.200}\n  new {new!r:.200}")
+    assert not mismatches, f"{len(mismatches)} outputs differ"
+    print(f"{len(new_documents)} documents, output identical for {', '.join(FIELDS)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Cold-start import time of each dataflow module.
+
+Imports every module in a fresh interpreter with `python -X importtime`
+and reports the wall time of the import, the slowest imports it
+triggered and, with `--build`, the time to first call `per_worker`
+factories, i.e. what a worker pays before its first item. Run it
+regularly, or with `--json` from CI, to track cold start per dataflow.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.import_profile dataflow --build dataflow:cached_embedder
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# Run in the child interpreter; prints a JSON line of timings on stdout
+_CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+# `__import__`, unlike `importlib.import_module`, is what -X importtime times
+__import__(sys.argv[1])
+timings = {"import": time.perf_counter() - start}
+for target in sys.argv[2:]:
+    name, attribute = target.split(":")
+    factory = getattr(importlib.import_module(name), attribute)
+    start = time.perf_counter()
+    factory()
+    timings[target] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def parse_importtime(stderr):
+    """Turn `-X importtime` output into `(depth, name, self_us, cumulative_us)` rows."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def direct_imports(rows, module):
+    """Rows imported directly by the top-level import of `module`.
+
+    `-X importtime` prints an import after everything it imported, one
+    level deeper, so children are the deeper rows just before it.
+    """
+    pending = defaultdict(list)
+    for row in rows:
+        depth, name = row[0], row[1]
+        children = pending.pop(depth + 1, [])
+        if depth == 0 and name == module:
+            return children
+        pending[depth].append(row)
+    return []
+
+
+def profile(module, factories, env):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, module, *factories],
+        capture_output=True, text=True, env=env,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{process.stderr.splitlines()[-1]}")
+    timings = json.loads(process.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(process.stderr)
+    by_package = defaultdict(int)
+    for _, name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    return timings, rows, by_package
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="+", help="Dataflow modules to import, e.g. dataflow")
+    parser.add_argument("--build", nargs="*", default=[], metavar="MODULE:FACTORY",
+                        help="Factories to call after the import, e.g. dataflow:cached_embedder")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="Report the fastest of this many runs")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per module")
+    args = parser.parse_args()
+
+    env = dict(os.environ, HAYSTACK_TELEMETRY_ENABLED=os.environ.get("HAYSTACK_TELEMETRY_ENABLED", "False"))
+    for module in args.modules:
+        factories = [target for target in args.build if target.split(":")[0] == module]
+        runs = [profile(module, factories, env) for _ in range(args.repeat)]
+        timings, rows, by_package = min(runs, key=lambda run: run[0]["import"])
+        packages = sorted(by_package.items(), key=lambda item: -item[1])[:args.top]
+
+        if args.json:
+            print(json.dumps({"module": module, "seconds": timings,
+                              "packages_ms": {name: us / 1000 for name, us in packages}}))
+            continue
+
+        print(f"{module}: import {timings['import'] * 1000:.0f} ms")
+        for target in factories:
+            print(f"  first {target}() {timings[target] * 1000:.0f} ms")
+        direct = sorted(direct_imports(rows, module), key=lambda row: -row[3])[:args.top]
+        print(f"  slowest imports of {module} (cumulative ms):")
+        for _, name, _, cumulative_us in direct:
+            print(f"    {cumulative_us / 1000:8.1f}  {name}")
+        print("  self time by top-level package, including factories (ms):")
+        for name, self_us in packages:
+            print(f"    {self_us / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Scaling of the `offload` operator from 1 to N processes.
+
+Builds a synthetic corpus of SEC-filing-sized news events (HTML tables
+and paragraphs, a few hundred KB each) and runs the clean + split step,
+`news_chunking.split_change`, over it inside a Bytewax dataflow: once
+inline with `op.map_value` and then through `offload` with an
+increasing number of pool processes. Events are spread over `--keys`
+keys, so a key's values queue up and go to the pool in batches. Each
+run must emit every key's results in the inline order and leave no pool
+process running.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.offload --events 200 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import random
+import time
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSink, TestingSource, run_main
+
+from news_chunking import split_change
+from news_updates import UPSERT
+from offload import offload
+
+WORDS = ("fund", "portfolio", "net", "assets", "adviser", "shares", "class", "expense",
+         "ratio", "treasury", "note", "market", "value", "return", "period", "annual")
+
+
+def filing_event(rng, index, size):
+    """A news event whose content is an HTML filing of roughly `size` characters."""
+    parts = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.5:
+            part = ("<table>" + "".join(
+                f"<tr><td>{rng.choice(WORDS).title()}&nbsp;{rng.choice(WORDS)}</td>"
+                f"<td align=\"right\">${rng.uniform(1, 1e6):,.2f}</td></tr>"
+                for _ in range(8)) + "</table>\n\n")
+        else:
+            part = "<p>" + " ".join(rng.choice(WORDS) for _ in range(120)) + ".</p>\n\n"
+        parts.append(part)
+        length += len(part)
+    return {"id": index, "headline": f"<b>Filing {index}</b>", "summary": "",
+            "content": "".join(parts), "url": f"https://www.sec.gov/{index}"}
+
+
+def run(events, workers, batch_size, keys):
+    out = []
+    flow = Dataflow("offload")
+    changes = op.input("input", flow, TestingSource(
+        [(str(event["id"] % keys), (UPSERT, dict(event))) for event in events], batch_size))
+    if workers:
+        chunks = offload("split", changes, split_change, max_workers=workers)
+    else:
+        chunks = op.map_value("split", changes, split_change)
+    op.output("output", chunks, TestingSink(out))
+    start = time.perf_counter()
+    run_main(flow)
+    seconds = time.perf_counter() - start
+    for process in multiprocessing.active_children():
+        # Told to exit at EOF; a pool that was never shut down times out here
+        process.join(10)
+    assert not multiprocessing.active_children(), "the pool is still running after EOF"
+    by_key = {}
+    for key, (_, documents) in out:
+        by_key.setdefault(key, []).append([document.id for document in documents])
+    return by_key, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--event-kilobytes", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--keys", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, multiprocessing.cpu_count()}))
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    events = [filing_event(rng, index, args.event_kilobytes * 1000) for index in range(args.events)]
+    megabytes = sum(len(event["content"]) for event in events) / 1e6
+    print(f"{len(events)} events, {megabytes:.0f} MB, {multiprocessing.cpu_count()} CPUs")
+
+    expected, baseline = run(events, 0, args.batch_size, args.keys)
+    chunks = sum(len(ids) for results in expected.values() for ids in results)
+    print(f"{'inline map_value':<20} {len(events) / baseline:8.1f} events/s  {megabytes / baseline:6.1f} MB/s  "
+          f"({chunks} chunks)")
+    for workers in args.workers:
+        # Includes starting the pool processes
+        by_key, seconds = run(events, workers, args.batch_size, args.keys)
+        assert by_key == expected, "offload results differ from inline, or are out of order within a key"
+        print(f"{f'offload x{workers}':<20} {len(events) / seconds:8.1f} events/s  {megabytes / seconds:6.1f} MB/s  "
+              f"({chunks} chunks, {baseline / seconds:.2f}x inline)")
+
+
+if __name__ == "__main__":
+    main()
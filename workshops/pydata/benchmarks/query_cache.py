@@ -0,0 +1,114 @@
+"""Latency of repeated dashboard questions with and without the query cache.
+
+Runs `--questions` distinct questions `--repeat` times each, in random
+order, through the text embedder and retriever of the query pipeline:
+an `OpenAITextEmbedder` against the local embedding stand-in and an
+`InMemoryEmbeddingRetriever` over `--documents` random vectors. Then
+rewrites one retrieved document, as the streaming indexer does, and
+checks that the next run of that question searches again, and that an
+embedder with a prefix embeds each question with the prefix once.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.query_cache --documents 20000 --questions 8 --repeat 25
+"""
+import argparse
+import random
+import statistics
+import time
+
+from haystack import Document, Pipeline
+from haystack.components.embedders import OpenAITextEmbedder
+from haystack.components.retrievers.in_memory import InMemoryEmbeddingRetriever
+from haystack.document_stores.in_memory import InMemoryDocumentStore
+from haystack.utils import Secret
+
+from benchmarks.standins import EmbeddingServer
+from query_cache import CachedEmbeddingRetriever, CachedTextEmbedder, QueryCache
+
+QUESTIONS = [
+    "How was stock impacted by the actions of Elon Musk",
+    "Which companies raised their guidance this quarter",
+    "What did analysts say about Nvidia earnings",
+    "Which stocks were downgraded today",
+    "How did oil prices move this week",
+    "What are the latest merger announcements",
+    "Which biotech companies reported trial results",
+    "How did the market react to the Fed decision",
+]
+
+
+def query_pipeline(store, url, dimensions, cache=None):
+    embedder = OpenAITextEmbedder(api_key=Secret.from_token("stand-in"), api_base_url=f"{url}/v1",
+                                  dimensions=dimensions)
+    retriever = InMemoryEmbeddingRetriever(store, top_k=10)
+    if cache is not None:
+        embedder, retriever = CachedTextEmbedder(embedder, cache), CachedEmbeddingRetriever(retriever, cache)
+    pipeline = Pipeline()
+    pipeline.add_component("text_embedder", embedder)
+    pipeline.add_component("retriever", retriever)
+    pipeline.connect("text_embedder.embedding", "retriever.query_embedding")
+    return pipeline
+
+
+def ask(pipeline, question):
+    start = time.perf_counter()
+    documents = pipeline.run({"text_embedder": {"text": question}})["retriever"]["documents"]
+    return [document.id for document in documents], (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--questions", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=25)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    store = InMemoryDocumentStore(embedding_similarity_function="cosine")
+    store.write_documents([
+        Document(id=f"doc-{i}", content=f"passage {i}", embedding=[rng.gauss(0, 1) for _ in range(args.dimensions)])
+        for i in range(args.documents)
+    ])
+    questions = QUESTIONS[:args.questions] * args.repeat
+    rng.shuffle(questions)
+    print(f"{args.documents} documents, {len(questions)} queries over {args.questions} questions")
+
+    with EmbeddingServer(latency=args.latency_ms / 1000, dimensions=args.dimensions) as server:
+        cache = QueryCache()
+        results = {}
+        for name, pipeline in [("uncached", query_pipeline(store, server.url, args.dimensions)),
+                               ("cached", query_pipeline(store, server.url, args.dimensions, cache))]:
+            server.requests = 0
+            latencies = []
+            for question in questions:
+                ids, milliseconds = ask(pipeline, question)
+                latencies.append(milliseconds)
+                assert results.setdefault(question, ids) == ids, "cached results differ"
+            latencies.sort()
+            print(f"{name:<9} mean {statistics.mean(latencies):7.1f} ms  p50 {latencies[len(latencies) // 2]:7.1f} ms  "
+                  f"p95 {latencies[int(len(latencies) * 0.95)]:7.1f} ms  {server.requests} embedding requests")
+
+        # The indexer rewrites a retrieved document and invalidates its results
+        question = questions[0]
+        document = store.filter_documents({"field": "id", "operator": "==", "value": results[question][0]})[0]
+        store.write_documents([document], policy="overwrite")
+        dropped = cache.invalidate([document.id])
+        _, searched = ask(pipeline, question)
+        _, cached = ask(pipeline, question)
+        print(f"after invalidating {dropped} result: {searched:.1f} ms (search), then {cached:.1f} ms (cached)")
+        print(f"cache: {cache.stats()}")
+
+        prefixed = CachedTextEmbedder(OpenAITextEmbedder(api_key=Secret.from_token("stand-in"),
+                                                         api_base_url=f"{server.url}/v1",
+                                                         dimensions=args.dimensions, prefix="query: "), cache)
+        for _ in range(2):
+            embedding = prefixed.run(text=question)["embedding"]
+            assert embedding == server.embed("query: " + question), "the prefix was not applied exactly once"
+        print("prefixed embedder: embedded and cached with the prefix applied once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Local HTTP stand-ins for the services the dataflows talk to."""
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import base64
+import hashlib
+import json
+import time
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer:
+    """Run a handler class on a free local port in a background thread.
+
+    Use as a context manager; `url` is the base URL to hand to clients.
+    """
+
+    handler_class = _StandInHandler
+
+    def __init__(self):
+        self.requests = 0
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _EmbeddingHandler(_StandInHandler):
+    def do_POST(self):
+        standin = self.server.standin
+        standin.count_request()
+        payload = self.read_json()
+        texts = payload["input"]
+        if isinstance(texts, str):
+            texts = [texts]
+        time.sleep(standin.latency + standin.per_input_latency * len(texts))
+
+        # Like the real API, answer in base64 float32 when the client asks for it.
+        encode = standin.embed
+        if payload.get("encoding_format") == "base64":
+            encode = standin.embed_base64
+        data = [
+            {"object": "embedding", "index": i, "embedding": encode(text)}
+            for i, text in enumerate(texts)
+        ]
+        tokens = sum(len(text.split()) for text in texts)
+        self.send_json({
+            "object": "list",
+            "data": data,
+            "model": payload.get("model", "stand-in"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+class EmbeddingServer(StandInServer):
+    """OpenAI-compatible `/v1/embeddings` endpoint with simulated latency.
+
+    Vectors are derived from a hash of the input text so equal texts
+    always get equal embeddings. Point `OpenAIDocumentEmbedder` at it
+    with `api_base_url=server.url + "/v1"`.
+    """
+
+    handler_class = _EmbeddingHandler
+
+    def __init__(self, latency=0.05, per_input_latency=0.0005, dimensions=1536):
+        super().__init__()
+        self.latency = latency
+        self.per_input_latency = per_input_latency
+        self.dimensions = dimensions
+
+    def embed(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [(digest[i % len(digest)] - 128) / 128 for i in range(self.dimensions)]
+
+    def embed_base64(self, text):
+        return base64.b64encode(array("f", self.embed(text)).tobytes()).decode("ascii")
+
+
+class _ElasticsearchHandler(_StandInHandler):
+    def end_headers(self):
+        # The Python client refuses servers without this header
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        super().end_headers()
+
+    def do_GET(self):
+        self.send_json({"name": "stand-in", "cluster_name": "stand-in", "version": {"number": "8.11.1"},
+                        "tagline": "You Know, for Search"})
+
+    def do_HEAD(self):
+        index = self.path.strip("/").split("?")[0]
+        self.send_response(200 if index in self.server.standin.indices else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self):
+        if self.path.partition("?")[0].endswith("/_bulk"):
+            self.do_POST()
+            return
+        index = self.path.strip("/").split("?")[0]
+        # The mappings are not used
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.standin.indices.setdefault(index, {})
+        self.send_json({"acknowledged": True, "shards_acknowledged": True, "index": index})
+
+    def do_POST(self):
+        path, _, query = self.path.partition("?")
+        if not path.endswith("/_bulk"):
+            self.send_json({"error": {"type": "stand_in_unsupported", "reason": path}}, status=400)
+            return
+        standin = self.server.standin
+        standin.count_request()
+        params = dict(param.split("=", 1) for param in query.split("&") if "=" in param)
+        length = int(self.headers.get("Content-Length", 0))
+        lines = [json.loads(line) for line in self.rfile.read(length).splitlines() if line.strip()]
+        start = time.perf_counter()
+        items = standin.bulk(path[:-len("/_bulk")].strip("/"), lines)
+        time.sleep(standin.latency + standin.per_document_latency * len(items))
+        standin.refresh(params.get("refresh", "false"))
+        self.send_json({
+            "took": int((time.perf_counter() - start) * 1000),
+            "errors": any("error" in next(iter(item.values())) for item in items),
+            "items": items,
+        })
+
+
+class ElasticsearchServer(StandInServer):
+    """Elasticsearch `_bulk` endpoint with simulated latency and refreshes.
+
+    Answers just enough of the API for `ElasticsearchDocumentStore` to
+    connect and create its index, and for `_bulk` requests with
+    `index`, `create` and `delete` actions, which are applied to an
+    in-memory dict per index. `refresh=wait_for` waits for the next
+    tick of `refresh_interval`, like a real node with the default
+    interval. Every `reject_every`-th document, if set, is rejected
+    with `es_rejected_execution_exception`, like a full write queue.
+    """
+
+    handler_class = _ElasticsearchHandler
+
+    def __init__(self, latency=0.005, per_document_latency=0.0002, refresh_interval=1.0,
+                 refresh_latency=0.02, reject_every=0):
+        super().__init__()
+        self.latency = latency
+        self.per_document_latency = per_document_latency
+        self.refresh_interval = refresh_interval
+        self.refresh_latency = refresh_latency
+        self.reject_every = reject_every
+        self.indices = {}
+        self.documents = 0
+        self._started = time.monotonic()
+
+    def bulk(self, index, lines):
+        """Apply the actions in `lines` and return the `items` of the response."""
+        items = []
+        position = 0
+        with self._lock:
+            documents = self.indices.setdefault(index or "default", {})
+            while position < len(lines):
+                (action, meta), = lines[position].items()
+                position += 1
+                source = None
+                if action != "delete":
+                    source, position = lines[position], position + 1
+                self.documents += 1
+                items.append({action: self._apply(documents, action, meta["_id"], source)})
+        return items
+
+    def _apply(self, documents, action, doc_id, source):
+        result = {"_id": doc_id}
+        if self.reject_every and self.documents % self.reject_every == 0:
+            return dict(result, status=429, error={"type": "es_rejected_execution_exception"})
+        if action == "create" and doc_id in documents:
+            return dict(result, status=409, error={"type": "version_conflict_engine_exception"})
+        if action == "delete":
+            found = documents.pop(doc_id, None) is not None
+            return dict(result, status=200 if found else 404, result="deleted" if found else "not_found")
+        created = doc_id not in documents
+        documents[doc_id] = source
+        return dict(result, status=201 if created else 200, result="created" if created else "updated")
+
+    def refresh(self, mode):
+        if mode == "wait_for":
+            waited = (time.monotonic() - self._started) % self.refresh_interval
+            time.sleep(self.refresh_interval - waited)
+        elif mode in ("true", ""):
+            time.sleep(self.refresh_latency)
@@ -0,0 +1,78 @@
+"""Timestamp parsing throughput against the regex + strptime `parse_time`.
+
+Parses `created_at` and `updated_at` of `data/news_out.jsonl`, repeated,
+with the old `parse_time`, the cached `fromisoformat` parser and the
+NumPy `datetime64` batch mode, and checks all three agree.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.timestamps --repeat 100
+"""
+from datetime import datetime, timezone
+import argparse
+import json
+import re
+import time
+
+import timestamps
+
+
+def legacy_parse_time(parsed_data):
+    """The `parse_time` previously in the windowing dataflows."""
+    for item in ['created_at', 'updated_at']:
+        time_min_t = re.sub("T", " ", parsed_data[item])
+        time_min_ms = re.sub(r":*Z", "", time_min_t)
+        time_ = time.strptime(time_min_ms, "%Y-%m-%d %H:%M:%S")
+
+        parsed_data[item] = datetime(year=time_.tm_year,
+                                     month=time_.tm_mon,
+                                     day=time_.tm_mday,
+                                     hour=time_.tm_hour,
+                                     minute=time_.tm_min,
+                                     second=time_.tm_sec,
+                                     tzinfo=timezone.utc)
+    return parsed_data
+
+
+def batches(events, size):
+    return [events[index:index + size] for index in range(0, len(events), size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="data/news_out.jsonl")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as file:
+        events = [json.loads(line) for line in file if line.strip()]
+    fields = ("created_at", "updated_at")
+    events = [{field: event[field] for field in fields} for _ in range(args.repeat) for event in events]
+
+    runs = {
+        "regex + strptime": lambda events: [legacy_parse_time(event) for event in events],
+        "cached fromisoformat": lambda events: [timestamps.parse_event_timestamps(event) for event in events],
+        "numpy datetime64 batches": lambda events: [
+            event
+            for batch in batches(events, args.batch_size)
+            for event in timestamps.parse_batch_timestamps(batch)
+        ],
+    }
+    results = {}
+    for name, run in runs.items():
+        timestamps._parse_iso.cache_clear()
+        work = [dict(event) for event in events]
+        start = time.perf_counter()
+        results[name] = run(work)
+        seconds = time.perf_counter() - start
+        print(f"{name:<26} {len(events) / seconds:>12,.0f} events/s  ({seconds:.3f}s)")
+
+    reference = results["regex + strptime"]
+    for name, parsed in results.items():
+        assert parsed == reference, f"{name} disagrees with parse_time"
+    print(f"{len(events)} events, all parsers agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Check that only the latest version of every article stays indexed.
+
+Runs the indexing steps of `dataflow.py` over `data/news_out.jsonl`
+against local embedding and Elasticsearch stand-ins: change detection,
+splitting, chunk diffing, `batch_embed` and `bulk_write`. Afterwards
+the stand-in index must hold exactly the chunks of each article's last
+version. With `--direct-deletes` stale chunks are deleted as soon as
+they are diffed, bypassing the buffers, as the dataflow used to do,
+which lets older writes still buffered land after their delete.
+
+Run from the `pydata` directory:
+
+    python -m benchmarks.update_consistency
+"""
+from datetime import timedelta
+import argparse
+
+from bytewax import operators as op
+from bytewax.dataflow import Dataflow
+from bytewax.testing import TestingSink, TestingSource, run_main
+from haystack_integrations.document_stores.elasticsearch import ElasticsearchDocumentStore
+
+from benchmarks.embedding_batches import make_embedder
+from benchmarks.standins import ElasticsearchServer, EmbeddingServer
+from bulk_writer import bulk_write
+from chunk_diff import chunk_diffs
+from dataflow import stale_and_changed_chunks
+from deserialize import deserialize_batch
+from embedding_batcher import batch_embed
+from news_chunking import split_change
+from news_updates import article_changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="data/news_out.jsonl")
+    parser.add_argument("--direct-deletes", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as file:
+        lines = [line for line in file if line.strip()]
+
+    with EmbeddingServer(latency=0.02, dimensions=8) as embeddings, ElasticsearchServer() as elasticsearch:
+        store = ElasticsearchDocumentStore(hosts=elasticsearch.url)
+        diffs, flushes = [], []
+
+        def direct_deletes(key_diff):
+            _, diff = key_diff
+            if diff.stale_ids:
+                store.delete_documents(diff.stale_ids)
+            return [diff.documents] if diff.documents else []
+
+        flow = Dataflow("update-consistency")
+        events = op.flat_map_batch("deserialize", op.input("input", flow, TestingSource(lines)), deserialize_batch)
+        changes = article_changes("article_changes", op.key_on("key_on_id", events, lambda event: str(event["id"])))
+        article_diffs = chunk_diffs("chunk_diff", op.map_value("split", changes, split_change))
+        op.output("diffs", article_diffs, TestingSink(diffs))
+        items = op.flat_map("chunks", article_diffs, direct_deletes if args.direct_deletes else stale_and_changed_chunks)
+        embedded = batch_embed("embed", items, make_embedder(embeddings.url, 256),
+                               max_size=256, timeout=timedelta(milliseconds=500))
+        written = bulk_write("write", embedded, store, max_documents=500, timeout=timedelta(seconds=1))
+        op.output("output", written, TestingSink(flushes))
+        run_main(flow)
+
+        # Replay the diffs to get the chunks each article should end with
+        expected = {}
+        for article_id, diff in diffs:
+            ids = expected.get(article_id, set()) - set(diff.stale_ids)
+            expected[article_id] = ids | {document.id for document in diff.documents}
+        expected_ids = set().union(*expected.values())
+        indexed_ids = set(elasticsearch.indices.get("default", {}))
+
+    stale = indexed_ids - expected_ids
+    stale_articles = {source.get("id") for doc_id, source in
+                      elasticsearch.indices.get("default", {}).items() if doc_id in stale}
+    print(f"{len(lines)} events, {len(expected)} articles, {len(flushes)} bulk requests, "
+          f"{sum(len(flush.deleted) for flush in flushes)} chunks deleted through bulk_write")
+    print(f"{len(indexed_ids)} chunks indexed, {len(expected_ids)} expected, "
+          f"{len(stale)} stale chunks in {len(stale_articles)} articles, {len(expected_ids - indexed_ids)} missing")
+    assert indexed_ids == expected_ids, "the index does not match the latest version of every article"
+
+
+if __name__ == "__main__":
+    main()
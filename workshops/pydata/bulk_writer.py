@@ -0,0 +1,238 @@
+"""Bytewax operator that writes documents from many events in one `_bulk` request."""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import json
+import logging
+import time
+
+from bytewax import operators as op
+from bytewax.dataflow import Stream, operator
+from bytewax.operators import UnaryLogic
+from haystack import Document
+from haystack.document_stores.types import DuplicatePolicy
+
+logger = logging.getLogger(__name__)
+
+# Id with the action and source lines of every pending document, oldest first.
+_BulkState = List[Tuple[str, bytes]]
+
+_DELETE_PREFIX = b'{"delete"'
+
+
+@dataclass
+class BulkDelete:
+    """Ids to delete, sent in order with the documents around them."""
+
+    ids: List[str]
+
+
+@dataclass
+class BulkFlush:
+    """Outcome of one `_bulk` request."""
+
+    documents: int
+    """Number of documents sent, written or deleted."""
+
+    bytes: int
+    """Size of the request body."""
+
+    seconds: float
+    """Time from sending the request to receiving the response."""
+
+    reason: str
+    """What triggered the flush: `"size"`, `"bytes"`, `"timeout"` or `"eof"`."""
+
+    rejected: Dict[str, str] = field(default_factory=dict)
+    """Error type by id of every document Elasticsearch did not write."""
+
+    ids: List[str] = field(default_factory=list, repr=False)
+    """Ids of the documents written, e.g. to invalidate cached query results."""
+
+    deleted: List[str] = field(default_factory=list, repr=False)
+    """Ids of the documents deleted."""
+
+
+def bulk_entry(document: Document, action: str) -> bytes:
+    """The two NDJSON lines that write `document` in a `_bulk` request."""
+    source = document.to_dict()
+    # Like ElasticsearchDocumentStore, which does not store sparse embeddings
+    source.pop("sparse_embedding", None)
+    lines = json.dumps({action: {"_id": document.id}}) + "\n" + json.dumps(source, separators=(",", ":")) + "\n"
+    return lines.encode("utf-8")
+
+
+def bulk_delete_entry(doc_id: str) -> bytes:
+    """The NDJSON line that deletes `doc_id` in a `_bulk` request."""
+    return (json.dumps({"delete": {"_id": doc_id}}) + "\n").encode("utf-8")
+
+
+class _BulkWriteLogic(UnaryLogic[Union[List[Document], BulkDelete], BulkFlush, _BulkState]):
+    def __init__(
+        self,
+        document_store: Any,
+        max_documents: int,
+        max_bytes: int,
+        timeout: timedelta,
+        refresh: Union[bool, str],
+        policy: DuplicatePolicy,
+        resume_state: Optional[_BulkState],
+    ):
+        self._document_store = document_store
+        self._max_documents = max_documents
+        self._max_bytes = max_bytes
+        self._timeout = timeout
+        self._refresh = refresh
+        self._action = "index" if policy == DuplicatePolicy.OVERWRITE else "create"
+        self._skip_conflicts = policy == DuplicatePolicy.SKIP
+        self._pending: _BulkState = resume_state or []
+        self._bytes = sum(len(entry) for _, entry in self._pending)
+        # A resumed buffer has already waited, so flush it right away.
+        self._deadline: Optional[datetime] = (
+            datetime.now(timezone.utc) if self._pending else None
+        )
+
+    def on_item(self, value: Union[List[Document], BulkDelete]) -> Tuple[Iterable[BulkFlush], bool]:
+        if isinstance(value, BulkDelete):
+            entries = [(doc_id, bulk_delete_entry(doc_id)) for doc_id in value.ids]
+        else:
+            entries = [(document.id, bulk_entry(document, self._action)) for document in value]
+        flushes = []
+        for doc_id, entry in entries:
+            # Flush first so no request grows past the byte budget
+            if self._pending and self._bytes + len(entry) > self._max_bytes:
+                flushes.append(self._flush("bytes"))
+            if not self._pending:
+                self._deadline = datetime.now(timezone.utc) + self._timeout
+            self._pending.append((doc_id, entry))
+            self._bytes += len(entry)
+            if len(self._pending) >= self._max_documents:
+                flushes.append(self._flush("size"))
+        return flushes, UnaryLogic.RETAIN
+
+    def on_notify(self) -> Tuple[Iterable[BulkFlush], bool]:
+        return self._flush_pending("timeout"), UnaryLogic.RETAIN
+
+    def on_eof(self) -> Tuple[Iterable[BulkFlush], bool]:
+        return self._flush_pending("eof"), UnaryLogic.RETAIN
+
+    def notify_at(self) -> Optional[datetime]:
+        return self._deadline
+
+    def snapshot(self) -> _BulkState:
+        return list(self._pending)
+
+    def _flush_pending(self, reason: str) -> List[BulkFlush]:
+        return [self._flush(reason)] if self._pending else []
+
+    def _flush(self, reason: str) -> BulkFlush:
+        pending, self._pending = self._pending, []
+        size, self._bytes = self._bytes, 0
+        self._deadline = None
+
+        # The store does not expose its index name
+        client, index = self._document_store.client, self._document_store._index
+        start = time.perf_counter()
+        response = client.bulk(operations=b"".join(entry for _, entry in pending), index=index,
+                               refresh=self._refresh)
+        seconds = time.perf_counter() - start
+
+        rejected = {}
+        if response["errors"]:
+            for item in response["items"]:
+                result = next(iter(item.values()))
+                error = result.get("error")
+                if error is None:
+                    continue
+                if self._skip_conflicts and error["type"] == "version_conflict_engine_exception":
+                    continue
+                rejected[result["_id"]] = error["type"]
+        written, deleted = [], []
+        for doc_id, entry in pending:
+            if doc_id not in rejected:
+                (deleted if entry.startswith(_DELETE_PREFIX) else written).append(doc_id)
+        flush = BulkFlush(len(pending), size, seconds, reason, rejected, written, deleted)
+
+        logger.info("Wrote %d documents (%d bytes, %s) in %.3fs", flush.documents, size, reason, seconds)
+        if rejected:
+            logger.warning("Elasticsearch rejected %d of %d documents: %s",
+                           len(rejected), flush.documents, sorted(set(rejected.values())))
+        return flush
+
+
+def _single_batch(_item: Any) -> str:
+    return "ALL"
+
+
+@operator
+def bulk_write(
+    step_id: str,
+    up: Stream[Union[List[Document], BulkDelete]],
+    document_store: Any,
+    max_documents: int = 500,
+    max_bytes: int = 5_000_000,
+    timeout: timedelta = timedelta(seconds=1),
+    refresh: Union[bool, str] = False,
+    policy: DuplicatePolicy = DuplicatePolicy.OVERWRITE,
+    batch_key: Callable[[Any], str] = _single_batch,
+) -> Stream[BulkFlush]:
+    """Write the documents of many events to Elasticsearch in one request.
+
+    Each upstream item is the list of documents produced by one event,
+    or a `BulkDelete` of ids to remove. Both go into the same buffer in
+    the order they arrive, so a document written before a delete of its
+    id never lands after it. Documents are serialized as they arrive and buffered until there
+    are `max_documents` of them, the next one would take the request
+    past `max_bytes`, or the oldest has waited `timeout`. The buffer is
+    then sent as a single `_bulk` request and a `BulkFlush` describing
+    it is emitted.
+
+    Documents Elasticsearch rejects are listed in `BulkFlush.rejected`
+    and logged instead of failing the dataflow. Errors of the request
+    itself, such as a refused connection, are raised.
+
+    :arg step_id: Unique ID.
+
+    :arg up: Stream of per-event document lists and `BulkDelete`s.
+
+    :arg document_store: An `ElasticsearchDocumentStore`, or a
+        zero-argument factory for one, such as a `per_worker`
+        function, which is called when the step is built on a worker.
+
+    :arg max_documents: Number of documents that triggers a flush.
+        Defaults to 500.
+
+    :arg max_bytes: Largest request body, in bytes, unless a single
+        document is larger. Defaults to 5 MB.
+
+    :arg timeout: Longest time a document may wait for its request to
+        fill. Defaults to 1 second.
+
+    :arg refresh: Elasticsearch `refresh` parameter of every request.
+        `False` returns as soon as the documents are written and lets
+        the index refresh interval make them searchable; `"wait_for"`
+        returns once they are searchable, as `DocumentWriter` does.
+        Defaults to `False`.
+
+    :arg policy: `DuplicatePolicy.OVERWRITE` indexes documents over
+        existing ones with the same id; any other policy creates them,
+        and `SKIP` does not count existing ids as rejected. Defaults
+        to overwrite.
+
+    :arg batch_key: Called with each upstream item and returns the
+        buffer it joins. Deletes must share a buffer with the writes of
+        the same ids. Defaults to a single buffer for the whole
+        dataflow.
+
+    :returns: Stream of `BulkFlush`es, one per request.
+
+    """
+    keyed = op.key_on("key", up, batch_key)
+
+    def builder(resume_state: Optional[_BulkState]) -> _BulkWriteLogic:
+        # Document stores have `client`, checked on the class so it does not connect
+        store = document_store if hasattr(type(document_store), "client") else document_store()
+        return _BulkWriteLogic(store, max_documents, max_bytes, timeout, refresh, policy, resume_state)
+
+    flushes = op.unary("bulk_write", keyed, builder)
+    return op.map("unkey", flushes, lambda key_flush: key_flush[1])
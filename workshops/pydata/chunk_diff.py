@@ -0,0 +1,139 @@
+"""Chunk-level diffing so an updated article only re-embeds changed passages."""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import hashlib
+
+from bytewax import operators as op
+from bytewax.dataflow import operator
+from bytewax.operators import KeyedStream, UnaryLogic
+from haystack import Document
+
+from news_updates import DELETE
+
+
+@dataclass
+class ChunkDiff:
+    """What has to change in the document store for one article update."""
+
+    documents: List[Document] = field(default_factory=list)
+    """New or changed chunks, with stable ids, still to be embedded and written."""
+
+    stale_ids: List[str] = field(default_factory=list)
+    """Ids of previously indexed chunks that are no longer part of the article."""
+
+    unchanged: int = 0
+    """Number of chunks that are already indexed with the same text."""
+
+
+def chunk_id(article_id: str, content: str, occurrence: int = 0) -> str:
+    """
+    Derive a chunk id from its article and whitespace-normalized text, so an
+    unchanged passage keeps its id across updates wherever it moves.
+
+    :param article_id: Id of the article the chunk belongs to.
+    :param content: Text of the chunk.
+    :param occurrence: How many identical passages precede this one in the article.
+    """
+    normalized = " ".join(content.split())
+    return hashlib.sha256(f"{article_id}\0{occurrence}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+def assign_chunk_ids(article_id: str, documents: List[Document]) -> List[Document]:
+    """Set every chunk's id from `chunk_id`."""
+    seen: Dict[str, int] = {}
+    for document in documents:
+        normalized = " ".join((document.content or "").split())
+        occurrence = seen.get(normalized, 0)
+        seen[normalized] = occurrence + 1
+        document.id = chunk_id(article_id, normalized, occurrence)
+    return documents
+
+
+def diff_chunks(
+    indexed_ids: Optional[List[str]], change: Tuple[str, List[Document]]
+) -> Tuple[Optional[List[str]], ChunkDiff]:
+    """
+    `stateful_map` mapper comparing an article's new chunks with the ids indexed
+    for it so far.
+
+    :param indexed_ids: Chunk ids currently in the store for this article, or
+        `None` for an article not seen before.
+    :param change: `(action, chunks)` where chunks carry ids from `assign_chunk_ids`.
+        A `"delete"` action removes every indexed chunk.
+    :return: The chunk ids indexed after this change (`None` once the article is
+        deleted) and the resulting `ChunkDiff`.
+    """
+    action, documents = change
+    previous = set(indexed_ids or [])
+    if action == DELETE:
+        return None, ChunkDiff(stale_ids=list(indexed_ids or []))
+
+    current = [document.id for document in documents]
+    current_ids = set(current)
+    to_embed = [document for document in documents if document.id not in previous]
+    stale = [doc_id for doc_id in indexed_ids or [] if doc_id not in current_ids]
+    diff = ChunkDiff(documents=to_embed, stale_ids=stale, unchanged=len(documents) - len(to_embed))
+    return current, diff
+
+
+_ChunkChange = Tuple[str, List[Document]]
+
+
+class _ChunkDiffLogic(UnaryLogic[_ChunkChange, ChunkDiff, Dict[str, Any]]):
+    def __init__(self, ttl: timedelta, resume_state: Optional[Dict[str, Any]]):
+        self._ttl = ttl
+        state = resume_state or {}
+        self._indexed_ids = state.get("indexed_ids")
+        self._expires_at = state.get("expires_at", datetime.now(timezone.utc) + ttl)
+
+    def on_item(self, value: _ChunkChange) -> Tuple[Iterable[ChunkDiff], bool]:
+        self._expires_at = datetime.now(timezone.utc) + self._ttl
+        self._indexed_ids, diff = diff_chunks(self._indexed_ids, value)
+        if self._indexed_ids is None:
+            return [diff], UnaryLogic.DISCARD
+        return [diff], UnaryLogic.RETAIN
+
+    def on_notify(self) -> Tuple[Iterable[ChunkDiff], bool]:
+        # Not updated for `ttl`; forget the article's chunks to bound memory.
+        return [], UnaryLogic.DISCARD
+
+    def on_eof(self) -> Tuple[Iterable[ChunkDiff], bool]:
+        return [], UnaryLogic.RETAIN
+
+    def notify_at(self) -> Optional[datetime]:
+        return self._expires_at
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"indexed_ids": self._indexed_ids, "expires_at": self._expires_at}
+
+
+@operator
+def chunk_diffs(
+    step_id: str,
+    up: KeyedStream[_ChunkChange],
+    ttl: timedelta = timedelta(days=1),
+) -> KeyedStream[ChunkDiff]:
+    """Diff every article change against the chunks indexed for it so far.
+
+    Runs `diff_chunks` with the chunk ids of each article key as state.
+    The state is dropped when the article is deleted, or when it has
+    not changed for `ttl`, like the state of `article_changes`.
+
+    :arg step_id: Unique ID.
+
+    :arg up: `(action, chunks)` changes keyed by article `id`, with
+        chunk ids from `assign_chunk_ids`.
+
+    :arg ttl: How long to remember an article's chunks after its last
+        change. Use the `ttl` of the upstream `article_changes`, so
+        both forget an article at the same time. Defaults to one day.
+
+    :returns: Keyed stream of `ChunkDiff`.
+
+    """
+
+    def builder(resume_state: Optional[Dict[str, Any]]) -> _ChunkDiffLogic:
+        return _ChunkDiffLogic(ttl, resume_state)
+
+    return op.unary("chunk_diff_logic", up, builder)
@@ -4,162 +4,102 @@ from bytewax import operators as op
 from bytewax.connectors.stdio import StdOutSink
 from bytewax.connectors.files import FileSource
 
-from haystack.components.preprocessors import DocumentCleaner
-from haystack.components.embedders import OpenAIDocumentEmbedder
-from haystack import Pipeline
-from haystack.components.embedders import OpenAIDocumentEmbedder
-from haystack.components.preprocessors import DocumentCleaner
-from haystack.components.preprocessors import DocumentSplitter
-from haystack.components.writers import DocumentWriter
-from haystack.document_stores.types import DuplicatePolicy
-from haystack.document_stores.in_memory import InMemoryDocumentStore
-from haystack_integrations.document_stores.elasticsearch import ElasticsearchDocumentStore
 from haystack.utils import Secret
 
-
-from haystack import component, Document
-from typing import Any, Dict, List, Optional, Union
-from haystack.dataclasses import ByteStream
-
-import json
+from bulk_writer import BulkDelete, bulk_write
+from embedding_batcher import batch_embed
+from embedding_cache import CachedDocumentEmbedder, EmbeddingCache
+from news_updates import article_changes
+from news_chunking import split_change
+from chunk_diff import chunk_diffs
+from deserialize import deserialize_batch
+from offload import offload
+from pipeline_factory import per_worker
+from query_cache import QueryCache
+
+from datetime import timedelta
 from dotenv import load_dotenv
 import os
 
-import re
-from bs4 import BeautifulSoup
-from pathlib import Path
-
 import logging
 
 
 load_dotenv(".env")
 open_ai_key = os.environ.get("OPENAI_API_KEY")
+embedding_batch_size = int(os.environ.get("EMBEDDING_BATCH_SIZE", 256))
+embedding_batch_timeout = timedelta(milliseconds=int(os.environ.get("EMBEDDING_BATCH_TIMEOUT_MS", 500)))
+embedding_cache_dir = os.environ.get("EMBEDDING_CACHE_DIR", "embedding_cache")
+split_workers = int(os.environ.get("SPLIT_WORKERS", 0)) or None
+bulk_max_documents = int(os.environ.get("BULK_MAX_DOCUMENTS", 500))
+bulk_max_bytes = int(os.environ.get("BULK_MAX_BYTES", 5_000_000))
+bulk_timeout = timedelta(milliseconds=int(os.environ.get("BULK_TIMEOUT_MS", 1000)))
+# "false", "true" or "wait_for"; see `bulk_write`
+bulk_refresh = os.environ.get("BULK_REFRESH", "false")
+# How long an article's fingerprint and chunk ids are kept after its last update
+article_ttl = timedelta(hours=int(os.environ.get("ARTICLE_TTL_HOURS", 24)))
+# Shared with the query notebook, which caches results for these documents
+query_cache_path = os.environ.get("QUERY_CACHE_PATH", "query_cache.sqlite")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def safe_deserialize(data):
-        """
-        Safely deserialize JSON data, handling various formats.
-        
-        :param data: JSON data to deserialize.
-        :return: Deserialized data or None if an error occurs.
-        """
-        try:
-            parsed_data = json.loads(data)
-            if isinstance(parsed_data, list):
-                if len(parsed_data) == 2 and (parsed_data[0] is None or isinstance(parsed_data[0], str)):
-                    event = parsed_data[1]
-                else:
-                    logger.info(f"Skipping unexpected list format: {data}")
-                    return None
-            elif isinstance(parsed_data, dict):
-                event = parsed_data
-            else:
-                logger.info(f"Skipping unexpected data type: {data}")
-                return None
-            
-            if 'link' in event:
-                event['url'] = event.pop('link')
-            
-            if "url" in event:
-                return event
-            else:
-                logger.info(f"Missing 'url' key in data: {data}")
-                return None
-
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error ({e}) for data: {data}")
-            return None
-        except Exception as e:
-            logger.error(f"Error processing data ({e}): {data}")
-            return None
-        
-@component
-class BenzingaNews:
-    
-    @component.output_types(documents=List[Document])
-    def run(self, sources: Dict[str, Any]) -> None:
-             
-        documents = []
-        for source in sources:
-        
-            for key in source:
-                if type(source[key]) == str:
-                    source[key] = self.clean_text(source[key])
-                    
-            if source['content'] == "":
-                continue
-
-            #drop content from source dictionary
-            content = source['content']
-            document = Document(content=content, meta=source) 
-            
-            documents.append(document)
-         
-        return {"documents": documents}
-               
-    def clean_text(self, text):
-        # Remove HTML tags using BeautifulSoup
-        soup = BeautifulSoup(text, "html.parser")
-        text = soup.get_text()
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-    
-@component
-class BenzingaEmbeder:
-    
-    def __init__(self):
-        get_news = BenzingaNews()
-        document_store = ElasticsearchDocumentStore(embedding_similarity_function="cosine", hosts = "http://localhost:9200")
-        document_cleaner = DocumentCleaner(
-                            remove_empty_lines=True,
-                            remove_extra_whitespaces=True,
-                            remove_repeated_substrings=False
-                        )
-        document_splitter = DocumentSplitter(split_by="passage", split_length=5)
-        document_writer = DocumentWriter(document_store=document_store,
-                                        policy = DuplicatePolicy.OVERWRITE)
-        embedding = OpenAIDocumentEmbedder(api_key=Secret.from_token(open_ai_key))
-
-        self.pipeline = Pipeline()
-        self.pipeline.add_component("get_news", get_news)
-        self.pipeline.add_component("document_cleaner", document_cleaner)
-        self.pipeline.add_component("document_splitter", document_splitter)
-        #self.pipeline.add_component("embedding", embedding)
-        self.pipeline.add_component("document_writer", document_writer)
-
-        self.pipeline.connect("get_news", "document_cleaner")
-        self.pipeline.connect("document_cleaner", "document_splitter")
-        self.pipeline.connect("document_splitter", "document_writer")
-        #self.pipeline.connect("embedding", "document_writer")
-        
-        
-    @component.output_types(documents=List[Document])
-    def run(self, event: List[Union[str, Path, ByteStream]]):
-        
-        documents = self.pipeline.run({"get_news": {"sources": [event]}})
-        
-        self.pipeline.draw("benzinga_pipeline.png")
-        return documents
-    
-    
-embed_benzinga = BenzingaEmbeder()
-
-def process_event(event):
-    """Wrapper to handle the processing of each event."""
-    if event:
-        document = embed_benzinga.run(event)
-        return document
-    return None
+@per_worker
+def document_store():
+    # Imported here so importing the dataflow does not load the Elasticsearch client
+    from haystack_integrations.document_stores.elasticsearch import ElasticsearchDocumentStore
+    return ElasticsearchDocumentStore(embedding_similarity_function="cosine", hosts = "http://localhost:9200")
+
+
+@per_worker
+def cached_embedder():
+    # Imported here so importing the dataflow does not load the OpenAI SDK
+    from haystack.components.embedders import OpenAIDocumentEmbedder
+    embedder = OpenAIDocumentEmbedder(api_key=Secret.from_token(open_ai_key),
+                                      batch_size=embedding_batch_size,
+                                      progress_bar=False)
+    # Unchanged passages of resent articles are served from the cache
+    return CachedDocumentEmbedder(embedder, EmbeddingCache(path=embedding_cache_dir))
+
+
+@per_worker
+def query_cache():
+    return QueryCache(path=query_cache_path)
+
+
+def stale_and_changed_chunks(key_diff):
+    """A delete of the chunks the update dropped, then the chunks still to embed."""
+    article_id, diff = key_diff
+    items = []
+    # Deleted by `bulk_write`, after any older write of these chunks still buffered
+    if diff.stale_ids:
+        items.append(BulkDelete(diff.stale_ids))
+    if diff.documents:
+        items.append(diff.documents)
+    return items
 
 
 flow = Dataflow("rag-pipeline")
 input_data = op.input("input", flow, FileSource("data/news_out.jsonl"))
-deserialize_data = op.map("deserialize", input_data, safe_deserialize)
-get_content = op.map("embed_content", deserialize_data, process_event)
-op.output("output", get_content, StdOutSink())
+deserialize_data = op.flat_map_batch("deserialize", input_data, deserialize_batch)
+# Only articles whose text changed since their last event are re-indexed
+keyed_data = op.key_on("key_on_id", deserialize_data, lambda event: str(event["id"]))
+changes = article_changes("article_changes", keyed_data, ttl=article_ttl)
+# Cleaning and splitting are CPU-bound, so they run in a process pool
+split_changes = offload("split_content", changes, split_change, max_workers=split_workers)
+# Unchanged passages keep their ids and are neither re-embedded nor re-written
+diffs = chunk_diffs("chunk_diff", split_changes, ttl=article_ttl)
+changed_chunks = op.flat_map("stale_and_changed_chunks", diffs, stale_and_changed_chunks)
+# The embedder is built when the step is built, on the worker that runs it; deletes pass through in order
+embed_content = batch_embed("embed_content", changed_chunks, cached_embedder,
+                            max_size=embedding_batch_size, timeout=embedding_batch_timeout)
+# Writes and deletes of many events go to Elasticsearch in one `_bulk` request
+write_content = bulk_write("write_content", embed_content, document_store,
+                           max_documents=bulk_max_documents, max_bytes=bulk_max_bytes,
+                           timeout=bulk_timeout, refresh=bulk_refresh)
+# Cached query results holding a rewritten or deleted document are served again only after a new search
+op.inspect("invalidate_queries", write_content,
+           lambda _step_id, flush: query_cache().invalidate(flush.ids + flush.deleted))
+op.output("output", write_content, StdOutSink())
 
 
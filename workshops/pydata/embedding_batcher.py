@@ -0,0 +1,139 @@
+"""Bytewax operator that embeds documents from many events in one call."""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Union
+import logging
+
+from bytewax import operators as op
+from bytewax.dataflow import Stream, operator
+from bytewax.operators import UnaryLogic
+from haystack import Document
+
+logger = logging.getLogger(__name__)
+
+# Pending events waiting for the next flush, oldest first, with the
+# items that are not documents, such as deletes, at their place.
+_BatchState = List[Union[List[Document], Any]]
+
+
+class _EmbedBatchLogic(UnaryLogic[Union[List[Document], Any], Union[List[Document], Any], _BatchState]):
+    def __init__(
+        self,
+        embedder: Any,
+        max_size: int,
+        timeout: timedelta,
+        resume_state: Optional[_BatchState],
+    ):
+        self._embedder = embedder
+        self._max_size = max_size
+        self._timeout = timeout
+        self._pending: _BatchState = resume_state or []
+        self._size = sum(len(item) for item in self._pending if isinstance(item, list))
+        # A resumed batch has already waited, so flush it right away.
+        self._deadline: Optional[datetime] = (
+            datetime.now(timezone.utc) if self._pending else None
+        )
+
+    def on_item(self, value: Union[List[Document], Any]) -> Tuple[Iterable[Union[List[Document], Any]], bool]:
+        if not self._pending:
+            self._deadline = datetime.now(timezone.utc) + self._timeout
+        self._pending.append(value)
+        if isinstance(value, list):
+            self._size += len(value)
+
+        if self._size >= self._max_size:
+            return self._flush(), UnaryLogic.RETAIN
+        return [], UnaryLogic.RETAIN
+
+    def on_notify(self) -> Tuple[Iterable[List[Document]], bool]:
+        return self._flush(), UnaryLogic.RETAIN
+
+    def on_eof(self) -> Tuple[Iterable[List[Document]], bool]:
+        return self._flush(), UnaryLogic.RETAIN
+
+    def notify_at(self) -> Optional[datetime]:
+        return self._deadline
+
+    def snapshot(self) -> _BatchState:
+        return [list(item) if isinstance(item, list) else item for item in self._pending]
+
+    def _flush(self) -> List[List[Document]]:
+        pending, self._pending = self._pending, []
+        self._size = 0
+        self._deadline = None
+
+        events = [item for item in pending if isinstance(item, list)]
+        documents = [document for event in events for document in event]
+        if documents:
+            documents = self._embedder.run(documents=documents)["documents"]
+            logger.info("Embedded %d documents from %d events", len(documents), len(events))
+
+        # The embedder returns documents in input order, so slicing by
+        # the original event sizes routes each vector back to its source.
+        batches = []
+        start = 0
+        for item in pending:
+            if not isinstance(item, list):
+                batches.append(item)
+                continue
+            batches.append(documents[start : start + len(item)])
+            start += len(item)
+        return batches
+
+
+def _single_batch(_item: Any) -> str:
+    return "ALL"
+
+
+@operator
+def batch_embed(
+    step_id: str,
+    up: Stream[Union[List[Document], Any]],
+    embedder: Any,
+    max_size: int = 256,
+    timeout: timedelta = timedelta(milliseconds=500),
+    batch_key: Callable[[Any], str] = _single_batch,
+) -> Stream[Union[List[Document], Any]]:
+    """Embed the documents of many events with a single embedder call.
+
+    Each upstream item is the list of documents produced by one event.
+    Other items, such as a `BulkDelete` for `bulk_write`, are buffered
+    with the lists and emitted at their place, so downstream order is
+    kept. Lists are buffered until they hold `max_size` documents or the
+    oldest one has waited `timeout`, then the whole buffer is sent to
+    `embedder.run(documents=...)` and every event's documents are
+    emitted again, now carrying their embeddings, as one list per
+    event.
+
+    :arg step_id: Unique ID.
+
+    :arg up: Stream of per-event document lists.
+
+    :arg embedder: A Haystack document embedder such as
+        `OpenAIDocumentEmbedder`. Construct it with a `batch_size`
+        of at least `max_size` so a flush is one API request. May
+        also be a zero-argument factory, such as a `per_worker`
+        function, which is called when the step is built on a worker.
+
+    :arg max_size: Number of documents that triggers a flush.
+        Defaults to 256.
+
+    :arg timeout: Longest time a document may wait for its batch to
+        fill. Defaults to 500 milliseconds.
+
+    :arg batch_key: Called with each event's documents and returns the
+        batch it joins. Batches with different keys are filled
+        independently and may live on different workers. Defaults to
+        a single batch for the whole dataflow.
+
+    :returns: Stream of embedded per-event document lists.
+
+    """
+    keyed = op.key_on("key", up, batch_key)
+
+    def builder(resume_state: Optional[_BatchState]) -> _EmbedBatchLogic:
+        # Components have `run`; anything else is a factory for one
+        instance = embedder if hasattr(embedder, "run") else embedder()
+        return _EmbedBatchLogic(instance, max_size, timeout, resume_state)
+
+    embedded = op.unary("embed_batch", keyed, builder)
+    return op.map("unkey", embedded, lambda key_documents: key_documents[1])
@@ -0,0 +1,182 @@
+"""Content-hash cache in front of a Haystack document embedder."""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+from haystack import Document, component
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed on a hash of the text and the model.
+
+    The memory tier is an LRU of at most `capacity` vectors. The disk
+    tier, if `path` is given, is an append-only float32 file read
+    through a memory map plus a file of keys, so entries survive
+    restarts without loading every vector into memory.
+
+    A disk tier must only be written by one process at a time; give
+    every Bytewax worker its own directory.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, capacity: int = 10000):
+        """
+        :param path: Directory for the on-disk tier. `None` keeps the cache in memory only.
+        :param capacity: Maximum number of vectors in the memory tier.
+        """
+        self.capacity = capacity
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._rows: Dict[str, int] = {}
+        self._dimensions: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._path = Path(path) if path is not None else None
+        if self._path is not None:
+            self._open()
+
+    @staticmethod
+    def key(text: str, model: str) -> str:
+        """Hash whitespace-normalized text together with the model name."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+
+        row = self._rows.get(key)
+        if row is not None:
+            vector = self._read_row(row)
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, vector: List[float]) -> None:
+        self._remember(key, vector)
+        if self._path is not None and key not in self._rows:
+            self._append(key, vector)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._rows),
+        }
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _open(self) -> None:
+        self._path.mkdir(parents=True, exist_ok=True)
+        self._keys_path = self._path / "keys.txt"
+        self._vectors_path = self._path / "vectors.f32"
+        meta_path = self._path / "meta.json"
+        if meta_path.exists():
+            self._dimensions = json.loads(meta_path.read_text())["dimensions"]
+
+        keys = []
+        if self._keys_path.exists():
+            keys = self._keys_path.read_text().split()
+        if self._dimensions and self._vectors_path.exists():
+            # A crash between the two appends leaves a key without a vector.
+            stored = os.path.getsize(self._vectors_path) // (4 * self._dimensions)
+            keys = keys[:stored]
+        self._rows = {key: row for row, key in enumerate(keys)}
+        logger.info("Loaded %d cached embeddings from %s", len(self._rows), self._path)
+
+    def _append(self, key: str, vector: List[float]) -> None:
+        if self._dimensions is None:
+            self._dimensions = len(vector)
+            (self._path / "meta.json").write_text(json.dumps({"dimensions": self._dimensions}))
+        with open(self._vectors_path, "ab") as file:
+            file.write(np.asarray(vector, dtype=np.float32).tobytes())
+        with open(self._keys_path, "a") as file:
+            file.write(key + "\n")
+        self._rows[key] = len(self._rows)
+
+    def _read_row(self, row: int) -> List[float]:
+        if self._vectors is None or row >= self._vectors.shape[0]:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r").reshape(
+                -1, self._dimensions
+            )
+        return self._vectors[row].tolist()
+
+
+@component
+class CachedDocumentEmbedder:
+    """
+    Drop-in wrapper for `OpenAIDocumentEmbedder`/`AzureOpenAIDocumentEmbedder`
+    that only sends documents with uncached content to the wrapped embedder.
+    """
+
+    def __init__(self, embedder: Any, cache: Optional[EmbeddingCache] = None):
+        """
+        :param embedder: The document embedder to call on cache misses.
+        :param cache: Cache to use. Defaults to an in-memory `EmbeddingCache`.
+        """
+        self.embedder = embedder
+        self.cache = cache or EmbeddingCache()
+        # Azure embedders are keyed on their deployment rather than a model name.
+        self.model = getattr(embedder, "model", None) or getattr(embedder, "azure_deployment", "")
+
+    @component.output_types(documents=List[Document], meta=Dict[str, Any])
+    def run(self, documents: List[Document]):
+        """
+        Embed a list of Documents, reusing cached vectors for unchanged text.
+
+        :param documents: Documents to embed.
+        :return: The documents with embeddings and the wrapped embedder's meta
+            extended with the cache statistics.
+        """
+        keys = [self._key(document) for document in documents]
+        missing = []
+        for document, key in zip(documents, keys):
+            vector = self.cache.get(key)
+            if vector is None:
+                missing.append((document, key))
+            else:
+                document.embedding = vector
+
+        meta: Dict[str, Any] = {}
+        if missing:
+            result = self.embedder.run(documents=[document for document, _ in missing])
+            meta = result.get("meta", {})
+            for (document, key), embedded in zip(missing, result["documents"]):
+                document.embedding = embedded.embedding
+                self.cache.put(key, embedded.embedding)
+
+        stats = self.cache.stats()
+        logger.info("Embedding cache hit rate %.1f%% (%d lookups)", 100 * stats["hit_rate"], stats["lookups"])
+        meta["cache"] = stats
+        return {"documents": documents, "meta": meta}
+
+    def _key(self, document: Document) -> str:
+        meta_fields = getattr(self.embedder, "meta_fields_to_embed", None) or []
+        parts = [str(document.meta[field]) for field in meta_fields if document.meta.get(field) is not None]
+        text = "\n".join(parts + [document.content or ""])
+        text = getattr(self.embedder, "prefix", "") + text + getattr(self.embedder, "suffix", "")
+        return EmbeddingCache.key(text, self.model)
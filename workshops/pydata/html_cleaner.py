@@ -0,0 +1,62 @@
+"""Single-pass HTML-to-text cleaning for news fields."""
+import html
+import re
+
+# Comments, script/style blocks, tags and declarations are dropped, entities
+# decoded. Tags must start with a letter, like in `html.parser`, so a bare
+# `<` in text is kept.
+_MARKUP = re.compile(
+    r"<!--.*?(?:-->|$)"
+    r"|<(script|style)\b[^>]*>.*?(?:</\1\s*>|$)"
+    r"|</?[A-Za-z][^>]*>"
+    r"|<[!?][^>]*>"
+    r"|&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[A-Za-z][A-Za-z0-9]*);?",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+# Tags that end a paragraph when paragraphs are kept
+_BREAK = re.compile(r"</?(?:p|br|div|li|ul|ol|h[1-6]|tr|table|blockquote)\b", re.IGNORECASE)
+
+# Blank lines, or the marker a breaking tag is replaced with
+_PARAGRAPH = re.compile(r"\n[^\S\n]*\n\s*|\x00")
+
+
+def _replace_markup(match: "re.Match[str]") -> str:
+    token = match.group()
+    if token[0] == "&":
+        return html.unescape(token)
+    return ""
+
+
+def _replace_markup_keeping_breaks(match: "re.Match[str]") -> str:
+    token = match.group()
+    if token[0] == "&":
+        return html.unescape(token)
+    return "\x00" if _BREAK.match(token) else ""
+
+
+def clean_html(text: str, paragraphs: bool = False) -> str:
+    """
+    Strip tags and decode entities from an HTML fragment, then collapse
+    all whitespace runs to single spaces.
+
+    Gives the same text as `BeautifulSoup(text, "html.parser").get_text()`
+    followed by whitespace collapsing, without building a tree.
+
+    :param text: HTML fragment.
+    :param paragraphs: Keep paragraph breaks as `"\\n\\n"`, so that
+        `DocumentSplitter(split_by="passage")` can split the text. Block
+        tags such as `<p>` and `<br>` and blank lines end a paragraph;
+        other whitespace is still collapsed.
+    :return: Plain text.
+    """
+    if not paragraphs:
+        if "<" in text or "&" in text:
+            text = _MARKUP.sub(_replace_markup, text)
+        return " ".join(text.split())
+
+    if "<" in text or "&" in text:
+        text = _MARKUP.sub(_replace_markup_keeping_breaks, text)
+    parts = (" ".join(part.split()) for part in _PARAGRAPH.split(text))
+    return "\n\n".join(part for part in parts if part)
@@ -0,0 +1,145 @@
+"""Flag file, network and subprocess activity in code that should not do any."""
+from collections import Counter
+from importlib.machinery import all_suffixes
+from typing import Any, Iterable, List, Optional, Tuple
+import os
+import sys
+import threading
+
+# Audit events that mean a component touched the outside world
+IO_EVENTS = frozenset({
+    "open",
+    "socket.connect",
+    "socket.getaddrinfo",
+    "socket.sendto",
+    "subprocess.Popen",
+    "os.system",
+    "os.exec",
+    "os.posix_spawn",
+    "os.spawn",
+    "urllib.Request",
+    "sqlite3.connect",
+})
+
+# Imports inside guarded code open module files; that is not I/O of interest
+_MODULE_SUFFIXES = tuple(all_suffixes()) + (".pyc", ".pth")
+_GUARD_FILE = os.path.abspath(__file__)
+
+_active: List["IOGuard"] = []
+_lock = threading.Lock()
+_installed = False
+
+
+class IOGuardError(RuntimeError):
+    """Raised by a strict `IOGuard` in place of the I/O it caught."""
+
+
+class IOGuard:
+    """Record, or refuse, I/O performed inside a `with` block.
+
+    Uses `sys.addaudithook`, so it sees I/O from any library and any
+    thread of this process, but not from child processes. Each event
+    is attributed to the innermost Haystack component whose `run` is
+    on the stack, or else to the innermost calling function outside
+    the standard library and site-packages.
+
+        with IOGuard() as guard:
+            pipeline.run(...)
+        print(guard.report(items=1))
+
+    Audit hooks cannot be removed, so one hook is installed on first
+    use and does nothing while no guard is active.
+    """
+
+    def __init__(self, strict: bool = False, allow: Iterable[str] = ()):
+        """
+        :param strict: Raise `IOGuardError` from the offending call
+            instead of letting it proceed.
+        :param allow: Audit event names not to flag, e.g. `"socket.connect"`
+            when a benchmark talks to a local stand-in server.
+        """
+        self.strict = strict
+        self.allow = frozenset(allow)
+        self.events: Counter = Counter()
+
+    def __enter__(self) -> "IOGuard":
+        _install()
+        with _lock:
+            _active.append(self)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        with _lock:
+            _active.remove(self)
+
+    @property
+    def count(self) -> int:
+        return sum(self.events.values())
+
+    def report(self, items: Optional[int] = None) -> str:
+        """Describe the flagged events, per item if `items` is given."""
+        if not self.events:
+            return "no I/O"
+        lines = []
+        for (where, event, detail), count in self.events.most_common():
+            rate = f" ({count / items:.2f} per item)" if items else ""
+            lines.append(f"{count:6d}x {event} {detail} in {where}{rate}")
+        return "\n".join(lines)
+
+    def _flag(self, event: str, args: Tuple[Any, ...]) -> None:
+        if event in self.allow:
+            return
+        where, detail = _culprit(), _describe(event, args)
+        self.events[(where, event, detail)] += 1
+        if self.strict:
+            raise IOGuardError(f"{event} {detail} in {where}")
+
+
+def _install() -> None:
+    global _installed
+    with _lock:
+        if not _installed:
+            sys.addaudithook(_hook)
+            _installed = True
+
+
+def _hook(event: str, args: Tuple[Any, ...]) -> None:
+    if not _active or event not in IO_EVENTS:
+        return
+    if event == "open" and isinstance(args[0], str) and args[0].endswith(_MODULE_SUFFIXES):
+        return
+    for guard in list(_active):
+        guard._flag(event, args)
+
+
+def _describe(event: str, args: Tuple[Any, ...]) -> str:
+    if event == "open":
+        return f"{args[0]!r} mode {args[1]!r}"
+    if event in ("socket.connect", "socket.sendto"):
+        return repr(args[-1])
+    if event == "socket.getaddrinfo":
+        return f"{args[0]}:{args[1]}"
+    if event == "urllib.Request":
+        return f"{args[2]} {args[0]}"
+    return repr(args[0]) if args else ""
+
+
+def _library(filename: str) -> bool:
+    return filename.startswith((sys.prefix, sys.base_prefix)) or filename == _GUARD_FILE
+
+
+def _culprit() -> str:
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        instance = frame.f_locals.get("self") if frame.f_code.co_name == "run" else None
+        if instance is not None and hasattr(instance, "__haystack_input__"):
+            return type(instance).__name__
+        filename = frame.f_code.co_filename
+        if not filename.startswith("<"):
+            filename = os.path.abspath(filename)
+        if fallback is None and not _library(filename):
+            location = filename if filename.startswith("<") else os.path.relpath(filename)
+            fallback = f"{location}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback or "unknown"
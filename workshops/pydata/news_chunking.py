@@ -0,0 +1,65 @@
+"""Cleaning and splitting of news articles, importable by pool processes."""
+from typing import Any, Dict, List, Tuple
+
+from haystack import Document, Pipeline, component
+from haystack.components.preprocessors import DocumentSplitter
+
+from chunk_diff import assign_chunk_ids
+from html_cleaner import clean_html
+from news_updates import DELETE
+
+
+@component
+class BenzingaNews:
+    
+    def __init__(self, fields=("content", "headline", "summary")):
+        # Only these fields hold HTML; ids, urls and timestamps are left as they are
+        self.fields = fields
+
+    @component.output_types(documents=List[Document])
+    def run(self, sources: Dict[str, Any]) -> None:
+             
+        documents = []
+        for source in sources:
+        
+            for key in self.fields:
+                if isinstance(source.get(key), str):
+                    # Paragraph breaks in the body are what the passage splitter splits on
+                    source[key] = clean_html(source[key], paragraphs=key == "content")
+                    
+            if not source.get('content'):
+                continue
+
+            #drop content from source dictionary
+            content = source['content']
+            document = Document(content=content, meta=source) 
+            
+            documents.append(document)
+         
+        return {"documents": documents}
+
+
+def chunking_pipeline() -> Pipeline:
+    """Build the pipeline that turns one news event into passages."""
+    pipeline = Pipeline()
+    pipeline.add_component("get_news", BenzingaNews())
+    pipeline.add_component("document_splitter", DocumentSplitter(split_by="passage", split_length=5))
+    # BenzingaNews already strips markup and keeps only paragraph breaks
+    pipeline.connect("get_news", "document_splitter")
+    return pipeline
+
+
+# Built on first use in each process that splits articles
+_pipeline = None
+
+
+def split_change(change: Tuple[str, Dict[str, Any]]) -> Tuple[str, List[Document]]:
+    """Split a changed article into chunks whose ids only depend on their text."""
+    global _pipeline
+    action, event = change
+    if action == DELETE:
+        return action, []
+    if _pipeline is None:
+        _pipeline = chunking_pipeline()
+    documents = _pipeline.run({"get_news": {"sources": [event]}})["document_splitter"]["documents"]
+    return action, assign_chunk_ids(str(event["id"]), documents)
@@ -0,0 +1,108 @@
+"""Stateful operator that turns repeated news events into real changes."""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+import hashlib
+import logging
+
+from bytewax import operators as op
+from bytewax.dataflow import operator
+from bytewax.operators import KeyedStream, UnaryLogic
+
+logger = logging.getLogger(__name__)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+_Change = Tuple[str, Dict[str, Any]]
+
+
+def fingerprint(event: Dict[str, Any], fields: Sequence[str]) -> str:
+    """Hash the whitespace-normalized text of `fields`."""
+    digest = hashlib.sha256()
+    for field in fields:
+        value = event.get(field) or ""
+        digest.update(" ".join(str(value).split()).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class _ArticleLogic(UnaryLogic[Dict[str, Any], _Change, Dict[str, Any]]):
+    def __init__(self, fields: Sequence[str], ttl: timedelta, resume_state: Optional[Dict[str, Any]]):
+        self._fields = fields
+        self._ttl = ttl
+        state = resume_state or {}
+        self._updated_at = state.get("updated_at")
+        self._fingerprint = state.get("fingerprint")
+        self._expires_at = state.get("expires_at", datetime.now(timezone.utc) + ttl)
+
+    def on_item(self, value: Dict[str, Any]) -> Tuple[Iterable[_Change], bool]:
+        self._expires_at = datetime.now(timezone.utc) + self._ttl
+        updated_at = value.get("updated_at")
+        if self._updated_at is not None and updated_at is not None and updated_at < self._updated_at:
+            logger.debug("Dropping out-of-order update of %s", value.get("id"))
+            return [], UnaryLogic.RETAIN
+
+        if not value.get("content"):
+            if self._fingerprint is None:
+                return [], UnaryLogic.DISCARD
+            return [(DELETE, value)], UnaryLogic.DISCARD
+
+        new_fingerprint = fingerprint(value, self._fields)
+        self._updated_at = updated_at
+        if new_fingerprint == self._fingerprint:
+            return [], UnaryLogic.RETAIN
+        self._fingerprint = new_fingerprint
+        return [(UPSERT, value)], UnaryLogic.RETAIN
+
+    def on_notify(self) -> Tuple[Iterable[_Change], bool]:
+        # Not seen for `ttl`; forget the article to bound memory.
+        return [], UnaryLogic.DISCARD
+
+    def on_eof(self) -> Tuple[Iterable[_Change], bool]:
+        return [], UnaryLogic.RETAIN
+
+    def notify_at(self) -> Optional[datetime]:
+        return self._expires_at
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "updated_at": self._updated_at,
+            "fingerprint": self._fingerprint,
+            "expires_at": self._expires_at,
+        }
+
+
+@operator
+def article_changes(
+    step_id: str,
+    up: KeyedStream[Dict[str, Any]],
+    fields: Sequence[str] = ("headline", "summary", "content"),
+    ttl: timedelta = timedelta(days=1),
+) -> KeyedStream[_Change]:
+    """Emit only the news events that change an article.
+
+    Remembers, per article key, the last `updated_at` and a fingerprint
+    of `fields`. Resent events with unchanged text and updates older
+    than the last one seen are dropped. An event with empty `content`
+    for a known article is emitted as a delete.
+
+    :arg step_id: Unique ID.
+
+    :arg up: Events keyed by article `id`.
+
+    :arg fields: Event fields whose text makes up the fingerprint.
+        Defaults to headline, summary and content.
+
+    :arg ttl: How long to remember an article after its last event.
+        A change arriving later is treated as new. Defaults to one
+        day.
+
+    :returns: Keyed stream of `("upsert" | "delete", event)`.
+
+    """
+
+    def builder(resume_state: Optional[Dict[str, Any]]) -> _ArticleLogic:
+        return _ArticleLogic(fields, ttl, resume_state)
+
+    return op.unary("article_logic", up, builder)
+
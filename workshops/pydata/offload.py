@@ -0,0 +1,215 @@
+"""Bytewax operator that runs CPU-bound steps in a pool of processes."""
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import multiprocessing
+import threading
+import weakref
+
+from bytewax import operators as op
+from bytewax.dataflow import operator
+from bytewax.operators import KeyedStream, UnaryLogic
+
+# Values of one key submitted or waiting to be, oldest first.
+_OffloadState = List[Any]
+
+
+def _map_batch(mapper: Callable[[Any], Any], values: List[Any]) -> List[Any]:
+    # Runs in a pool process; one task per batch saves a round trip per value.
+    return [mapper(value) for value in values]
+
+
+class _Pool:
+    """The process pool of one `offload` step, shared by all of its keys in a process."""
+
+    def __init__(self, max_workers: int, start_method: str):
+        self._max_workers = max_workers
+        self._start_method = start_method
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Values in each running batch
+        self._running: Dict[Future, int] = {}
+        self._keys = 0
+        self._eof = False
+
+    def submit(self, mapper: Callable[[Any], Any], values: List[Any]) -> Future:
+        with self._lock:
+            # Started on first use, so building the dataflow does not spawn processes.
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self._max_workers, mp_context=multiprocessing.get_context(self._start_method)
+                )
+            future = self._executor.submit(_map_batch, mapper, values)
+            self._running[future] = len(values)
+        future.add_done_callback(self._finished)
+        return future
+
+    def wait_for_room(self, max_in_flight: int) -> None:
+        """Block until fewer than `max_in_flight` values are running."""
+        while True:
+            with self._lock:
+                if sum(self._running.values()) < max_in_flight:
+                    return
+                running = list(self._running)
+            wait(running, return_when=FIRST_COMPLETED)
+
+    def open_key(self) -> None:
+        with self._lock:
+            self._keys += 1
+
+    def close_key(self, eof: bool = False) -> None:
+        """Forget a key with nothing left to run; after EOF the last one stops the pool."""
+        with self._lock:
+            self._keys -= 1
+            self._eof = self._eof or eof
+            executor = self._executor if self._eof and not self._keys else None
+            if executor is not None:
+                self._executor = None
+        if executor is not None:
+            # Every batch has finished; the processes exit without holding up the worker
+            executor.shutdown(wait=False)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finished(self, future: Future) -> None:
+        with self._lock:
+            self._running.pop(future, None)
+
+
+class _OffloadLogic(UnaryLogic[Any, Any, _OffloadState]):
+    def __init__(
+        self,
+        pool: _Pool,
+        mapper: Callable[[Any], Any],
+        max_in_flight: int,
+        poll_interval: timedelta,
+        resume_state: Optional[_OffloadState],
+    ):
+        self._pool = pool
+        self._mapper = mapper
+        self._max_in_flight = max_in_flight
+        self._poll_interval = poll_interval
+        self._batch: List[Any] = []
+        self._future: Optional[Future] = None
+        self._waiting: List[Any] = list(resume_state or [])
+        self._closed = False
+        pool.open_key()
+        self._submit()
+
+    def on_item(self, value: Any) -> Tuple[Iterable[Any], bool]:
+        emitted = self._drain()
+        # Backpressure: block the worker, and so its inputs, while the
+        # pool already has `max_in_flight` values.
+        self._pool.wait_for_room(self._max_in_flight)
+        self._waiting.append(value)
+        self._submit()
+        return emitted, UnaryLogic.RETAIN
+
+    def on_notify(self) -> Tuple[Iterable[Any], bool]:
+        emitted = self._drain()
+        if self._future is None:
+            # Nothing left for this key; a later value builds a new logic.
+            self._close()
+            return emitted, UnaryLogic.DISCARD
+        return emitted, UnaryLogic.RETAIN
+
+    def on_eof(self) -> Tuple[Iterable[Any], bool]:
+        emitted = []
+        while self._future is not None:
+            wait([self._future])
+            emitted.extend(self._drain())
+        self._close(eof=True)
+        return emitted, UnaryLogic.DISCARD
+
+    def notify_at(self) -> Optional[datetime]:
+        if self._future is not None:
+            return datetime.now(timezone.utc) + self._poll_interval
+        return None
+
+    def snapshot(self) -> _OffloadState:
+        # Results not emitted yet are recomputed after a resume.
+        return self._batch + self._waiting
+
+    def _submit(self) -> None:
+        # One batch per key at a time, so a result never overtakes an earlier one
+        if self._future is None and self._waiting:
+            self._batch, self._waiting = self._waiting, []
+            self._future = self._pool.submit(self._mapper, self._batch)
+
+    def _drain(self) -> List[Any]:
+        """Emit the key's finished batch and submit the values that queued behind it."""
+        if self._future is None or not self._future.done():
+            return []
+        results = self._future.result()
+        self._batch, self._future = [], None
+        self._submit()
+        return results
+
+    def _close(self, eof: bool = False) -> None:
+        if not self._closed:
+            self._closed = True
+            self._pool.close_key(eof)
+
+
+@operator
+def offload(
+    step_id: str,
+    up: KeyedStream[Any],
+    mapper: Callable[[Any], Any],
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    poll_interval: timedelta = timedelta(milliseconds=10),
+    start_method: str = "spawn",
+) -> KeyedStream[Any]:
+    """Map each value in a process pool, like `op.map_value` without the GIL.
+
+    Each key's values are sent to a `ProcessPoolExecutor` as they
+    arrive, and values that arrive while the key's previous batch is
+    running are sent together as the next batch, so a result never
+    overtakes an earlier one for the same key. Results are emitted as
+    soon as their batch is ready. Keys are spread over the workers as
+    in any keyed step; the workers of a process share one pool.
+
+    The pool starts with the first value and is shut down once every
+    key has finished after the end of input, or when the dataflow is
+    dropped.
+
+    :arg step_id: Unique ID.
+
+    :arg up: Keyed stream.
+
+    :arg mapper: Called with each value in a pool process. It and its
+        arguments must be picklable, so define it at the top level of
+        a module that can be imported without side effects.
+
+    :arg max_workers: Number of processes. Defaults to the number of
+        CPUs.
+
+    :arg max_in_flight: Number of values running in the pool at which
+        a worker stops taking input until a batch finishes. Defaults
+        to four per process.
+
+    :arg poll_interval: How often finished results are collected when
+        no new items arrive. Defaults to 10 milliseconds.
+
+    :arg start_method: `multiprocessing` start method for the pool.
+        Defaults to `"spawn"`, so the Bytewax runtime threads are not
+        forked.
+
+    :returns: Keyed stream of `mapper` results.
+
+    """
+    max_workers = max_workers or multiprocessing.cpu_count()
+    max_in_flight = max_in_flight or 4 * max_workers
+    pool = _Pool(max_workers, start_method)
+
+    def builder(resume_state: Optional[_OffloadState]) -> _OffloadLogic:
+        return _OffloadLogic(pool, mapper, max_in_flight, poll_interval, resume_state)
+
+    # Stops the pool when the step is torn down without reaching EOF.
+    weakref.finalize(builder, pool.shutdown)
+    return op.unary("offload", up, builder)
@@ -0,0 +1,116 @@
+"""Fast parsing of the ISO-8601 timestamps on news events."""
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+from bytewax import operators as op
+from bytewax.dataflow import Stream, operator
+
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    if value.endswith("Z"):
+        # `fromisoformat` only accepts a `Z` suffix from Python 3.11
+        value = value[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def parse_timestamp(value: Union[str, datetime]) -> datetime:
+    """
+    Parse an ISO-8601 timestamp such as `2024-05-29T13:26:52Z` into an
+    aware UTC `datetime`.
+
+    News events within a replay share most of their timestamps, so
+    parsed values are cached. Naive timestamps are taken to be UTC and
+    `datetime` values are passed through.
+
+    :param value: Timestamp string or `datetime`.
+    :return: Timezone-aware `datetime` in UTC.
+    """
+    if isinstance(value, datetime):
+        return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+    return _parse_iso(value)
+
+
+def _is_utc_string(value: Any) -> bool:
+    """Whether `value` is a timestamp string with a `Z` suffix or no offset."""
+    return isinstance(value, str) and (value.endswith("Z") or len(value) <= 10 or value[-6] not in "+-")
+
+
+def parse_timestamp_array(values: Sequence[str]) -> np.ndarray:
+    """
+    Parse many UTC ISO-8601 timestamps at once.
+
+    :param values: Timestamp strings, with or without a `Z` suffix.
+    :return: `datetime64[us]` array of the UTC times.
+    """
+    strings = np.asarray(values, dtype=np.str_)
+    return np.char.rstrip(strings, "Z").astype("datetime64[us]")
+
+
+def parse_event_timestamps(
+    event: Dict[str, Any], fields: Sequence[str] = TIMESTAMP_FIELDS
+) -> Dict[str, Any]:
+    """Replace the timestamp `fields` of `event` with `datetime` values, in place."""
+    for field in fields:
+        event[field] = parse_timestamp(event[field])
+    return event
+
+
+def parse_batch_timestamps(
+    events: List[Dict[str, Any]], fields: Sequence[str] = TIMESTAMP_FIELDS
+) -> List[Dict[str, Any]]:
+    """
+    Replace the timestamp `fields` of a whole batch of events through
+    NumPy `datetime64`, in place.
+
+    Columns holding anything other than UTC timestamp strings are
+    parsed one value at a time.
+    """
+    for field in fields:
+        values = [event[field] for event in events]
+        if not all(_is_utc_string(value) for value in values):
+            for event in events:
+                event[field] = parse_timestamp(event[field])
+            continue
+        parsed = parse_timestamp_array(values).tolist()
+        for event, value in zip(events, parsed):
+            event[field] = value.replace(tzinfo=timezone.utc)
+    return events
+
+
+@operator
+def parse_timestamps(
+    step_id: str,
+    up: Stream[Dict[str, Any]],
+    fields: Sequence[str] = TIMESTAMP_FIELDS,
+    vectorized: bool = False,
+) -> Stream[Dict[str, Any]]:
+    """Parse the ISO-8601 timestamp fields of news events.
+
+    The parsed values are aware UTC `datetime`s, so an `EventClock`
+    can use them directly, e.g. `ts_getter=lambda e: e["updated_at"]`.
+
+    :arg step_id: Unique ID.
+
+    :arg up: Stream of event dicts.
+
+    :arg fields: Fields holding timestamps. Defaults to `created_at`
+        and `updated_at`.
+
+    :arg vectorized: Parse each incoming batch through NumPy
+        `datetime64` instead of the cached per-value parser. Only
+        worth it for batches with few repeated timestamps.
+
+    :returns: Stream of the same events with parsed timestamps.
+
+    """
+    if vectorized:
+        return op.flat_map_batch("parse_batch", up, lambda events: parse_batch_timestamps(events, fields))
+    return op.map("parse", up, lambda event: parse_event_timestamps(event, fields))
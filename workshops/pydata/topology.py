@@ -0,0 +1,134 @@
+"""Export the Bytewax and Haystack topology of dataflow modules as Mermaid.
+
+Rendering happens here, offline, once per run, instead of calling
+`Pipeline.draw` (a request to mermaid.ink) from inside a dataflow.
+Every module is imported and its `Dataflow` objects, `Pipeline`
+objects and zero-argument functions annotated `-> Pipeline` are
+written to `<out>/<module>.md` as Mermaid code blocks, which GitHub
+and most Markdown viewers render.
+
+    python -m topology dataflow news_chunking --out topology
+    python -m topology dataflow --pipeline news_chunking:chunking_pipeline --stdout
+"""
+from typing import Any, Dict, Iterator, List, Tuple
+import argparse
+import dataclasses
+import importlib
+import inspect
+import re
+from pathlib import Path
+
+from bytewax.dataflow import Dataflow, MultiPort, SinglePort
+from haystack import Pipeline
+from haystack.core.pipeline.draw import _to_mermaid_text
+
+
+def _node_id(name: str) -> str:
+    # Prefixed so step names such as "end" cannot clash with Mermaid keywords
+    return "step_" + re.sub(r"\W", "_", name)
+
+
+def _stream_ids(step: Any) -> Iterator[str]:
+    for field in dataclasses.fields(step):
+        port = getattr(step, field.name)
+        if isinstance(port, SinglePort):
+            yield port.stream_id
+        elif isinstance(port, MultiPort):
+            yield from port.stream_ids.values()
+
+
+def dataflow_mermaid(flow: Dataflow) -> str:
+    """Mermaid flowchart of the top-level steps of `flow` and the streams between them."""
+    # Streams are named after the port that produces them
+    producers: Dict[str, str] = {}
+    for step in flow.substeps:
+        for stream_id in _stream_ids(step):
+            if stream_id.startswith(step.step_id + "."):
+                producers[stream_id] = step.step_name
+
+    lines = ["flowchart TD"]
+    edges: Dict[Tuple[str, str], None] = {}
+    for step in flow.substeps:
+        lines.append(f'    {_node_id(step.step_name)}["<b>{step.step_name}</b><br><small>{type(step).__name__}</small>"]')
+        for stream_id in _stream_ids(step):
+            producer = producers.get(stream_id)
+            if producer is not None and producer != step.step_name:
+                edges[(producer, step.step_name)] = None
+    lines.extend(f"    {_node_id(up)} --> {_node_id(down)}" for up, down in edges)
+    return "\n".join(lines)
+
+
+def pipeline_mermaid(pipeline: Pipeline) -> str:
+    """Mermaid flowchart of a Haystack pipeline, as `Pipeline.draw` renders it, without the network."""
+    return _to_mermaid_text(pipeline.graph)
+
+
+def _returns_pipeline(obj: Any) -> bool:
+    if not inspect.isfunction(obj):
+        return False
+    signature = inspect.signature(obj)
+    required = [p for p in signature.parameters.values() if p.default is p.empty
+                and p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)]
+    return not required and signature.return_annotation in (Pipeline, "Pipeline")
+
+
+def _as_pipeline(obj: Any) -> Pipeline:
+    if callable(obj) and not isinstance(obj, Pipeline):
+        obj = obj()
+    # Components such as `BenzingaEmbeder` wrap their pipeline
+    pipeline = getattr(obj, "pipeline", obj)
+    if not isinstance(pipeline, Pipeline):
+        raise TypeError(f"{obj!r} is not a Haystack Pipeline and has no `pipeline` attribute")
+    return pipeline
+
+
+def discover(module: Any) -> Tuple[List[Tuple[str, Dataflow]], List[Tuple[str, Pipeline]]]:
+    """Find the dataflows and pipelines a module defines or builds without arguments."""
+    flows, pipelines = [], []
+    for name, obj in vars(module).items():
+        if isinstance(obj, Dataflow):
+            flows.append((name, obj))
+        elif isinstance(obj, Pipeline) or _returns_pipeline(obj):
+            pipelines.append((name, _as_pipeline(obj)))
+    return flows, pipelines
+
+
+def render(module_name: str, extra_pipelines: List[str]) -> str:
+    module = importlib.import_module(module_name)
+    flows, pipelines = discover(module)
+    for target in extra_pipelines:
+        name, attribute = target.split(":")
+        pipelines.append((target, _as_pipeline(getattr(importlib.import_module(name), attribute))))
+
+    sections = [f"# `{module_name}` topology"]
+    for name, flow in flows:
+        sections.append(f"## Bytewax dataflow `{flow.flow_id}` (`{name}`)\n\n```mermaid\n{dataflow_mermaid(flow)}\n```")
+    for name, pipeline in pipelines:
+        sections.append(f"## Haystack pipeline `{name}`\n\n```mermaid\n{pipeline_mermaid(pipeline)}\n```")
+    return "\n\n".join(sections) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="+", help="Modules to import, e.g. dataflow")
+    parser.add_argument("--pipeline", action="append", default=[], metavar="MODULE:ATTRIBUTE",
+                        help="Also export this pipeline, factory or component with a `pipeline`, "
+                             "added to the first module's file")
+    parser.add_argument("--out", default="topology", help="Directory to write <module>.md to")
+    parser.add_argument("--stdout", action="store_true", help="Print instead of writing files")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    for index, module_name in enumerate(args.modules):
+        text = render(module_name, args.pipeline if index == 0 else [])
+        if args.stdout:
+            print(text)
+            continue
+        out.mkdir(parents=True, exist_ok=True)
+        path = out / f"{module_name}.md"
+        path.write_text(text)
+        print(f"wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
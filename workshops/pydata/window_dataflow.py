@@ -1,8 +1,5 @@
-import time
 from datetime import datetime, timedelta, timezone
-import json
 import logging
-import re
 
 import bytewax.operators as op
 import pandas as pd
@@ -12,63 +9,16 @@ from bytewax.dataflow import Dataflow
 from bytewax.operators import windowing as wop
 from bytewax.operators.windowing import EventClock, TumblingWindower
 
+from deserialize import deserialize_batch
+from timestamps import parse_timestamps
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def safe_deserialize(data):
-        """
-        Safely deserialize JSON data, handling various formats."""
-        try:
-            parsed_data = json.loads(data)
-
-            if isinstance(parsed_data, dict):
-                event = parsed_data
-            else:
-                logger.info(f"Skipping unexpected data type: {data}")
-                return None
-            
-            if 'link' in event:
-                event['url'] = event.pop('link')
-            
-            if "url" in event:
-                return event
-            else:
-                logger.info(f"Missing 'url' key in data: {data}")
-                return None
-
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error ({e}) for data: {data}")
-            return None
-        except Exception as e:
-            logger.error(f"Error processing data ({e}): {data}")
-            return None
-        
-def parse_time(parsed_data):
-    """Convert time from string to datetime"""
-    
-    
-    
-    for item in ['created_at','updated_at']:
-        
-        time_min_t = re.sub("T", " ", parsed_data[item])
-        time_min_ms = re.sub(r":*Z", "",time_min_t)
-        time_ = time.strptime(time_min_ms,"%Y-%m-%d %H:%M:%S")
-    
-        parsed_data[item] = datetime(year=time_.tm_year, 
-                                            month=time_.tm_mon, 
-                                            day=time_.tm_mday, 
-                                            hour=time_.tm_hour, 
-                                            minute=time_.tm_min,
-                                            second=time_.tm_sec, 
-                                            tzinfo=timezone.utc)
-        
-    return parsed_data
-            
-    
 flow = Dataflow("rag-pipeline")
 input_data = op.input("input", flow, FileSource("data/news_out.jsonl"))
-deserialize_data = op.filter_map("deserialize", input_data, safe_deserialize)
-transform_data_time = op.map("timeconversion", deserialize_data, parse_time)
+deserialize_data = op.flat_map_batch("deserialize", input_data, deserialize_batch)
+transform_data_time = parse_timestamps("timeconversion", deserialize_data)
 
 map_tuple = op.map(
     "tuple_map",
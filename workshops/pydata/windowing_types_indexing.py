@@ -1,8 +1,5 @@
-import time
 from datetime import datetime, timedelta, timezone
-import json
 import logging
-import re
 
 import bytewax.operators as op
 from bytewax.connectors.files import FileSource
@@ -11,11 +8,9 @@ from bytewax.dataflow import Dataflow
 from bytewax.operators import windowing as wop
 from bytewax.operators.windowing import EventClock, TumblingWindower, SessionWindower, SlidingWindower
 from haystack import Pipeline
-from haystack.components.embedders import OpenAIDocumentEmbedder
-from haystack.components.preprocessors import DocumentCleaner, DocumentSplitter
+from haystack.components.preprocessors import DocumentSplitter
 from haystack.components.writers import DocumentWriter
 from haystack.document_stores.types import DuplicatePolicy
-from haystack_integrations.document_stores.elasticsearch import ElasticsearchDocumentStore
 from haystack.utils import Secret
 from haystack import component, Document
 from typing import Any, Dict, List, Optional, Union
@@ -23,7 +18,12 @@ from haystack.dataclasses import ByteStream
 from pathlib import Path
 from dotenv import load_dotenv
 import os
-from bs4 import BeautifulSoup
+
+from deserialize import deserialize_batch
+from html_cleaner import clean_html
+from timestamps import parse_timestamps
+from news_updates import UPSERT, article_changes
+from pipeline_factory import per_worker
 
 load_dotenv(".env")
 open_ai_key = os.environ.get("OPENAI_API_KEY")
@@ -31,63 +31,24 @@ open_ai_key = os.environ.get("OPENAI_API_KEY")
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def safe_deserialize(data):
-    """Safely deserialize JSON data, handling various formats."""
-    try:
-        parsed_data = json.loads(data)
-
-        if isinstance(parsed_data, dict):
-            event = parsed_data
-        else:
-            logger.info(f"Skipping unexpected data type: {data}")
-            return None
-
-        if 'link' in event:
-            event['url'] = event.pop('link')
-
-        if "url" in event:
-            return event
-        else:
-            logger.info(f"Missing 'url' key in data: {data}")
-            return None
-
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error ({e}) for data: {data}")
-        return None
-    except Exception as e:
-        logger.error(f"Error processing data ({e}): {data}")
-        return None
-
-def parse_time(parsed_data):
-    """Convert time from string to datetime"""
-    for item in ['created_at', 'updated_at']:
-        time_min_t = re.sub("T", " ", parsed_data[item])
-        time_min_ms = re.sub(r":*Z", "", time_min_t)
-        time_ = time.strptime(time_min_ms, "%Y-%m-%d %H:%M:%S")
-
-        parsed_data[item] = datetime(year=time_.tm_year,
-                                     month=time_.tm_mon,
-                                     day=time_.tm_mday,
-                                     hour=time_.tm_hour,
-                                     minute=time_.tm_min,
-                                     second=time_.tm_sec,
-                                     tzinfo=timezone.utc)
-
-    return parsed_data
-
 # Haystack components
 @component
 class BenzingaNews:
 
+    def __init__(self, fields=("content", "headline", "summary")):
+        # Only these fields hold HTML; ids, urls and timestamps are left as they are
+        self.fields = fields
+
     @component.output_types(documents=List[Document])
     def run(self, sources: Dict[str, Any]) -> None:
         documents = []
         for source in sources:
-            for key in source:
-                if type(source[key]) == str:
-                    source[key] = self.clean_text(source[key])
+            for key in self.fields:
+                if isinstance(source.get(key), str):
+                    # Paragraph breaks in the body are what the passage splitter splits on
+                    source[key] = clean_html(source[key], paragraphs=key == "content")
 
-            if source['content'] == "":
+            if not source.get('content'):
                 continue
 
             content = source['content']
@@ -96,52 +57,44 @@ class BenzingaNews:
 
         return {"documents": documents}
 
-    def clean_text(self, text):
-        soup = BeautifulSoup(text, "html.parser")
-        text = soup.get_text()
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-
 @component
 class BenzingaEmbeder:
 
     def __init__(self):
         get_news = BenzingaNews()
-        document_cleaner = DocumentCleaner(remove_empty_lines=True, remove_extra_whitespaces=True, remove_repeated_substrings=False)
         document_splitter = DocumentSplitter(split_by="passage", split_length=5)
-        embedding = OpenAIDocumentEmbedder(api_key=Secret.from_token(open_ai_key))
+        # Imported here so importing the dataflow does not load the OpenAI SDK
+        from haystack.components.embedders import OpenAIDocumentEmbedder
+        embedding = OpenAIDocumentEmbedder(api_key=Secret.from_token(open_ai_key), progress_bar=False)
 
         self.pipeline = Pipeline()
         self.pipeline.add_component("get_news", get_news)
-        self.pipeline.add_component("document_cleaner", document_cleaner)
         self.pipeline.add_component("document_splitter", document_splitter)
+        self.pipeline.add_component("embedder", embedding)
 
 
-        self.pipeline.connect("get_news", "document_cleaner")
-        self.pipeline.connect("document_cleaner", "document_splitter")
+        # BenzingaNews already strips markup and keeps only paragraph breaks
+        self.pipeline.connect("get_news", "document_splitter")
+        self.pipeline.connect("document_splitter", "embedder")
 
 
     @component.output_types(documents=List[Document])
     def run(self, event: List[Union[str, Path, ByteStream]]):
+        # Draw the pipeline offline with `python -m topology`, not per event
         documents = self.pipeline.run({"get_news": {"sources": [event]}})
-        self.pipeline.draw("benzinga_pipeline.png")
         return documents
 
-embed_benzinga = BenzingaEmbeder()
+# Built on the first event each worker processes
+embed_benzinga = per_worker(BenzingaEmbeder)
 
 def process_event(event):
-    # Unpack the tuple to get the event ID and list of dictionaries
-    event_id, event_data = event
+    # Unpack the tuple to get the event ID and the window's changed versions
+    event_id, (window_id, event_data) = event
     
     try: 
-       
-        for single_event in event_data:
-            
-            # Ensure that each item in the list is a dictionary
-            if isinstance(single_event, list):
-                
-                documents = embed_benzinga.run(single_event[0])
-                return documents
+        # Every event in the window is a real change; the latest one wins
+        documents = embed_benzinga().run(event_data[-1])
+        return documents
     except Exception as e:
         print("Error", e)
         return None
@@ -149,8 +102,8 @@ def process_event(event):
 # Set up the dataflow
 flow = Dataflow("rag-pipeline")
 input_data = op.input("input", flow, FileSource("data/news_out.jsonl"))
-deserialize_data = op.filter_map("deserialize", input_data, safe_deserialize)
-transform_data_time = op.map("timeconversion", deserialize_data, parse_time)
+deserialize_data = op.flat_map_batch("deserialize", input_data, deserialize_batch)
+transform_data_time = parse_timestamps("timeconversion", deserialize_data)
 
 # Map the tuple to ensure consistent structure
 map_tuple = op.map(
@@ -164,12 +117,20 @@ map_tuple = op.map(
     ),
 )
 
+# Drop resent articles whose text did not change
+changes = article_changes("article_changes", map_tuple)
+changed_data = op.filter_map(
+    "upserts",
+    changes,
+    lambda key_change: (key_change[0], key_change[1][1]) if key_change[1][0] == UPSERT else None,
+)
+
 event_time_config = EventClock(ts_getter=lambda e: e['updated_at'], wait_for_system_duration=timedelta(seconds=1))
 align_to = datetime(2024, 5, 29, tzinfo=timezone.utc)
 clock_config = SlidingWindower(length=timedelta(seconds=10), offset=timedelta(seconds=5), align_to=align_to)
 
 window = wop.collect_window(
-    "windowed_data", map_tuple, clock=event_time_config, windower=clock_config
+    "windowed_data", changed_data, clock=event_time_config, windower=clock_config
 )
 
 calc = op.filter_map("embed_content", window.down, process_event)